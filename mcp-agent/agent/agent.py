@@ -5,16 +5,44 @@ LLM-driven agent that calls advertising tools via MCP protocol.
 
 import os
 import json
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, field
 
 from dotenv import load_dotenv
 
 from mcp_impl.client import MCPClientInterface, MCPClientFactory
+from mcp_impl.cache import ToolResultCache
+from mcp_impl.executor import ExecutorConfig
+from mcp_impl.http_pool import configure_http_pool
+from mcp_impl.metrics import configure_metrics, observe_llm_call, observe_llm_first_token, start_metrics_dump
+from mcp_impl.tracing import configure_tracing, get_tracer
+from agent.backends import GenerationRequest
+from agent.models import LoadedModel, ModelLoadError, ModelSpec, get_model_registry
+from agent.scheduler import ToolCallScheduler
 from tools.ad_tools import BudgetCalculatorInput, EffectAnalyzerInput, ComplianceCheckerInput
 
 load_dotenv()
 
+# Seconds a client waits beyond a tool's server-side deadline, so an overrunning call ends
+# with the server's timeout error instead of the client giving up first
+TOOL_TIMEOUT_MARGIN = 5.0
+
+
+def client_tool_timeouts(client_timeout: float,
+                         executor_settings: Optional[Dict[str, Any]] = None) -> Tuple[float, Dict[str, float]]:
+    """(default, per-tool) client-side timeouts covering the server's executor deadlines.
+
+    ``client.timeout`` is a floor: each tool waits at least its ``server.executor`` deadline
+    (``tool_timeouts``, else ``tool_timeout``) plus ``TOOL_TIMEOUT_MARGIN``.
+    """
+    executor = ExecutorConfig.from_dict(executor_settings)
+    default = max(float(client_timeout), executor.tool_timeout + TOOL_TIMEOUT_MARGIN)
+    per_tool = {name: max(float(client_timeout), deadline + TOOL_TIMEOUT_MARGIN)
+                for name, deadline in executor.tool_timeouts.items()}
+    return default, per_tool
+
 
 @dataclass
 class AgentConfig:
@@ -23,9 +51,61 @@ class AgentConfig:
     temperature: float = 0.7
     max_tokens: int = 1000
     device: str = "auto"  # auto, cpu, cuda, mps
+    llm_backend: str = "modelscope"  # modelscope, llama_cpp, onnx, stub (see agent/backends.py)
+    quantization: Optional[str] = None  # int8 / int4 weight-only quantization (backend-specific)
+    backend_options: Dict[str, Any] = field(default_factory=dict)
     mcp_mode: str = "stdio"
     mcp_base_url: str = "http://127.0.0.1:8000"
-    mcp_server_command: str = "python mcp_impl/server.py"
+    mcp_server_command: str = "python -m mcp_impl.server"
+    mcp_stdio_pool_size: int = 1  # >1 keeps N warm stdio server processes
+    mcp_serializer: Optional[str] = None  # auto, json, orjson, msgspec, msgpack (None = plain JSON)
+    mcp_framing: str = "line"  # stdio framing: line or length
+    max_concurrent_tool_calls: int = 4
+    tool_call_timeout: float = 30.0
+    tool_call_timeouts: Dict[str, float] = field(default_factory=dict)  # per-tool, from server deadlines
+    result_cache_tools: List[str] = field(default_factory=list)  # tools cached client-side
+    result_cache_ttl: float = 300.0
+    prewarm_model: bool = False  # start loading the LLM in the background at construction
+
+
+class ToolCallParser:
+    """Incremental parser for ``TOOL_CALL`` blocks in generated text.
+
+    Text is fed as it is generated; a call is returned as soon as its block is complete: a
+    ``TOOL_CALL: <name>`` line followed by its JSON arguments (on one line or several).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._tool: Optional[str] = None
+        self._json_lines: List[str] = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Tool calls completed by ``text``."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return [call for line in lines for call in self._parse_line(line)]
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Tool calls completed by the end of the text."""
+        line, self._buffer = self._buffer, ""
+        return self._parse_line(line)
+
+    def _parse_line(self, line: str) -> List[Dict[str, Any]]:
+        line = line.strip()
+        if line.startswith("TOOL_CALL:"):
+            self._tool = line.split(":", 1)[1].strip()
+            self._json_lines = []
+        elif self._tool and (self._json_lines or line.startswith("{")):
+            self._json_lines.append(line)
+            try:
+                args = json.loads("\n".join(self._json_lines))
+            except json.JSONDecodeError:
+                return []  # not complete yet
+            tool, self._tool, self._json_lines = self._tool, None, []
+            if isinstance(args, dict) and args:
+                return [{"tool": tool, "args": args}]
+        return []
 
 
 class AdvertisingAgent:
@@ -35,36 +115,12 @@ class AdvertisingAgent:
         self.config = config
         self.client: Optional[MCPClientInterface] = None
         
-        # Lazy load ModelScope components
-        try:
-            from modelscope import AutoModelForCausalLM, AutoTokenizer
-            from modelscope.pipelines import pipeline
-            from modelscope.utils.constant import Tasks
-            
-            # Initialize ModelScope Qwen model
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                self.config.llm_model, 
-                trust_remote_code=True
-            )
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.config.llm_model,
-                device_map=self.config.device,
-                trust_remote_code=True
-            )
-            
-            # Create pipeline for text generation with tool calling
-            self.llm_pipeline = pipeline(
-                Tasks.text_generation,
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device_map=self.config.device,
-                model_revision="master"
-            )
-            self.model_loaded = True
-        except Exception as e:
-            print(f"Warning: Could not load ModelScope model: {e}")
-            print("Make sure you have sufficient resources (RAM/VRAM) for Qwen3-30B-A3B")
-            self.model_loaded = False
+        # The model is loaded on first generation and shared by every agent in the process
+        self.model_spec = ModelSpec.create(config.llm_model, config.device, config.llm_backend,
+                                           config.quantization, config.backend_options)
+        self.llm: Optional[LoadedModel] = None
+        if config.prewarm_model:
+            self.prewarm_model()
 
         # Agent's knowledge about available tools
         self.available_tools = {
@@ -94,57 +150,125 @@ class AdvertisingAgent:
                     "ad_content": "Ad content to check (string)",
                     "target_audience": "Target audience description (string)"
                 }
-            }
-            ,
+            },
+            "compliance_batch_checker": {
+                "description": "Check many ad content variants for compliance in one call",
+                "parameters": {
+                    "platform": "Platform for compliance check (string)",
+                    "region": "Target region (string)",
+                    "ad_contents": "Ad content variants to check (list of strings)",
+                    "target_audience": "Target audience description (string)"
+                }
+            },
+            "scenario_sweep": {
+                "description": "Evaluate many budget/platform/region/duration scenarios at once (one list entry per scenario)",
+                "parameters": {
+                    "budget": "Total budget in USD per scenario (list of floats)",
+                    "platforms": "Platforms per scenario (list of lists of strings)",
+                    "region": "Target region per scenario (list of strings)",
+                    "duration_days": "Campaign duration per scenario (list of ints)"
+                }
+            },
+            "budget_optimizer": {
+                "description": "Optimize budget allocation to maximize expected conversions or reach under spend constraints",
+                "parameters": {
+                    "budget": "Total advertising budget in USD (float)",
+                    "platforms": "Candidate platforms (list of strings)",
+                    "duration_days": "Campaign duration in days (int)",
+                    "objective": "'conversions' or 'reach' (string, optional)",
+                    "min_spend": "Minimum total spend per platform (object, optional)",
+                    "max_spend": "Maximum total spend per platform (object, optional)",
+                    "max_daily_spend": "Maximum daily spend per platform (object, optional)"
+                }
+            },
             "var_image_generator": {
                 "description": "Generate advertising images from text prompts (VAR)",
                 "parameters": {
                     "prompt": "Text prompt describing the desired ad image (string)",
                     "width": "Image width in pixels (int, optional)",
                     "height": "Image height in pixels (int, optional)",
-                    "style": "Optional visual style (string, optional)"
+                    "style": "Optional visual style (string, optional)",
+                    "inline": "Also return a data URL instead of only an artifact handle (bool, optional)"
                 }
             }
         }
 
+    @property
+    def model_loaded(self) -> bool:
+        """Whether this agent's model is loaded (by this or any other agent in the process)."""
+        return self.llm is not None or get_model_registry().is_loaded(self.model_spec)
+
+    def prewarm_model(self) -> None:
+        """Start loading the model on a background thread so the first query does not wait as long."""
+        get_model_registry().prewarm(self.model_spec)
+
+    async def ensure_model(self) -> bool:
+        """Load (or join the loading of) the shared model without blocking the event loop."""
+        if self.llm is None:
+            try:
+                self.llm = await get_model_registry().aget(self.model_spec)
+            except ModelLoadError as e:
+                print(f"Warning: {e}")
+                print("Make sure you have sufficient resources (RAM/VRAM) for the model, or set llm.backend "
+                      "(llama_cpp runs int4/int8 GGUF models on CPU; stub needs no model)")
+                return False
+            stats = self.llm.stats()
+            memory = f", RSS +{stats['rss_delta_mb']} MB" if stats["rss_delta_mb"] is not None else ""
+            print(f"Model {stats['model']} ready (loaded in {stats['load_seconds']}s{memory})")
+        return True
+
     async def initialize_mcp_client(self):
         """Initialize MCP client based on configuration."""
         if self.config.mcp_mode == "stdio":
             self.client = MCPClientFactory.create_client(
                 "stdio",
-                server_command=self.config.mcp_server_command
+                server_command=self.config.mcp_server_command,
+                pool_size=self.config.mcp_stdio_pool_size,
+                serializer=self.config.mcp_serializer,
+                framing=self.config.mcp_framing
             )
+            if self.config.mcp_stdio_pool_size > 1:
+                # Pre-warm the server processes so the first tool calls don't pay start-up
+                await self.client.start_server()
         elif self.config.mcp_mode in ["sse", "streamhttp"]:
             self.client = MCPClientFactory.create_client(
                 self.config.mcp_mode,
-                base_url=self.config.mcp_base_url
+                base_url=self.config.mcp_base_url,
+                serializer=self.config.mcp_serializer,
+                timeout=self.config.tool_call_timeout,
+                tool_timeouts=self.config.tool_call_timeouts
             )
         else:
             raise ValueError(f"Unsupported MCP mode: {self.config.mcp_mode}")
 
+        if self.config.result_cache_tools:
+            self.client.enable_result_cache(ToolResultCache(
+                tools=self.config.result_cache_tools,
+                ttl_seconds=self.config.result_cache_ttl
+            ))
+
     async def call_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
         """Call an MCP tool via the client."""
         if not self.client:
             await self.initialize_mcp_client()
 
-        request = {
-            "tool": tool_name,
-            "args": tool_args
-        }
-
-        response = await self.client.send_request(request)
+        response = await self.client.call_tool(tool_name, tool_args)
         await self.client.handle_response(response)
 
         return response
 
-    def create_tool_calling_prompt(self, user_query: str) -> str:
-        """Create a prompt that instructs the LLM to call tools."""
+    def create_system_prompt(self) -> str:
+        """Static instructions and tool descriptions, identical for every query.
+
+        Keeping the query out of it makes this the shared prefix of every conversation, so
+        the inference backend's prefix cache prefills it once instead of once per query.
+        """
         tools_description = "\n".join([
             f"- {name}: {info['description']}\n  Parameters: {json.dumps(info['parameters'], indent=2)}"
             for name, info in self.available_tools.items()
         ])
 
-        prompt = f"""You are an expert advertising campaign manager. Help users plan and optimize their advertising campaigns.
+        return f"""You are an expert advertising campaign manager. Help users plan and optimize their advertising campaigns.
 
 Available tools:
 {tools_description}
@@ -162,127 +286,209 @@ TOOL_CALL: budget_calculator
   "duration_days": 30
 }}
 
-If you need to call multiple tools, list them sequentially.
-
-User query: {user_query}
+If you need to call multiple tools, list them sequentially. Independent tool calls run in parallel.
+To use an earlier tool's output as a parameter, reference it as "${{N.result.<field>}}" where N is the
+1-based position of that earlier call, e.g. "${{1.result.platform_allocation.tiktok}}".
 
-Your analysis and tool calls:"""
+When you are given the tool results, answer the user: provide actionable recommendations and insights based on
+the results, explain what the numbers mean and suggest next steps."""
 
-        return prompt
+    def create_tool_calling_messages(self, user_query: str) -> List[Dict[str, str]]:
+        """Start of a query's conversation: the static system prompt, then the user query."""
+        return [
+            {"role": "system", "content": self.create_system_prompt()},
+            {"role": "user", "content": user_query}
+        ]
 
     async def process_user_query(self, user_query: str) -> str:
         """Process user query using LLM and tool calling."""
-        if not self.model_loaded:
-            return "Error: LLM model not loaded. Please check your ModelScope installation and ensure you have sufficient resources for Qwen3-30B-A3B."
-            
-        # Create prompt for tool calling
-        prompt = self.create_tool_calling_prompt(user_query)
-
-        # Get LLM response using ModelScope
-        messages = [{"role": "user", "content": prompt}]
-        
-        # Use pipeline for generation
-        inputs = self.tokenizer.apply_chat_template(
-            messages, 
-            tokenize=False, 
-            add_generation_prompt=True
-        )
-        
-        # Generate response
-        outputs = self.llm_pipeline(
-            inputs,
-            max_new_tokens=self.config.max_tokens,
-            temperature=self.config.temperature,
-            do_sample=True,
-            top_p=0.9,
-            return_full_text=False
-        )
-        
-        llm_response = outputs[0]['generated_text']
-        print(f"LLM Response: {llm_response}")
-
-        # Parse tool calls from LLM response
-        tool_calls = self.parse_tool_calls(llm_response)
+        response = ""
+        async for event in self.stream_query(user_query):
+            if event["type"] == "done":
+                response = event["response"]
+        return response
 
-        # Execute tool calls
-        results = []
-        for tool_call in tool_calls:
+    async def stream_query(self, user_query: str) -> AsyncIterator[Dict[str, Any]]:
+        """Process user query, yielding events as they happen rather than the answer at the end.
+
+        - ``{"type": "plan", "text": ...}``: text of the tool-calling generation
+        - ``{"type": "tool_call", "index": N, "tool": ..., "args": {...}}``: a tool call, started as
+          soon as its ``TOOL_CALL`` block is parsed, while the plan is still being generated
+        - ``{"type": "tool_result", "index": N, "tool": ..., "result": {...}}``: its response
+        - ``{"type": "token", "text": ...}``: text of the final answer
+        - ``{"type": "done", "response": ...}``: the complete answer, always last
+
+        ``index`` is the 1-based position used by ``${N.result...}`` references. Closing the
+        iterator early cancels the running generation and tool calls.
+        """
+        if not await self.ensure_model():
+            yield {"type": "done", "response": f"Error: LLM model not loaded. Please check your {self.config.llm_backend} backend installation and ensure you have sufficient resources for {self.config.llm_model}."}
+            return
+
+        # One trace per query; tool calls carry it to the MCP server
+        tracer = get_tracer()
+        with tracer.span("agent.query", attributes={"agent.mcp_mode": self.config.mcp_mode}):
+            # Create the conversation for tool calling
+            with tracer.span("agent.prompt_template", attributes={"llm.stage": "plan"}):
+                conversation = self.create_tool_calling_messages(user_query)
+
+            # Execute tool calls: independent calls run concurrently, calls that reference
+            # an earlier call's output wait for it
+            scheduler = ToolCallScheduler(
+                self.call_tool,
+                max_concurrency=self.config.max_concurrent_tool_calls,
+                timeout=self.config.tool_call_timeout,
+                tool_timeouts=self.config.tool_call_timeouts
+            )
+            parser = ToolCallParser()
+            tool_calls: List[Dict[str, Any]] = []
+            tasks: List[asyncio.Task] = []
+            finished: asyncio.Queue = asyncio.Queue()  # indices of calls whose response is in
+
+            def start(tool_call: Dict[str, Any]) -> Dict[str, Any]:
+                index = len(tasks)
+                tool_calls.append(tool_call)
+                tasks.append(scheduler.start(tool_call))
+                tasks[index].add_done_callback(lambda _: finished.put_nowait(index))
+                return {"type": "tool_call", "index": index + 1, **tool_call}
+
+            def result(index: int) -> Dict[str, Any]:
+                return {"type": "tool_result", "index": index + 1, "tool": tool_calls[index]["tool"],
+                        "result": tasks[index].result()}
+
+            plan = self.stream_generate("plan", conversation)
+            answer = None
             try:
-                result = await self.call_tool(tool_call["tool"], tool_call["args"])
-                results.append(result)
-            except Exception as e:
-                results.append({"error": str(e), "tool": tool_call["tool"]})
-
-        # Generate final response using results
-        final_response = await self.generate_final_response(user_query, results)
-
-        return final_response
+                # Get LLM response from the configured inference backend; each tool call
+                # starts as soon as it is parsed from the text generated so far
+                llm_response = ""
+                reported = 0
+                async for text in plan:
+                    llm_response += text
+                    yield {"type": "plan", "text": text}
+                    for tool_call in parser.feed(text):
+                        yield start(tool_call)
+                    while not finished.empty():
+                        yield result(finished.get_nowait())
+                        reported += 1
+                for tool_call in parser.close():
+                    yield start(tool_call)
+                print(f"LLM Response: {llm_response}")
+                conversation.append({"role": "assistant", "content": llm_response})
+
+                # Wait for the tool calls still running
+                with tracer.span("agent.execute_tools", attributes={"agent.tool_calls": len(tool_calls)}):
+                    while reported < len(tasks):
+                        yield result(await finished.get())
+                        reported += 1
+
+                # The final answer continues the same conversation, so the backend reuses the
+                # plan generation's KV state and prefills only the tool results
+                with tracer.span("agent.prompt_template", attributes={"llm.stage": "final"}):
+                    messages = self.create_final_response_messages(
+                        user_query, [task.result() for task in tasks], conversation)
+                answer = self.stream_generate("final", messages)
+                final_response = ""
+                async for text in answer:
+                    final_response += text
+                    yield {"type": "token", "text": text}
+            finally:
+                # Closed early: stop the generation and the tool calls still running
+                scheduler.cancel()
+                await plan.aclose()
+                if answer is not None:
+                    await answer.aclose()
+
+        yield {"type": "done", "response": final_response}
+
+    async def generate(self, stage: str, messages: List[Dict[str, str]]) -> str:
+        """Run one chat generation and return its text (see ``stream_generate``)."""
+        return "".join([text async for text in self.stream_generate(stage, messages)])
+
+    async def stream_generate(self, stage: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Run one chat generation, yielding its text as it is generated; ``stage`` ("plan" or
+        "final") labels its metrics and spans.
+
+        The generation is queued on the model's shared scheduler, which batches it with the
+        generations of every other session in the process.
+        """
+        tracer = get_tracer()
+        with tracer.span("llm.chat_template", attributes={"llm.stage": stage}):
+            inputs = self.llm.backend.render_prompt(messages)
+
+        # Not made current: work the caller starts between tokens (tool calls) is not part of it
+        span = tracer.start_span("llm.generate", attributes={
+            "llm.stage": stage, "llm.model": self.config.llm_model,
+            "llm.backend": self.config.llm_backend, "llm.prompt_chars": len(inputs)
+        }) if tracer.enabled else None
+        request = GenerationRequest(inputs, self.config.max_tokens, self.config.temperature, top_p=0.9)
+        stream = self.llm.scheduler.stream(request)
+        started = time.perf_counter()
+        first_token = True
+        status = "error"
+        try:
+            async for text in stream:
+                if first_token:
+                    first_token = False
+                    observe_llm_first_token(stage, time.perf_counter() - started)
+                yield text
+            status = "success"
+        except (GeneratorExit, asyncio.CancelledError):
+            status = "cancelled"
+            raise
+        except Exception as e:
+            if span is not None:
+                span.record_error(e)
+            raise
+        finally:
+            await stream.aclose()  # drops the request from the batch if unfinished
+            completion = request.completion()
+            if status == "success":
+                observe_llm_call(stage, "success", time.perf_counter() - started, len(inputs), len(completion.text),
+                                 completion.prompt_tokens, completion.cached_tokens, completion.completion_tokens)
+            else:
+                observe_llm_call(stage, status, time.perf_counter() - started, len(inputs))
+            if span is not None:
+                span.set_attribute("llm.completion_chars", len(completion.text))
+                span.set_attribute("llm.prompt_tokens", completion.prompt_tokens)
+                span.set_attribute("llm.cached_tokens", completion.cached_tokens)
+                span.set_attribute("llm.completion_tokens", completion.completion_tokens)
+                tracer.end_span(span)
 
     def parse_tool_calls(self, llm_response: str) -> List[Dict[str, Any]]:
         """Parse tool calls from LLM response."""
-        tool_calls = []
-        lines = llm_response.split('\n')
-
-        current_tool = None
-        current_args = None
+        parser = ToolCallParser()
+        return parser.feed(llm_response) + parser.close()
 
-        for line in lines:
-            line = line.strip()
-            if line.startswith('TOOL_CALL:'):
-                if current_tool and current_args:
-                    tool_calls.append({"tool": current_tool, "args": current_args})
-
-                current_tool = line.split(':', 1)[1].strip()
-                current_args = {}
-            elif line.startswith('{') and current_tool:
-                try:
-                    current_args = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
+    async def generate_final_response(self, user_query: str, tool_results: List[Dict[str, Any]],
+                                      conversation: Optional[List[Dict[str, str]]] = None) -> str:
+        """Generate final response using tool results.
 
-        # Add the last tool call
-        if current_tool and current_args:
-            tool_calls.append({"tool": current_tool, "args": current_args})
-
-        return tool_calls
-
-    async def generate_final_response(self, user_query: str, tool_results: List[Dict[str, Any]]) -> str:
-        """Generate final response using tool results."""
-        if not self.model_loaded:
+        ``conversation`` is the query's conversation so far (system prompt, query, plan); the
+        tool results are appended to it as the next turn. Without it a new one is started.
+        """
+        if not await self.ensure_model():
             return f"Tool execution completed, but LLM not available for final response. Results: {json.dumps(tool_results, indent=2)}"
             
+        with get_tracer().span("agent.prompt_template", attributes={"llm.stage": "final"}):
+            messages = self.create_final_response_messages(user_query, tool_results, conversation)
+
+        # Use the inference backend for final response generation
+        return await self.generate("final", messages)
+
+    def create_final_response_messages(self, user_query: str, tool_results: List[Dict[str, Any]],
+                                       conversation: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        """The answer generation's conversation: ``conversation`` (or a new one) plus the tool results."""
         results_summary = "\n".join([
             f"Tool {i+1} ({result.get('tool', 'unknown')}): {json.dumps(result, indent=2)}"
             for i, result in enumerate(tool_results)
         ])
-
-        prompt = f"""Based on the user's query and the tool execution results, provide a comprehensive response about their advertising campaign.
-
-User Query: {user_query}
-
-Tool Results:
+        messages = list(conversation) if conversation else self.create_tool_calling_messages(user_query)
+        messages.append({"role": "user", "content": f"""Tool results:
 {results_summary}
 
-Provide actionable recommendations and insights based on the results. Explain what the numbers mean and suggest next steps."""
-
-        # Use ModelScope for final response generation
-        messages = [{"role": "user", "content": prompt}]
-        inputs = self.tokenizer.apply_chat_template(
-            messages, 
-            tokenize=False, 
-            add_generation_prompt=True
-        )
-        
-        outputs = self.llm_pipeline(
-            inputs,
-            max_new_tokens=self.config.max_tokens,
-            temperature=self.config.temperature,
-            do_sample=True,
-            top_p=0.9,
-            return_full_text=False
-        )
-        
-        return outputs[0]['generated_text']
+Based on these results, provide a comprehensive response about the advertising campaign."""})
+        return messages
 
     async def run_interactive_session(self):
         """Run an interactive session with the user."""
@@ -290,16 +496,32 @@ Provide actionable recommendations and insights based on the results. Explain wh
         print("Ask me about planning advertising campaigns (e.g., '10万美元投东南亚TikTok')")
         print("Type 'quit' to exit.")
 
-        while True:
-            user_input = input("\nYour query: ").strip()
-            if user_input.lower() in ['quit', 'exit']:
-                break
+        # LLM and client metrics of this process, dumped per `metrics.dump_interval`
+        dumper = start_metrics_dump()
+        try:
+            while True:
+                user_input = input("\nYour query: ").strip()
+                if user_input.lower() in ['quit', 'exit']:
+                    break
 
-            try:
-                response = await self.process_user_query(user_input)
-                print(f"\nAssistant: {response}")
-            except Exception as e:
-                print(f"Error processing query: {e}")
+                try:
+                    # Tool results are printed as they arrive, then the answer as it is generated
+                    answering = False
+                    async for event in self.stream_query(user_input):
+                        if event["type"] == "token":
+                            if not answering:
+                                print("\nAssistant: ", end="")
+                                answering = True
+                            print(event["text"], end="", flush=True)
+                        elif event["type"] == "done" and not answering:
+                            print(f"\nAssistant: {event['response']}")
+                    if answering:
+                        print()
+                except Exception as e:
+                    print(f"Error processing query: {e}")
+        finally:
+            if dumper is not None:
+                dumper.stop()
 
     async def close(self):
         """Close the agent and cleanup resources."""
@@ -315,13 +537,38 @@ async def create_advertising_agent_from_config(config_path: str = "config/config
     with open(config_path, 'r', encoding='utf-8') as f:
         config_data = yaml.safe_load(f)
 
+    # Shared HTTP connection pool, retry and hedging policy for the sse/streamhttp clients
+    configure_http_pool(config_data.get('client'))
+    configure_metrics(config_data.get('metrics'))
+    configure_tracing(config_data.get('tracing'), service_name="mcp-agent")
+
+    tool_call_timeout, tool_call_timeouts = client_tool_timeouts(
+        config_data.get('client', {}).get('timeout', 30),
+        config_data.get('server', {}).get('executor')
+    )
+
     config = AgentConfig(
         llm_model=config_data['llm']['model'],
         temperature=config_data['llm']['temperature'],
         max_tokens=config_data['llm']['max_tokens'],
         device=config_data['llm'].get('device', 'auto'),
+        llm_backend=config_data['llm'].get('backend', 'modelscope'),
+        quantization=config_data['llm'].get('quantization'),
+        backend_options=config_data['llm'].get('backend_options') or {},
         mcp_mode=config_data['mode'],
-        mcp_base_url=f"http://{config_data['server']['host']}:{config_data['server']['port']}"
+        mcp_base_url=f"http://{config_data['server']['host']}:{config_data['server']['port']}",
+        mcp_stdio_pool_size=config_data.get('client', {}).get('stdio_pool_size', 1),
+        mcp_serializer=config_data.get('client', {}).get('serializer'),
+        mcp_framing=config_data.get('client', {}).get('framing', 'line'),
+        max_concurrent_tool_calls=config_data.get('client', {}).get('max_concurrent_tool_calls', 4),
+        tool_call_timeout=tool_call_timeout,
+        tool_call_timeouts=tool_call_timeouts,
+        result_cache_tools=[
+            name for name, settings in (config_data.get('tools') or {}).items()
+            if isinstance(settings, dict) and settings.get('cache')
+        ],
+        result_cache_ttl=config_data.get('server', {}).get('cache', {}).get('ttl_seconds', 300),
+        prewarm_model=config_data['llm'].get('prewarm', False)
     )
 
     agent = AdvertisingAgent(config)
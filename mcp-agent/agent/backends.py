@@ -0,0 +1,742 @@
+"""
+Inference Backends
+Pluggable LLM runtimes behind the agent's generations: full or quantized ModelScope /
+transformers models, GGUF models on llama.cpp, ONNX Runtime, and a rule-based stub.
+
+Backends keep the model state (KV cache) of recent generations in a ``PrefixCache``: a
+prompt that starts like an earlier prompt or conversation (the static system / tool
+section, or the plan turn the final answer continues) only prefills the new tokens.
+
+Besides one-shot ``complete``, backends expose ``prefill`` / ``decode`` steps over several
+``GenerationRequest``s, which the continuous-batching scheduler (agent/batching.py) drives;
+a request's ``text`` grows as tokens are generated, which is what streaming reads.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+# ~characters per token, used where a backend has no tokenizer (stub latency, fallbacks)
+CHARS_PER_TOKEN = 4
+
+
+class Completion(NamedTuple):
+    """Generated text plus prompt accounting."""
+    text: str
+    prompt_tokens: int
+    cached_tokens: int = 0  # prompt tokens whose model state was reused instead of prefilled
+    completion_tokens: int = 0
+
+
+def common_prefix_length(a: Sequence, b: Sequence) -> int:
+    """Length of the shared prefix (binary search on slice equality, which runs in C)."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class PrefixCache:
+    """Model states of recent generations keyed by the token sequence they cover.
+
+    ``lookup`` returns the state sharing the longest prefix with a new prompt; the caller
+    reuses it for that many tokens (after cropping a copy) and prefills only the rest.
+    ``max_entries`` bounds memory (a state holds the KV cache of its whole sequence).
+    """
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Sequence, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, tokens: Sequence) -> Tuple[int, Any]:
+        """(shared prefix length, state) of the best entry, or (0, None)."""
+        best, best_key, state = 0, None, None
+        with self._lock:
+            for key, value in self._entries.items():
+                length = common_prefix_length(key, tokens)
+                if length > best:
+                    best, best_key, state = length, key, value
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+        return best, state
+
+    def store(self, tokens: Sequence, state: Any) -> None:
+        if self.max_entries <= 0 or not tokens:
+            return
+        with self._lock:
+            # A state covering a longer sequence supersedes its own prefixes
+            for key in [key for key in self._entries if len(key) <= len(tokens) and tokens[:len(key)] == key]:
+                del self._entries[key]
+            self._entries[tokens] = state
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@dataclass(eq=False)
+class GenerationRequest:
+    """One generation stepped by a backend's ``prefill`` / ``decode``; ``done`` once finished."""
+    prompt: str
+    max_tokens: int
+    temperature: float
+    top_p: float = 0.9
+    text: str = ""  # grows step by step (per token, or all at once without step support)
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    done: bool = False
+    state: Any = None  # backend-private (token ids, pending output, ...)
+
+    def completion(self) -> Completion:
+        return Completion(self.text, self.prompt_tokens, self.cached_tokens, self.completion_tokens)
+
+
+class InferenceBackend(ABC):
+    """One loaded model: renders chat messages to a prompt and completes prompts.
+
+    ``options`` are the backend-specific ``llm.backend_options`` from config.yaml;
+    ``prefix_cache`` (default 4, 0 disables) is the number of reusable model states kept and
+    ``max_batch_size`` (default 8) caps the generations stepped together.
+    """
+
+    name = "base"
+    supports_batching = False  # prefill()/decode() advance several requests per forward pass
+
+    def __init__(self, model: str, device: str = "auto", quantization: Optional[str] = None,
+                 options: Optional[Dict[str, Any]] = None):
+        self.model_name = model
+        self.device = device
+        self.quantization = quantization
+        self.options = dict(options or {})
+        self.prefix_cache = PrefixCache(int(self.options.pop("prefix_cache", 4)))
+        self.max_batch_size = int(self.options.pop("max_batch_size", 8))
+
+    @abstractmethod
+    def load(self) -> None:
+        """Load weights (blocking; the model registry runs this once per process)."""
+
+    @abstractmethod
+    def render_prompt(self, messages: List[Dict[str, str]]) -> str:
+        """Apply the model's chat template to ``messages``, ready for generation."""
+
+    @abstractmethod
+    def complete(self, prompt: str, max_tokens: int, temperature: float, top_p: float = 0.9) -> Completion:
+        """Generate a continuation of ``prompt`` (the new text only), reusing cached prefix state."""
+
+    def prefill(self, requests: List[GenerationRequest]) -> None:
+        """Start ``requests``: process their prompts together and produce each first token.
+
+        Without batching support each request is simply run to completion with ``complete``.
+        """
+        for request in requests:
+            completion = self.complete(request.prompt, request.max_tokens, request.temperature, request.top_p)
+            request.text, request.prompt_tokens, request.cached_tokens, request.completion_tokens = completion
+            request.done = True
+
+    def decode(self, requests: List[GenerationRequest]) -> None:
+        """Generate the next token of every started, unfinished request in one step."""
+        raise NotImplementedError(f"{self.name} backend does not batch generations")
+
+    def cancel(self, requests: List[GenerationRequest]) -> None:
+        """Release started requests abandoned before finishing (their callers went away).
+
+        Batching backends drop such rows at their next step, so the default does nothing.
+        """
+
+
+def chatml(messages: List[Dict[str, str]]) -> str:
+    """ChatML rendering (Qwen's template) for backends without an embedded template."""
+    rendered = "".join(f"<|im_start|>{m['role']}\n{m['content']}<|im_end|>\n" for m in messages)
+    return rendered + "<|im_start|>assistant\n"
+
+
+def _cache_layers(cache: Any) -> List[Tuple[Any, Any]]:
+    """(keys, values) per layer of a transformers cache, each [batch, kv_heads, length, head_dim]."""
+    if hasattr(cache, "layers"):  # transformers >= 4.54
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    return list(zip(cache.key_cache, cache.value_cache))
+
+
+def _build_cache(layers: List[Tuple[Any, Any]]) -> Any:
+    from transformers import DynamicCache
+
+    cache = DynamicCache()
+    for index, (keys, values) in enumerate(layers):
+        cache.update(keys, values, index)
+    return cache
+
+
+def _pad_left(tensor: Any, length: int, dim: int) -> Any:
+    """Zero-pad ``tensor`` at the start of ``dim`` up to ``length``."""
+    import torch
+
+    missing = length - tensor.shape[dim]
+    if missing <= 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = missing
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
+
+
+class _KVBatch:
+    """Rows generating together: one left-padded KV cache and its attention mask (0 = padding)."""
+
+    def __init__(self, requests: List[GenerationRequest], cache: Any, mask: Any):
+        self.requests = requests
+        self.cache = cache
+        self.mask = mask
+
+
+class _TokenState:
+    def __init__(self, prompt: List[int]):
+        self.prompt = prompt
+        self.generated: List[int] = []
+        # Incremental detokenization window: generated[prefix_offset:read_offset] is already in the text
+        self.prefix_offset = 0
+        self.read_offset = 0
+
+
+class ModelScopeBackend(InferenceBackend):
+    """ModelScope / transformers model, generating with ``model.generate`` and a reused KV cache.
+
+    ``quantization``: ``int8`` quantizes Linear weights to int8 (dynamic quantization on
+    CPU, bitsandbytes on GPU); ``int4`` needs a GPU (bitsandbytes NF4) — on CPU use the
+    ``llama_cpp`` backend with a Q4 GGUF model instead.
+
+    Batched generation keeps the running requests in one KV cache, left-padded to a common
+    length with an attention mask marking the padding: new requests are prefilled in one
+    forward pass (each on top of its cached prefix) and merged in, every decode step feeds
+    one token per row, and finished rows are dropped before the next step.
+    """
+
+    name = "modelscope"
+    supports_batching = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._batch: Optional[_KVBatch] = None
+
+    def load(self) -> None:
+        from modelscope import AutoModelForCausalLM, AutoTokenizer
+
+        cpu = self.device == "cpu"
+        kwargs: Dict[str, Any] = {"device_map": self.device, "trust_remote_code": True}
+        if self.quantization and not cpu:
+            from transformers import BitsAndBytesConfig
+
+            if self.quantization == "int8":
+                kwargs["quantization_config"] = BitsAndBytesConfig(load_in_8bit=True)
+            elif self.quantization == "int4":
+                kwargs["quantization_config"] = BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_quant_type="nf4")
+            else:
+                raise ValueError(f"Unsupported quantization for modelscope: {self.quantization}")
+        elif self.quantization and self.quantization != "int8":
+            raise ValueError(f"{self.quantization} on CPU is not supported by the modelscope backend; "
+                             "use backend llama_cpp with a Q4 GGUF model")
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, trust_remote_code=True)
+        self.model = AutoModelForCausalLM.from_pretrained(self.model_name, **kwargs)
+        if self.quantization == "int8" and cpu:
+            import torch
+
+            # Weight-only int8 for every Linear layer; activations stay float
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model.eval()
+
+    def render_prompt(self, messages: List[Dict[str, str]]) -> str:
+        return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, top_p: float = 0.9) -> Completion:
+        import torch
+
+        input_ids = self.tokenizer(prompt, return_tensors="pt", add_special_tokens=False).input_ids
+        input_ids = input_ids.to(self.model.device)
+        tokens = tuple(input_ids[0].tolist())
+        # At least the last prompt token is prefilled: generation starts from its logits
+        cached, state = self.prefix_cache.lookup(tokens[:-1])
+        kwargs: Dict[str, Any] = {}
+        if state is not None:
+            # A new cache over the shared prefix; generate() extends it without touching the stored one
+            kwargs["past_key_values"] = _build_cache(
+                [(keys[:, :, :cached], values[:, :, :cached]) for keys, values in _cache_layers(state)])
+
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                max_new_tokens=max_tokens,
+                do_sample=True,
+                temperature=temperature,
+                top_p=top_p,
+                return_dict_in_generate=True,
+                **kwargs
+            )
+        sequence = output.sequences[0].tolist()
+        past = output.past_key_values
+        if past is not None:
+            self.prefix_cache.store(tuple(sequence[:past.get_seq_length()]), past)
+        text = self.tokenizer.decode(sequence[len(tokens):], skip_special_tokens=True)
+        return Completion(text, len(tokens), cached, len(sequence) - len(tokens))
+
+    def prefill(self, requests: List[GenerationRequest]) -> None:
+        import torch
+
+        rows = []
+        for request in requests:
+            ids = self.tokenizer(request.prompt, add_special_tokens=False).input_ids
+            cached, state = self.prefix_cache.lookup(tuple(ids[:-1]))
+            request.state = _TokenState(ids)
+            request.prompt_tokens, request.cached_tokens = len(ids), cached
+            rows.append((ids[cached:], _cache_layers(state) if state is not None else None, cached))
+
+        # Row layout: [padding, cached prefix | padding, new prompt tokens]
+        prefix = max(cached for _, _, cached in rows)
+        suffix = max(len(ids) for ids, _, _ in rows)
+        device = self.model.device
+        pad = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else 0
+        input_ids = torch.full((len(rows), suffix), pad, dtype=torch.long, device=device)
+        mask = torch.zeros((len(rows), prefix + suffix), dtype=torch.long, device=device)
+        for row, (ids, _, cached) in enumerate(rows):
+            input_ids[row, suffix - len(ids):] = torch.tensor(ids, dtype=torch.long, device=device)
+            mask[row, prefix - cached:prefix] = 1
+            mask[row, prefix + suffix - len(ids):] = 1
+
+        layers = []
+        if prefix:
+            template = next(state for _, state, _ in rows if state is not None)
+            for index, (keys, values) in enumerate(template):
+                empty = keys.new_zeros((1, keys.shape[1], prefix, keys.shape[3]))
+                layers.append(tuple(
+                    torch.cat([
+                        _pad_left(state[index][part][:, :, :cached], prefix, 2) if state is not None else empty
+                        for _, state, cached in rows
+                    ])
+                    for part in (0, 1)
+                ))
+
+        with torch.inference_mode():
+            output = self.model(
+                input_ids=input_ids,
+                attention_mask=mask,
+                position_ids=(mask.cumsum(-1) - 1).clamp(min=0)[:, prefix:],
+                past_key_values=_build_cache(layers),
+                use_cache=True,
+                logits_to_keep=1
+            )
+            tokens = self._sample(output.logits[:, -1], requests)
+
+        batch = self._live_batch()
+        if batch is None:
+            batch = self._batch = _KVBatch(list(requests), output.past_key_values, mask)
+        else:
+            length = max(batch.mask.shape[1], mask.shape[1])
+            layers = [
+                tuple(torch.cat([_pad_left(old[part], length, 2), _pad_left(new[part], length, 2)]) for part in (0, 1))
+                for old, new in zip(_cache_layers(batch.cache), _cache_layers(output.past_key_values))
+            ]
+            mask = torch.cat([_pad_left(batch.mask, length, 1), _pad_left(mask, length, 1)])
+            batch = self._batch = _KVBatch(batch.requests + list(requests), _build_cache(layers), mask)
+        first_row = len(batch.requests) - len(requests)
+        for row, request in enumerate(requests, first_row):
+            # Later requests sharing this prompt's prefix (the system prompt) reuse it right away
+            self._store_row(batch, row, request.state.prompt)
+        self._advance(batch, first_row, tokens)
+
+    def decode(self, requests: List[GenerationRequest]) -> None:
+        import torch
+
+        batch = self._live_batch()
+        if batch is None:
+            return
+        last = torch.tensor([[request.state.generated[-1]] for request in batch.requests],
+                            dtype=torch.long, device=batch.mask.device)
+        mask = torch.cat([batch.mask, batch.mask.new_ones((len(batch.requests), 1))], dim=1)
+        with torch.inference_mode():
+            output = self.model(
+                input_ids=last,
+                attention_mask=mask,
+                position_ids=mask.sum(-1, keepdim=True) - 1,
+                past_key_values=batch.cache,
+                use_cache=True
+            )
+            tokens = self._sample(output.logits[:, -1], batch.requests)
+        batch.mask = mask
+        self._advance(batch, 0, tokens)
+
+    def _live_batch(self) -> Optional[_KVBatch]:
+        """The running batch without finished (or cancelled) rows and all-padding columns."""
+        import torch
+
+        batch = self._batch
+        if batch is None:
+            return None
+        keep = [row for row, request in enumerate(batch.requests) if not request.done]
+        if not keep:
+            self._batch = None
+            return None
+        if len(keep) < len(batch.requests):
+            index = torch.tensor(keep, device=batch.mask.device)
+            mask = batch.mask[index]
+            start = int((mask.sum(0) > 0).nonzero()[0])
+            layers = [(keys[index][:, :, start:], values[index][:, :, start:])
+                      for keys, values in _cache_layers(batch.cache)]
+            batch = self._batch = _KVBatch([batch.requests[row] for row in keep], _build_cache(layers), mask[:, start:])
+        return batch
+
+    def _advance(self, batch: _KVBatch, first_row: int, tokens: List[int]) -> None:
+        """Append each row's new token; finished rows leave their KV state in the prefix cache."""
+        eos = self.model.generation_config.eos_token_id
+        stop = set(eos if isinstance(eos, (list, tuple)) else [eos]) | {self.tokenizer.eos_token_id}
+        for row, token in enumerate(tokens, first_row):
+            request = batch.requests[row]
+            generated = request.state.generated
+            generated.append(token)
+            request.completion_tokens = len(generated)
+            finished = token in stop or len(generated) >= request.max_tokens
+            self._detokenize(request, finished)
+            if not finished:
+                continue
+            request.done = True
+            # The cache holds the prompt and every generated token but the last (never fed)
+            self._store_row(batch, row, request.state.prompt + generated[:-1])
+        if all(request.done for request in batch.requests):
+            self._batch = None  # free the batch's KV cache while idle
+
+    def _detokenize(self, request: GenerationRequest, final: bool) -> None:
+        """Append the text of newly generated tokens to ``request.text``.
+
+        Only a short window of recent tokens is decoded, and decoded together with the tokens
+        before it so tokenizers that merge spaces across tokens render the same as a full
+        decode; text ending in an incomplete UTF-8 character waits for the next token.
+        """
+        state = request.state
+        generated = state.generated
+        before = self.tokenizer.decode(generated[state.prefix_offset:state.read_offset], skip_special_tokens=True)
+        text = self.tokenizer.decode(generated[state.prefix_offset:], skip_special_tokens=True)
+        if len(text) > len(before) and (final or not text.endswith("\ufffd")):
+            request.text += text[len(before):]
+            state.prefix_offset, state.read_offset = state.read_offset, len(generated)
+
+    def _store_row(self, batch: _KVBatch, row: int, tokens: List[int]) -> None:
+        """Copy one row's KV state (without padding) into the prefix cache."""
+        if self.prefix_cache.max_entries <= 0:
+            return
+        columns = batch.mask[row].nonzero().squeeze(-1)
+        layers = [(keys[row:row + 1][:, :, columns], values[row:row + 1][:, :, columns])
+                  for keys, values in _cache_layers(batch.cache)]
+        self.prefix_cache.store(tuple(tokens), _build_cache(layers))
+
+    @staticmethod
+    def _sample(logits: Any, requests: List[GenerationRequest]) -> List[int]:
+        """Temperature / top-p sampling per row (greedy at temperature 0)."""
+        import torch
+
+        tokens = []
+        for row, request in zip(logits.float(), requests):
+            if request.temperature <= 0:
+                tokens.append(int(row.argmax()))
+                continue
+            probs, order = torch.softmax(row / request.temperature, dim=-1).sort(descending=True)
+            probs = probs * (probs.cumsum(-1) - probs < request.top_p)
+            tokens.append(int(order[torch.multinomial(probs, 1)]))
+        return tokens
+
+
+class LlamaCppBackend(InferenceBackend):
+    """GGUF model on llama.cpp (``llama-cpp-python``): int4/int8 weights, fast on CPU.
+
+    ``model`` is a local ``.gguf`` path or a Hugging Face repo id; for a repo the file is
+    ``backend_options.filename`` or picked by ``quantization`` (int4 -> Q4_K_M, int8 -> Q8_0).
+    Options: ``n_ctx`` (default 8192), ``n_threads`` (default all cores), ``n_gpu_layers`` (default 0).
+
+    One llama.cpp context evaluates one sequence: generations are serialized, and the
+    context state of recent conversations is saved so interleaved sessions still reuse it.
+    Scheduled generations stream: ``prefill`` starts llama.cpp's token stream and each
+    ``decode`` step takes the next token, holding the context until the sequence finishes.
+    """
+
+    name = "llama_cpp"
+    GGUF_QUANTS = {"int4": "Q4_K_M", "int8": "Q8_0"}
+
+    def load(self) -> None:
+        from llama_cpp import Llama
+
+        kwargs = {
+            "n_ctx": int(self.options.get("n_ctx", 8192)),
+            "n_threads": int(self.options.get("n_threads", os.cpu_count() or 1)),
+            "n_gpu_layers": int(self.options.get("n_gpu_layers", 0)),
+            "verbose": False,
+        }
+        if os.path.exists(self.model_name):
+            self.llm = Llama(model_path=self.model_name, **kwargs)
+        else:
+            quant = self.GGUF_QUANTS.get(self.quantization or "int4", self.quantization)
+            filename = self.options.get("filename", f"*{quant}.gguf")
+            self.llm = Llama.from_pretrained(repo_id=self.model_name, filename=filename, **kwargs)
+
+        self._lock = threading.Lock()
+        self._formatter = None
+        template = self.llm.metadata.get("tokenizer.chat_template")
+        if template:
+            from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+
+            def token_text(token: int) -> str:
+                return self.llm.detokenize([token]).decode("utf-8", errors="ignore")
+
+            self._formatter = Jinja2ChatFormatter(
+                template=template, eos_token=token_text(self.llm.token_eos()), bos_token=token_text(self.llm.token_bos())
+            )
+
+    def render_prompt(self, messages: List[Dict[str, str]]) -> str:
+        if self._formatter is None:
+            return chatml(messages)
+        return self._formatter(messages=messages).prompt
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, top_p: float = 0.9) -> Completion:
+        tokens = self._tokenize(prompt)
+        with self._lock:
+            cached = self._restore(tokens)
+            output = self.llm(list(tokens), max_tokens=max_tokens, temperature=temperature, top_p=top_p)
+            self._save()
+        return Completion(output["choices"][0]["text"], len(tokens), cached, output["usage"]["completion_tokens"])
+
+    def prefill(self, requests: List[GenerationRequest]) -> None:
+        # Without batching support the scheduler starts one request at a time
+        for request in requests:
+            tokens = self._tokenize(request.prompt)
+            self._lock.acquire()  # held until the sequence finishes (or is cancelled)
+            try:
+                request.prompt_tokens, request.cached_tokens = len(tokens), self._restore(tokens)
+                request.state = self.llm(list(tokens), max_tokens=request.max_tokens,
+                                         temperature=request.temperature, top_p=request.top_p, stream=True)
+            except BaseException:
+                self._lock.release()
+                raise
+            self._step(request)
+
+    def decode(self, requests: List[GenerationRequest]) -> None:
+        for request in requests:
+            self._step(request)
+
+    def cancel(self, requests: List[GenerationRequest]) -> None:
+        for request in requests:
+            if request.state is not None:
+                self._finish(request)
+
+    def _tokenize(self, prompt: str) -> Tuple[int, ...]:
+        return tuple(self.llm.tokenize(prompt.encode("utf-8"), add_bos=True, special=True))
+
+    def _restore(self, tokens: Tuple[int, ...]) -> int:
+        """Prepare the context for ``tokens``; returns how many of them need no evaluation."""
+        cached, state = self.prefix_cache.lookup(tokens[:-1])
+        if state is not None:
+            # The context then re-evaluates only the tokens after the shared prefix
+            self.llm.load_state(state)
+            return cached
+        return common_prefix_length(tuple(self.llm.input_ids[:self.llm.n_tokens].tolist()), tokens[:-1])
+
+    def _save(self) -> None:
+        self.prefix_cache.store(tuple(self.llm.input_ids[:self.llm.n_tokens].tolist()), self.llm.save_state())
+
+    def _step(self, request: GenerationRequest) -> None:
+        try:
+            chunk = next(request.state, None)
+        except BaseException:
+            self._finish(request)
+            raise
+        choice = chunk["choices"][0] if chunk is not None else None
+        if choice is not None and choice["text"]:
+            request.text += choice["text"]
+            request.completion_tokens += 1  # llama.cpp yields about one token per chunk
+        if choice is None or choice.get("finish_reason") is not None:
+            self._finish(request)
+
+    def _finish(self, request: GenerationRequest) -> None:
+        request.state.close()
+        request.state = None
+        request.done = True
+        try:
+            self._save()
+        finally:
+            self._lock.release()
+
+
+class OnnxBackend(InferenceBackend):
+    """Exported ONNX model on ONNX Runtime (``optimum[onnxruntime]``).
+
+    ``model`` is a local directory or repo with an exported model; the weights file is
+    ``backend_options.file_name`` or picked by ``quantization`` (int8 -> model_int8.onnx,
+    int4 -> model_q4.onnx) under ``backend_options.subfolder`` (default ``onnx``).
+    ONNX Runtime sessions keep no KV state between ``generate`` calls, so every prompt is
+    prefilled in full.
+    """
+
+    name = "onnx"
+    ONNX_FILES = {"int8": "model_int8.onnx", "int4": "model_q4.onnx"}
+
+    def load(self) -> None:
+        from optimum.onnxruntime import ORTModelForCausalLM
+        from transformers import AutoTokenizer
+
+        kwargs = {"provider": self.options.get("provider", "CPUExecutionProvider")}
+        file_name = self.options.get("file_name") or self.ONNX_FILES.get(self.quantization or "")
+        if file_name:
+            kwargs["file_name"] = file_name
+            kwargs["subfolder"] = self.options.get("subfolder", "onnx")
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = ORTModelForCausalLM.from_pretrained(self.model_name, **kwargs)
+
+    def render_prompt(self, messages: List[Dict[str, str]]) -> str:
+        return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, top_p: float = 0.9) -> Completion:
+        inputs = self.tokenizer(prompt, return_tensors="pt", add_special_tokens=False)
+        output = self.model.generate(**inputs, max_new_tokens=max_tokens, do_sample=True,
+                                     temperature=temperature, top_p=top_p)
+        prompt_tokens = inputs["input_ids"].shape[1]
+        new_tokens = output[0][prompt_tokens:]
+        return Completion(self.tokenizer.decode(new_tokens, skip_special_tokens=True), prompt_tokens, 0, len(new_tokens))
+
+
+class StubBackend(InferenceBackend):
+    """Rule-based stand-in for an LLM: no download, deterministic output.
+
+    The tool-calling generation turns the budget, platforms, region and duration found in
+    the user query into ``TOOL_CALL`` blocks; the answer generation (a "Tool results" turn)
+    summarises the tool results. ``prefill_tps`` / ``decode_tps`` options (tokens per
+    second) add simulated generation latency, so the whole agent loop can be benchmarked;
+    prefill is charged only for the prompt not covered by the prefix cache, and a batched
+    decode step costs one token's time whatever the batch size.
+    """
+
+    name = "stub"
+    supports_batching = True
+    PLATFORMS = {"tiktok": "tiktok", "抖音": "tiktok", "facebook": "facebook", "脸书": "facebook",
+                 "instagram": "instagram", "google": "google", "谷歌": "google"}
+    REGIONS = {"southeast asia": "southeast_asia", "东南亚": "southeast_asia", "europe": "europe", "欧洲": "europe",
+               "north america": "north_america", "北美": "north_america", "china": "china", "中国": "china"}
+    UNITS = {"万": 1e4, "k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6}
+
+    def load(self) -> None:
+        self.prefill_tps = float(self.options.get("prefill_tps", 0))
+        self.decode_tps = float(self.options.get("decode_tps", 0))
+
+    def render_prompt(self, messages: List[Dict[str, str]]) -> str:
+        return chatml(messages)
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, top_p: float = 0.9) -> Completion:
+        request = GenerationRequest(prompt, max_tokens, temperature, top_p)
+        self.prefill([request])
+        while not request.done:
+            self.decode([request])
+        return request.completion()
+
+    def prefill(self, requests: List[GenerationRequest]) -> None:
+        uncached = 0
+        for request in requests:
+            prompt = request.prompt
+            turns = re.findall(r"<\|im_start\|>user\n(.*?)<\|im_end\|>", prompt, re.DOTALL)
+            message = turns[-1] if turns else prompt
+            text = self.answer(message) if message.startswith("Tool results:") else self.plan(message)
+            text = text[:request.max_tokens * CHARS_PER_TOKEN]
+
+            # Characters stand in for tokens: the cache is keyed by the prompt text
+            cached, _ = self.prefix_cache.lookup(prompt[:-1])
+            self.prefix_cache.store(prompt + text, True)
+            uncached += len(prompt) - cached
+            request.prompt_tokens, request.cached_tokens = len(prompt) // CHARS_PER_TOKEN, cached // CHARS_PER_TOKEN
+            request.state = [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+        # One forward pass over all new prompt tokens (prefill is compute-bound)
+        if self.prefill_tps:
+            time.sleep(uncached / CHARS_PER_TOKEN / self.prefill_tps)
+        for request in requests:
+            self._emit(request)
+
+    def decode(self, requests: List[GenerationRequest]) -> None:
+        # One step yields a token for every row; decoding is memory-bound, so a step over a
+        # batch takes about as long as a step over one request
+        if self.decode_tps:
+            time.sleep(1 / self.decode_tps)
+        for request in requests:
+            self._emit(request)
+
+    @staticmethod
+    def _emit(request: GenerationRequest) -> None:
+        pending = request.state
+        if pending:
+            request.text += pending.pop(0)
+            request.completion_tokens += 1
+        request.done = not pending
+
+    def parse_query(self, query: str) -> Tuple[float, List[str], str, int]:
+        lowered = query.lower()
+        platforms = [p for key, p in self.PLATFORMS.items() if key in lowered]
+        platforms = list(dict.fromkeys(platforms)) or ["tiktok", "facebook"]
+        region = next((r for key, r in self.REGIONS.items() if key in lowered), "global")
+
+        budget = 10000.0
+        amounts = re.sub(r"(?<=\d),(?=\d{3})", "", lowered)  # $100,000 -> 100000
+        for number, unit in re.findall(r"(\d+(?:\.\d+)?)\s*(万|k|thousand|million|m)?(?![a-z])", amounts):
+            value = float(number) * self.UNITS.get(unit, 1)
+            if value >= 100:
+                budget = value
+                break
+
+        duration = 30
+        match = re.search(r"(\d+)\s*(days?|天|weeks?|周|months?|个月)", lowered)
+        if match:
+            unit = match.group(2)
+            scale = 7 if unit.startswith("week") or unit == "周" else 30 if unit.startswith("month") or unit == "个月" else 1
+            duration = int(match.group(1)) * scale
+        return budget, platforms, region, duration
+
+    def plan(self, query: str) -> str:
+        budget, platforms, region, duration = self.parse_query(query)
+        calls = [("budget_calculator", {"budget": budget, "platforms": platforms, "region": region,
+                                        "duration_days": duration})]
+        for platform in platforms:
+            # Uses the allocation from call 1, so the scheduler runs these after it
+            calls.append(("effect_analyzer", {"platform": platform, "budget": f"${{1.result.platform_allocation.{platform}}}",
+                                              "target_audience": "general", "campaign_type": "conversion"}))
+        if any(word in query.lower() for word in ("compliance", "合规", "ad copy", "文案")):
+            calls.append(("compliance_checker", {"platform": platforms[0], "region": region,
+                                                 "ad_content": query, "target_audience": "general"}))
+        blocks = "\n".join(f"TOOL_CALL: {name}\n{json.dumps(args, ensure_ascii=False)}" for name, args in calls)
+        return f"Planning {len(calls)} tool calls for a {budget:.0f} USD campaign in {region}.\n{blocks}"
+
+    def answer(self, message: str) -> str:
+        # Each result is rendered as "Tool N (name): {json}" by generate_final_response
+        sections = re.split(r"^Tool \d+ \(([^)]*)\):", message, flags=re.MULTILINE)[1:]
+        failed = '"status": "error"'
+        lines = [
+            f"- {name}: {'failed' if failed in body else 'done'}"
+            for name, body in zip(sections[::2], sections[1::2])
+        ]
+        return "Summary of the campaign analysis:\n" + ("\n".join(lines) or "- no tools were called")
+
+
+BACKENDS: Dict[str, Type[InferenceBackend]] = {
+    backend.name: backend for backend in (ModelScopeBackend, LlamaCppBackend, OnnxBackend, StubBackend)
+}
+
+
+def create_backend(name: str, model: str, device: str = "auto", quantization: Optional[str] = None,
+                   options: Optional[Dict[str, Any]] = None) -> InferenceBackend:
+    """Instantiate (without loading) the backend registered as ``name``."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](model, device, quantization, options)
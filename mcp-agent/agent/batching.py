@@ -0,0 +1,170 @@
+"""
+Continuous Batching
+Serves the LLM generations of every concurrent agent session from one shared model: requests
+queue up, and at each step newly admitted prompts are prefilled together and all running
+generations decode one token together (iteration-level scheduling), so aggregate tokens/s
+grow with the number of sessions instead of generations running one at a time.
+
+Generations can also be streamed: after every step the new text of each request is handed
+to the caller's event loop, so the first tokens arrive long before the generation ends.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Any, List, Callable, Optional
+
+from agent.backends import Completion, GenerationRequest, InferenceBackend
+from mcp_impl.metrics import observe_llm_queue_wait, observe_llm_step
+
+
+def _resolve(setter: Callable[[Any], None], value: Any) -> None:
+    try:
+        setter(value)
+    except concurrent.futures.InvalidStateError:
+        pass  # cancelled by its caller meanwhile
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[..., Any], *args: Any) -> None:
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        pass  # the caller's event loop has closed
+
+
+class _Pending:
+    def __init__(self, request: GenerationRequest, listener: Optional[Callable[[str], None]] = None):
+        self.request = request
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.submitted = time.perf_counter()
+        self.listener = listener  # called on the scheduler thread with each new piece of text
+        self.streamed = 0  # characters of ``request.text`` handed to the listener
+
+
+class GenerationScheduler:
+    """Steps the queued generations of one backend on a dedicated thread.
+
+    Each iteration admits waiting requests while fewer than ``max_batch_size`` are running,
+    prefills them in one ``backend.prefill`` call, then advances every running request by
+    one ``backend.decode`` step. A finished request leaves the batch at once and its slot is
+    refilled at the next step, so short answers never wait for long ones. Backends without
+    batching support run one request at a time.
+    """
+
+    def __init__(self, backend: InferenceBackend, max_batch_size: int = 8):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size) if backend.supports_batching else 1
+        self._waiting: Deque[_Pending] = deque()
+        self._running: List[_Pending] = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._steps = 0
+        self._completed = 0
+
+    async def generate(self, prompt: str, max_tokens: int, temperature: float, top_p: float = 0.9) -> Completion:
+        """Queue one generation and wait for it; cancelling the caller drops it from the batch."""
+        pending = self.submit(GenerationRequest(prompt, max_tokens, temperature, top_p))
+        await asyncio.wrap_future(pending.future)
+        return pending.request.completion()
+
+    async def stream(self, request: GenerationRequest) -> AsyncIterator[str]:
+        """Queue ``request`` and yield its new text after every step that produced some.
+
+        ``request.completion()`` holds the totals once the iteration ends; closing the
+        iterator early (or cancelling its consumer) drops the request from the batch.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        pending = self.submit(request, lambda text: _call_soon(loop, queue.put_nowait, text))
+        # Queued after every piece of text, since both are sent from the scheduler thread
+        pending.future.add_done_callback(lambda _: _call_soon(loop, queue.put_nowait, None))
+        try:
+            while True:
+                text = await queue.get()
+                if text is None:
+                    break
+                yield text
+            pending.future.result()  # raise the generation's error, if it failed
+        finally:
+            pending.future.cancel()
+
+    def submit(self, request: GenerationRequest, listener: Optional[Callable[[str], None]] = None) -> _Pending:
+        pending = _Pending(request, listener)
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-batching", daemon=True)
+                self._thread.start()
+            self._waiting.append(pending)
+            self._condition.notify()
+        return pending
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            waiting = len(self._waiting)
+        return {
+            "backend": self.backend.name,
+            "max_batch_size": self.max_batch_size,
+            "running": len(self._running),
+            "waiting": waiting,
+            "steps": self._steps,
+            "completed": self._completed,
+        }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._waiting and not self._running:
+                    self._condition.wait()
+                admitted = []
+                while self._waiting and len(self._running) + len(admitted) < self.max_batch_size:
+                    admitted.append(self._waiting.popleft())
+            self._step(admitted)
+
+    def _step(self, admitted: List[_Pending]) -> None:
+        admitted = [pending for pending in admitted if not pending.future.cancelled()]
+        if admitted:
+            now = time.perf_counter()
+            for pending in admitted:
+                observe_llm_queue_wait(now - pending.submitted)
+            observe_llm_step("prefill", len(admitted))
+            self._call(self.backend.prefill, admitted)
+            self._running.extend(admitted)
+            self._retire()
+        if self._running:
+            observe_llm_step("decode", len(self._running))
+            self._call(self.backend.decode, self._running)
+            self._steps += 1
+            self._retire()
+
+    def _call(self, step: Callable[[List[GenerationRequest]], None], batch: List[_Pending]) -> None:
+        try:
+            step([pending.request for pending in batch])
+        except Exception as e:
+            # The backend's batch state is unknown: fail every request in the step
+            for pending in batch:
+                pending.request.done = True
+                _resolve(pending.future.set_exception, e)
+
+    def _retire(self) -> None:
+        running, abandoned = [], []
+        for pending in self._running:
+            if pending.future.done():
+                # Cancelled by its caller (or failed): the backend releases it (``cancel``)
+                if not pending.request.done:
+                    pending.request.done = True
+                    abandoned.append(pending)
+                continue
+            text = pending.request.text
+            if pending.listener is not None and len(text) > pending.streamed:
+                pending.listener(text[pending.streamed:])
+                pending.streamed = len(text)
+            if pending.request.done:
+                self._completed += 1
+                _resolve(pending.future.set_result, pending.request.completion())
+            else:
+                running.append(pending)
+        self._running = running
+        if abandoned:
+            self._call(self.backend.cancel, abandoned)
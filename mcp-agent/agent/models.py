@@ -0,0 +1,186 @@
+"""
+Shared Model Registry
+Process-wide, lazily loaded LLMs: a model is loaded on first use (or pre-warmed in the
+background) on its inference backend, then shared by every agent and session in the process,
+whose generations it serves through one continuous-batching scheduler.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Tuple
+
+from agent.backends import InferenceBackend, create_backend
+from agent.batching import GenerationScheduler
+from mcp_impl.metrics import observe_model_load
+
+
+class ModelLoadError(RuntimeError):
+    """Raised when a model could not be loaded (the failure is remembered until ``unload``)."""
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """What to load; agents with equal specs share one loaded model."""
+    model: str
+    device: str = "auto"
+    backend: str = "modelscope"  # see agent.backends.BACKENDS
+    quantization: Optional[str] = None  # int8 / int4 (backend-specific)
+    options: Dict[str, Any] = field(default_factory=dict, compare=False)  # backend_options
+    # Canonical JSON of ``options``: specs compare and hash by it (option values may be lists or dicts)
+    options_key: str = "{}"
+
+    @classmethod
+    def create(cls, model: str, device: str = "auto", backend: str = "modelscope",
+               quantization: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> "ModelSpec":
+        options = dict(options or {})
+        options_key = json.dumps(options, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return cls(model, device, backend, quantization, options, options_key)
+
+    @property
+    def key(self) -> str:
+        quant = f"/{self.quantization}" if self.quantization else ""
+        return f"{self.backend}:{self.model}{quant}@{self.device}"
+
+
+@dataclass
+class LoadedModel:
+    """A loaded inference backend, the scheduler batching its generations, and load statistics."""
+    spec: ModelSpec
+    backend: InferenceBackend
+    scheduler: GenerationScheduler
+    load_seconds: float
+    rss_delta_bytes: Optional[int]  # growth of this process's RSS during the load
+    device_bytes: Optional[int]  # accelerator memory allocated, when torch reports it
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.spec.model,
+            "device": self.spec.device,
+            "backend": self.spec.backend,
+            "quantization": self.spec.quantization,
+            "load_seconds": round(self.load_seconds, 3),
+            "rss_delta_mb": round(self.rss_delta_bytes / 2 ** 20, 1) if self.rss_delta_bytes is not None else None,
+            "device_mb": round(self.device_bytes / 2 ** 20, 1) if self.device_bytes is not None else None,
+            "batching": self.scheduler.stats(),
+        }
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux), else None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _device_bytes() -> Optional[int]:
+    try:
+        import torch
+    except ImportError:
+        return None
+    if torch.cuda.is_available():
+        return sum(torch.cuda.memory_allocated(i) for i in range(torch.cuda.device_count()))
+    return None
+
+
+class ModelRegistry:
+    """Loads each ``ModelSpec`` at most once per process and hands the same instance to every caller.
+
+    Concurrent first callers wait for a single load. A failed load is remembered (a 60GB
+    download is not retried per query) until ``unload`` clears it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loads: Dict[ModelSpec, concurrent.futures.Future] = {}
+
+    def _future(self, spec: ModelSpec) -> Tuple[concurrent.futures.Future, bool]:
+        with self._lock:
+            future = self._loads.get(spec)
+            if future is not None:
+                return future, False
+            future = self._loads[spec] = concurrent.futures.Future()
+            return future, True
+
+    def _load(self, spec: ModelSpec, future: concurrent.futures.Future) -> None:
+        rss_before = _rss_bytes()
+        device_before = _device_bytes()
+        started = time.perf_counter()
+        try:
+            backend = create_backend(spec.backend, spec.model, spec.device, spec.quantization, dict(spec.options))
+            backend.load()
+        except Exception as e:
+            observe_model_load(spec.model, "error", time.perf_counter() - started)
+            future.set_exception(ModelLoadError(f"Could not load {spec.model}: {e}"))
+            return
+        elapsed = time.perf_counter() - started
+        rss_after = _rss_bytes()
+        device_after = _device_bytes()
+        loaded = LoadedModel(
+            spec=spec,
+            load_seconds=elapsed,
+            rss_delta_bytes=rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            device_bytes=device_after - (device_before or 0) if device_after is not None else None,
+            backend=backend,
+            scheduler=GenerationScheduler(backend, backend.max_batch_size)
+        )
+        observe_model_load(spec.model, "success", elapsed)
+        future.set_result(loaded)
+
+    def get(self, spec: ModelSpec) -> LoadedModel:
+        """The loaded model for ``spec``, loading it on this thread if nobody has yet (blocking)."""
+        future, owner = self._future(spec)
+        if owner:
+            self._load(spec, future)
+        return future.result()
+
+    async def aget(self, spec: ModelSpec) -> LoadedModel:
+        """``get`` without blocking the event loop: the load runs on a background thread."""
+        future = self.prewarm(spec)
+        return await asyncio.wrap_future(future)
+
+    def prewarm(self, spec: ModelSpec) -> concurrent.futures.Future:
+        """Start loading ``spec`` on a background thread (no-op if loading or loaded)."""
+        future, owner = self._future(spec)
+        if owner:
+            threading.Thread(target=self._load, args=(spec, future), name="model-load", daemon=True).start()
+        return future
+
+    def is_loaded(self, spec: ModelSpec) -> bool:
+        with self._lock:
+            future = self._loads.get(spec)
+        return future is not None and future.done() and future.exception() is None
+
+    def unload(self, spec: ModelSpec) -> None:
+        """Forget ``spec`` (a loaded model is freed once no agent references it; a failure is retried)."""
+        with self._lock:
+            self._loads.pop(spec, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model state ("loading", "loaded", "failed") with load time and memory."""
+        with self._lock:
+            loads = dict(self._loads)
+        stats = {}
+        for spec, future in loads.items():
+            key = spec.key
+            if not future.done():
+                stats[key] = {"state": "loading"}
+            elif future.exception() is not None:
+                stats[key] = {"state": "failed", "error": str(future.exception())}
+            else:
+                stats[key] = {"state": "loaded", **future.result().stats()}
+        return stats
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide model registry."""
+    return _registry
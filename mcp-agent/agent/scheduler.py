@@ -0,0 +1,132 @@
+"""
+Tool Call Scheduler
+Runs parsed tool calls concurrently, serializing only calls whose arguments reference
+an earlier call's output.
+"""
+
+import asyncio
+import re
+from typing import Dict, List, Any, Optional, Set, Callable, Awaitable
+
+
+# A string argument may reference an earlier call's response, e.g.
+# "${1.result.platform_allocation.tiktok}" (1-based call index, then a key/index path).
+REFERENCE_PATTERN = re.compile(r"\$\{(\d+)((?:\.[^.}]+)*)\}")
+
+
+def find_references(value: Any) -> Set[int]:
+    """Return the 0-based indices of the calls referenced anywhere inside ``value``."""
+    if isinstance(value, str):
+        return {int(match.group(1)) - 1 for match in REFERENCE_PATTERN.finditer(value)}
+    if isinstance(value, dict):
+        return set().union(*(find_references(v) for v in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(find_references(v) for v in value)) if value else set()
+    return set()
+
+
+def _lookup(response: Any, path: str) -> Any:
+    current = response
+    for key in filter(None, path.split(".")):
+        if isinstance(current, list):
+            current = current[int(key)]
+        else:
+            current = current[key]
+    return current
+
+
+def resolve_references(value: Any, results: List[Any]) -> Any:
+    """Substitute ``${n.path}`` references in ``value`` with data from earlier results.
+
+    A string that is exactly one reference is replaced by the referenced value itself
+    (keeping its type); references embedded in longer strings are formatted as text.
+    """
+    if isinstance(value, str):
+        match = REFERENCE_PATTERN.fullmatch(value)
+        if match:
+            return _lookup(results[int(match.group(1)) - 1], match.group(2))
+        return REFERENCE_PATTERN.sub(
+            lambda m: str(_lookup(results[int(m.group(1)) - 1], m.group(2))), value
+        )
+    if isinstance(value, dict):
+        return {k: resolve_references(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(v, results) for v in value]
+    return value
+
+
+class ToolCallScheduler:
+    """Dependency-aware fan-out of tool calls with bounded concurrency and per-call timeouts.
+
+    The calls of one scheduler form one sequence (``${N...}`` references count from its first
+    call): pass them all to ``run``, or ``start`` each one as soon as it is known.
+    """
+
+    def __init__(
+        self,
+        call_tool: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        max_concurrency: int = 4,
+        timeout: float = 30.0,
+        tool_timeouts: Optional[Dict[str, float]] = None
+    ):
+        self.call_tool = call_tool
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.tool_timeouts = dict(tool_timeouts or {})  # per-tool overrides of ``timeout``
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._results: List[Any] = []
+        self._tasks: List[asyncio.Task] = []
+
+    async def run(self, tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Execute ``tool_calls`` and return their responses in the original order."""
+        return list(await asyncio.gather(*[self.start(tool_call) for tool_call in tool_calls]))
+
+    def start(self, tool_call: Dict[str, Any]) -> asyncio.Task:
+        """Start ``tool_call`` as the next call of the sequence; the task returns its response.
+
+        Only calls it references are waited for, so a call can start while later ones are
+        still being generated.
+        """
+        index = len(self._tasks)
+        self._results.append(None)
+        task = asyncio.ensure_future(self._run_and_store(index, tool_call))
+        self._tasks.append(task)
+        return task
+
+    def cancel(self) -> None:
+        """Cancel the calls still running."""
+        for task in self._tasks:
+            task.cancel()
+
+    async def _run_and_store(self, index: int, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        self._results[index] = await self._run_call(index, tool_call)
+        return self._results[index]
+
+    async def _run_call(self, index: int, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        tool_name = tool_call["tool"]
+        dependencies = find_references(tool_call["args"])
+
+        # Only earlier calls may be referenced, so the dependency graph is acyclic
+        invalid = sorted(d + 1 for d in dependencies if d < 0 or d >= index)
+        if invalid:
+            return {"error": f"Invalid reference to tool call(s) {invalid}", "tool": tool_name}
+
+        if dependencies:
+            await asyncio.gather(*(self._tasks[d] for d in dependencies))
+            failed = sorted(d + 1 for d in dependencies if "error" in self._results[d])
+            if failed:
+                return {"error": f"Dependency failed: tool call(s) {failed}", "tool": tool_name}
+
+        try:
+            args = resolve_references(tool_call["args"], self._results)
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            return {"error": f"Could not resolve reference: {e!r}", "tool": tool_name}
+
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(self.call_tool(tool_name, args),
+                                              timeout=self.tool_timeouts.get(tool_name, self.timeout))
+            except asyncio.TimeoutError:
+                return {"error": "tool_call_timeout", "tool": tool_name}
+            except Exception as e:
+                return {"error": str(e), "tool": tool_name}
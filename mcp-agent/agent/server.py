@@ -0,0 +1,153 @@
+"""
+Agent Server
+HTTP front end serving many concurrent users from one agent (``python main.py agent-server``):
+each ``POST /query`` runs a full agent query, and the LLM generations of all in-flight
+queries are batched together on the shared model (agent/batching.py). ``POST /query/stream``
+sends the same query's progress as server-sent events: tool calls and results as they
+happen, then the answer token by token.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse
+from sse_starlette.sse import EventSourceResponse
+import uvicorn
+
+from agent.agent import AdvertisingAgent
+from agent.models import get_model_registry
+from mcp_impl.server import metrics_response
+
+
+class AgentServer:
+    """Concurrent agent queries over HTTP with bounded admission.
+
+    Up to ``max_concurrent_queries`` queries run at once (their tool calls overlap and their
+    generations share decode steps); further queries wait for a slot, and beyond
+    ``max_pending_queries`` in total the server answers 503 ``server_busy``.
+    """
+
+    def __init__(self, agent: AdvertisingAgent, max_concurrent_queries: int = 32,
+                 max_pending_queries: int = 256):
+        self.agent = agent
+        self.max_concurrent_queries = max_concurrent_queries
+        self.max_pending_queries = max_pending_queries
+        self._slots = asyncio.Semaphore(max_concurrent_queries)
+        self._pending = 0
+        self._running = 0
+        self.app = FastAPI(lifespan=self.lifespan)
+        self.setup_routes()
+
+    @asynccontextmanager
+    async def lifespan(self, app: FastAPI):
+        """Load the model before accepting queries, so the first ones do not all wait for it."""
+        await self.agent.ensure_model()
+        yield
+
+    def setup_routes(self):
+        @self.app.post("/query")
+        async def query(request: Request):
+            user_query = await self.read_query(request)
+            if self._pending >= self.max_pending_queries:
+                return self.busy_response()
+            started = time.perf_counter()
+            self._pending += 1
+            try:
+                async with self._slots:
+                    self._running += 1
+                    try:
+                        response = await self.agent.process_user_query(user_query)
+                    finally:
+                        self._running -= 1
+            except Exception as e:
+                return JSONResponse(status_code=500, content={"error": str(e), "status": "error"})
+            finally:
+                self._pending -= 1
+            return {
+                "query": user_query,
+                "response": response,
+                "elapsed_ms": round(1000 * (time.perf_counter() - started), 1),
+                "status": "success"
+            }
+
+        @self.app.post("/query/stream")
+        async def query_stream(request: Request):
+            user_query = await self.read_query(request)
+            if self._pending >= self.max_pending_queries:
+                return self.busy_response()
+            started = time.perf_counter()
+
+            async def event_generator():
+                # One event per agent.stream_query event ("plan", "tool_call", "tool_result",
+                # "token", "done"); a client disconnect closes the stream and cancels the query.
+                # The query is counted here, before the first await, not before returning the
+                # response: a client that disconnects before the stream starts never gets here
+                if self._pending >= self.max_pending_queries:
+                    yield {"event": "error", "data": json.dumps({"error": "server_busy", "retry_after": 1, "status": "error"})}
+                    return
+                self._pending += 1
+                try:
+                    async with self._slots:
+                        self._running += 1
+                        try:
+                            async for event in self.agent.stream_query(user_query):
+                                if event["type"] == "done":
+                                    event = {**event, "elapsed_ms": round(1000 * (time.perf_counter() - started), 1)}
+                                yield {"event": event["type"], "data": json.dumps(event, ensure_ascii=False)}
+                        finally:
+                            self._running -= 1
+                except Exception as e:
+                    yield {"event": "error", "data": json.dumps({"error": str(e), "status": "error"})}
+                finally:
+                    self._pending -= 1
+
+            return EventSourceResponse(event_generator())
+
+        @self.app.get("/health")
+        async def health():
+            return {"status": "ok", "model_loaded": self.agent.model_loaded, **self.query_stats()}
+
+        @self.app.get("/stats")
+        async def stats():
+            return {"queries": self.query_stats(), "models": get_model_registry().stats()}
+
+        @self.app.get("/metrics")
+        async def metrics(request: Request):
+            return metrics_response(request)
+
+    @staticmethod
+    async def read_query(request: Request) -> str:
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            data = None
+        user_query = data.get("query") if isinstance(data, dict) else None
+        if not isinstance(user_query, str) or not user_query.strip():
+            raise HTTPException(status_code=400, detail='Body must be {"query": "..."}')
+        return user_query
+
+    @staticmethod
+    def busy_response() -> JSONResponse:
+        # Backpressure: tell the client to retry later instead of queueing unboundedly
+        return JSONResponse(
+            status_code=503,
+            content={"error": "server_busy", "retry_after": 1, "status": "error"},
+            headers={"Retry-After": "1"}
+        )
+
+    def query_stats(self) -> Dict[str, Any]:
+        return {
+            "queries_running": self._running,
+            "queries_waiting": self._pending - self._running,
+            "max_concurrent_queries": self.max_concurrent_queries,
+        }
+
+    async def run(self, host: str = "127.0.0.1", port: int = 8100):
+        """Run the agent server."""
+        config = uvicorn.Config(self.app, host=host, port=port)
+        server = uvicorn.Server(config)
+        await server.serve()
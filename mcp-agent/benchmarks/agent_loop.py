@@ -0,0 +1,168 @@
+"""
+Agent Loop Benchmark
+Runs whole agent queries (plan generation, tool calls, final generation) and reports
+end-to-end latency and throughput, time to the answer's first token (queries are streamed),
+plus the per-stage breakdown from the agent metrics.
+
+Defaults to the ``stub`` inference backend, so no model is downloaded; ``--prefill-tps`` /
+``--decode-tps`` give the stub a simulated generation speed.
+
+Usage: python -m benchmarks.agent_loop [--queries 50] [--concurrency 1] [--mode stdio]
+       [--backend stub] [--prefill-tps 0] [--decode-tps 0] [--cache] [--prefix-cache 4]
+       [--max-batch-size 8] [--output PATH]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from typing import Dict, Any, List
+
+import yaml
+
+from benchmarks.transports import ROOT, percentile, start_http_server, stop_server, wait_for_port, free_port
+
+QUERIES = [
+    "10万美元投东南亚TikTok广告，应该怎么分配预算？",
+    "How should a $100,000 budget be allocated for TikTok ads in Southeast Asia?",
+    "Plan a 2 weeks campaign on Facebook and Instagram in Europe with 50k, and check compliance of the ad copy.",
+    "We have $20,000 for Google and TikTok in North America for 30 days.",
+]
+
+
+def write_config(args: argparse.Namespace, port: int) -> str:
+    """Copy of the config with the benchmark's backend, mode and port; tracing off, no pre-warm.
+
+    The queries repeat, so tool result caching is off unless ``--cache`` asks for it.
+    """
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    llm = config.setdefault("llm", {})
+    llm.update({"backend": args.backend, "prewarm": False})
+    if args.model:
+        llm["model"] = args.model
+    options = dict(llm.get("backend_options") or {}) if args.backend == llm.get("backend") else {}
+    if args.backend == "stub":
+        options.update({"prefill_tps": args.prefill_tps, "decode_tps": args.decode_tps})
+    options["prefix_cache"] = args.prefix_cache
+    options["max_batch_size"] = args.max_batch_size
+    llm["backend_options"] = options
+    config["mode"] = args.mode
+    if not args.cache:
+        for tool in (config.get("tools") or {}).values():
+            tool["cache"] = False
+    config.setdefault("server", {})["port"] = port
+    config["metrics"] = {**(config.get("metrics") or {}), "enabled": True, "dump_interval": 0}
+    config["tracing"] = {**(config.get("tracing") or {}), "enabled": False}
+    fd, path = tempfile.mkstemp(prefix="mcp-agent-bench-", suffix=".yaml")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from agent.agent import create_advertising_agent_from_config
+    from mcp_impl.metrics import get_metrics
+
+    port = free_port()
+    config = write_config(args, port)
+    os.environ["MCP_AGENT_CONFIG"] = config  # read by the stdio server the agent spawns
+    server = None
+    try:
+        if args.mode != "stdio":
+            # The agent's sse/streamhttp clients speak the legacy JSON API
+            server = start_http_server(args.mode, config, args.workers, app="legacy")
+            await wait_for_port(port, server)
+        agent = await create_advertising_agent_from_config(config)
+        latencies: List[float] = []
+        first_tokens: List[float] = []
+        try:
+            # Load the model and start the tool server before timing
+            with contextlib.redirect_stdout(io.StringIO()):
+                await agent.ensure_model()
+                for query in QUERIES:
+                    await agent.process_user_query(query)
+            get_metrics().reset()
+
+            remaining = list(range(args.queries))
+
+            async def worker():
+                while remaining:
+                    n = remaining.pop()
+                    started = time.perf_counter()
+                    first_token = None
+                    async for event in agent.stream_query(QUERIES[n % len(QUERIES)]):
+                        if event["type"] == "token" and first_token is None:
+                            first_token = time.perf_counter() - started
+                    latencies.append(time.perf_counter() - started)
+                    first_tokens.append(first_token if first_token is not None else latencies[-1])
+
+            started = time.perf_counter()
+            # The agent and clients print every response; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+        finally:
+            await agent.close()
+    finally:
+        if server is not None:
+            stop_server(server)
+        os.unlink(config)
+
+    latencies.sort()
+    first_tokens.sort()
+    snapshot = get_metrics().snapshot()
+    return {
+        "backend": args.backend,
+        "mode": args.mode,
+        "queries": len(latencies),
+        "concurrency": args.concurrency,
+        "cache": args.cache,
+        "prefix_cache": args.prefix_cache,
+        "max_batch_size": args.max_batch_size,
+        "throughput_qps": round(len(latencies) / elapsed, 2),
+        "generated_tokens_per_second": round(
+            sum(entry["value"] for entry in snapshot.get("agent_llm_completion_tokens_total", [])) / elapsed, 1),
+        "latency_ms": {f"p{q}": round(1000 * percentile(latencies, q), 3) for q in (50, 95, 99)},
+        "first_token_ms": {f"p{q}": round(1000 * percentile(first_tokens, q), 3) for q in (50, 95, 99)},
+        "stages": {
+            "llm": snapshot.get("agent_llm_duration_seconds", []),
+            "llm_first_token": snapshot.get("agent_llm_time_to_first_token_seconds", []),
+            "prompt_tokens": snapshot.get("agent_llm_prompt_tokens_total", []),
+            "batch_size": snapshot.get("agent_llm_batch_size", []),
+            "tool_calls": snapshot.get("mcp_client_request_duration_seconds", []),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the full agent loop")
+    parser.add_argument("--queries", type=int, default=50, help="Queries to run")
+    parser.add_argument("--concurrency", type=int, default=1, help="Queries in flight at once")
+    parser.add_argument("--mode", choices=["stdio", "sse", "streamhttp"], default="stdio", help="MCP transport")
+    parser.add_argument("--workers", type=int, default=2, help="Pre-forked server workers for sse/streamhttp")
+    parser.add_argument("--backend", default="stub", help="Inference backend (stub needs no model)")
+    parser.add_argument("--model", help="Model for the backend (default: llm.model from the config)")
+    parser.add_argument("--prefill-tps", type=float, default=0.0, help="Stub prompt processing speed, tokens/s")
+    parser.add_argument("--decode-tps", type=float, default=0.0, help="Stub generation speed, tokens/s")
+    parser.add_argument("--cache", action="store_true", help="Keep tool result caching on")
+    parser.add_argument("--prefix-cache", type=int, default=4, help="Backend prefix (KV) cache entries; 0 disables")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Generations decoded together; 1 disables batching")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config", "config.yaml"), help="Base configuration")
+    parser.add_argument("--output", help="Also write the result to this JSON file")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Serialization Benchmark
+Compares the available MCP serializers on real tool payloads.
+
+Usage: python -m benchmarks.serialization [--repeat N] [--json]
+"""
+
+import argparse
+import json
+import time
+import warnings
+from typing import Dict, Any, List, Callable
+
+from tools.ad_tools import TOOL_EXECUTORS
+from mcp_impl.serialization import SERIALIZERS, to_builtin
+
+
+def sample_requests() -> Dict[str, Dict[str, Any]]:
+    """Representative tool calls, from small single results to large sweeps."""
+    platforms = ["tiktok", "facebook", "google", "instagram"]
+    return {
+        "effect_analyzer": {
+            "tool": "effect_analyzer",
+            "args": {"platform": "tiktok", "budget": 5000, "target_audience": "young adults", "campaign_type": "conversion"},
+        },
+        "budget_calculator": {
+            "tool": "budget_calculator",
+            "args": {"budget": 10000, "platforms": platforms, "region": "europe", "duration_days": 30},
+        },
+        "compliance_batch_checker": {
+            "tool": "compliance_batch_checker",
+            "args": {
+                "platform": "tiktok", "region": "europe", "target_audience": "children",
+                "ad_contents": [f"Variant {i}: free shipping, money back guarantee" for i in range(200)],
+            },
+        },
+        "scenario_sweep": {
+            "tool": "scenario_sweep",
+            "args": {
+                "budget": [1000.0 + 10 * i for i in range(1000)],
+                "platforms": [platforms[:1 + i % 4] for i in range(1000)],
+                "region": ["europe"] * 1000,
+                "duration_days": [30] * 1000,
+            },
+        },
+    }
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    """Best-of-3 mean time per call in microseconds."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1e6
+
+
+def run(repeat: int = 200) -> List[Dict[str, Any]]:
+    rows = []
+    for name, request in sample_requests().items():
+        result = TOOL_EXECUTORS[request["tool"]](**request["args"])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            dict_us = _time(result.dict, repeat) if hasattr(result, "dict") else None
+        dump_us = _time(lambda: to_builtin(result), repeat)
+        response = {"tool": request["tool"], "result": to_builtin(result), "status": "success", "id": 1}
+
+        for serializer in SERIALIZERS.values():
+            encoded = serializer.dumps(response)
+            rows.append({
+                "payload": name,
+                "serializer": serializer.name,
+                "bytes": len(encoded),
+                "encode_us": round(_time(lambda: serializer.dumps(response), repeat), 2),
+                "decode_us": round(_time(lambda: serializer.loads(encoded), repeat), 2),
+                "dict_us": round(dict_us, 2) if dict_us is not None else None,
+                "model_dump_us": round(dump_us, 2),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MCP serializers on real tool payloads")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per timing loop")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = parser.parse_args()
+
+    rows = run(args.repeat)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'payload':<26}{'serializer':<10}{'bytes':>10}{'encode us':>12}{'decode us':>12}{'dict() us':>12}{'model_dump us':>15}")
+    for row in rows:
+        print(f"{row['payload']:<26}{row['serializer']:<10}{row['bytes']:>10}{row['encode_us']:>12}"
+              f"{row['decode_us']:>12}{row['dict_us'] or '-':>12}{row['model_dump_us']:>15}")
+
+
+if __name__ == "__main__":
+    main()
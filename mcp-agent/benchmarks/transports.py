@@ -0,0 +1,471 @@
+"""
+Transport Benchmark
+Load-tests the stdio, SSE and streamable HTTP servers with a configurable tool mix and
+concurrency, reporting throughput, latency percentiles and server CPU / RSS per mode.
+
+Servers are started with ``main.py server --mode <mode> --app mcp`` (FastMCP) and driven
+with MCP client sessions. ``--stack legacy`` benchmarks the agent's own protocol instead:
+``main.py server --mode <mode> --app legacy --workers N`` for sse/streamhttp (pre-forked
+when N > 1), and the stdio server the agent spawns itself (``python -m mcp_impl.server``),
+driven with mcp_impl.client.
+
+Usage: python -m benchmarks.transports [--modes stdio sse streamhttp] [--concurrency 1 8 32]
+       [--duration 10] [--mix budget_calculator=2,effect_analyzer=2,compliance_checker=1]
+       [--stack mcp|legacy] [--output PATH] [--compare BASELINE.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple
+
+import yaml
+
+from benchmarks.serialization import sample_requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ["stdio", "sse", "streamhttp"]
+DEFAULT_MIX = "budget_calculator=2,effect_analyzer=2,compliance_checker=1"
+READY_TIMEOUT = 120.0  # seconds to wait for a server to start answering
+READY_LATENCY = 0.5  # a round of probe calls this fast means every worker has finished warming up
+SAMPLE_INTERVAL = 0.25  # seconds between server RSS samples
+
+CallTool = Callable[[str, Dict[str, Any]], Awaitable[bool]]
+
+
+def tool_calls() -> Dict[str, Dict[str, Any]]:
+    """Arguments for every tool a mix may name (the serialization benchmark's payloads plus checks)."""
+    calls = {name: request["args"] for name, request in sample_requests().items()}
+    calls["compliance_checker"] = {
+        "platform": "facebook", "region": "europe", "target_audience": "adults",
+        "ad_content": "Limited offer: free shipping on every order",
+    }
+    return calls
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """``"tool=weight,tool=weight"`` -> [(tool, weight)]; a bare tool name has weight 1."""
+    known = tool_calls()
+    mix = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in known:
+            raise ValueError(f"Unknown tool in mix: {name} (choose from {', '.join(known)})")
+        mix.append((name, float(weight or 1)))
+    if not mix:
+        raise ValueError("The tool mix is empty")
+    return mix
+
+
+def vary(args: Dict[str, Any], n: int) -> Dict[str, Any]:
+    """Make request ``n`` distinct so result caches do not answer every call."""
+    args = dict(args)
+    if isinstance(args.get("budget"), (int, float)):
+        args["budget"] = args["budget"] + n % 1000
+    elif isinstance(args.get("ad_content"), str):
+        args["ad_content"] = f"{args['ad_content']} #{n % 1000}"
+    return args
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+# --- Server process tree usage (Linux /proc; None elsewhere) ---
+
+_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _proc_stat(pid: int) -> Optional[Tuple[int, float, int]]:
+    """(ppid, cpu seconds, rss bytes) of one process, or None if it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    # Fields after "(comm)": state ppid ... utime(12) stime(13) ... rss(22)
+    return int(fields[1]), (int(fields[11]) + int(fields[12])) / _TICKS, int(fields[21]) * _PAGE
+
+
+def process_tree(root: int) -> Dict[int, Tuple[float, int]]:
+    """CPU seconds and RSS of ``root`` and all its descendants."""
+    stats = {}
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            stat = _proc_stat(int(entry))
+            if stat is not None:
+                stats[int(entry)] = stat
+                children.setdefault(stat[0], []).append(int(entry))
+    tree, stack = {}, [root]
+    while stack:
+        pid = stack.pop()
+        if pid in stats:
+            tree[pid] = stats[pid][1:]
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+class UsageSampler:
+    """Tracks CPU time and peak RSS of a server's process tree while a run is measured."""
+
+    def __init__(self, root: int, include_root: bool = True):
+        self.root = root
+        self.include_root = include_root  # False: the root is this harness (stdio servers are its children)
+        self.available = os.path.isdir("/proc")
+        self.peak_rss = 0
+        self._cpu_start: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _tree(self) -> Dict[int, Tuple[float, int]]:
+        tree = process_tree(self.root)
+        if not self.include_root:
+            tree.pop(self.root, None)
+        return tree
+
+    def _sample(self) -> Dict[int, Tuple[float, int]]:
+        tree = self._tree()
+        self.peak_rss = max(self.peak_rss, sum(rss for _, rss in tree.values()))
+        return tree
+
+    async def _run(self) -> None:
+        while True:
+            self._sample()
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    def start(self) -> None:
+        if self.available:
+            self._cpu_start = {pid: cpu for pid, (cpu, _) in self._sample().items()}
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self, elapsed: float) -> Dict[str, Any]:
+        if not self.available:
+            return {"server_cpu_percent": None, "server_rss_mb": None, "server_processes": None}
+        self._task.cancel()
+        tree = self._sample()
+        # Processes started during the run count from zero
+        cpu = sum(cpu - self._cpu_start.get(pid, 0.0) for pid, (cpu, _) in tree.items())
+        return {
+            "server_cpu_percent": round(100 * cpu / elapsed, 1),
+            "server_rss_mb": round(self.peak_rss / 2 ** 20, 1),
+            "server_processes": len(tree),
+        }
+
+
+# --- Servers and clients ---
+
+def write_config(config_path: str, port: int, tracing: bool) -> str:
+    """Copy of the config with the benchmark port; metric dumps (and tracing) off."""
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config.setdefault("server", {})["port"] = port
+    config["metrics"] = {**(config.get("metrics") or {}), "dump_interval": 0}
+    if not tracing:
+        config["tracing"] = {**(config.get("tracing") or {}), "enabled": False}
+    fd, path = tempfile.mkstemp(prefix="mcp-bench-", suffix=".yaml")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_port(port: int, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} before accepting connections")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not listen on port {port} within {READY_TIMEOUT}s")
+
+
+def start_http_server(mode: str, config: str, workers: Optional[int] = None, app: str = "mcp") -> subprocess.Popen:
+    """``main.py server`` for ``mode``: the FastMCP app, or the legacy JSON API on ``workers`` processes."""
+    cmd = [sys.executable, "main.py", "server", "--mode", mode, "--app", app, "--config", config]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    return subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()  # Graceful drain
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def open_mcp_client(stack: AsyncExitStack, mode: str, config: str, port: int) -> CallTool:
+    """MCP client session against the FastMCP server ``main.py`` runs for ``mode``."""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+    from mcp.client.sse import sse_client
+    from mcp.client.streamable_http import streamablehttp_client
+
+    if mode == "stdio":
+        params = StdioServerParameters(command=sys.executable, cwd=ROOT,
+                                       args=["main.py", "server", "--mode", "stdio", "--app", "mcp", "--config", config])
+        read, write = await stack.enter_async_context(stdio_client(params, errlog=open(os.devnull, "w")))
+    elif mode == "sse":
+        read, write = await stack.enter_async_context(sse_client(f"http://127.0.0.1:{port}/sse"))
+    else:
+        read, write, _ = await stack.enter_async_context(streamablehttp_client(f"http://127.0.0.1:{port}/mcp"))
+    session = await stack.enter_async_context(ClientSession(read, write))
+    await session.initialize()
+
+    async def call(tool: str, args: Dict[str, Any]) -> bool:
+        result = await session.call_tool(tool, args)
+        return not result.isError
+
+    return call
+
+
+async def open_legacy_client(stack: AsyncExitStack, mode: str, config: str, port: int) -> CallTool:
+    """The agent's own client (mcp_impl.client) for ``mode``."""
+    from mcp_impl.client import MCPClientFactory
+
+    if mode == "stdio":
+        os.environ["MCP_AGENT_CONFIG"] = config
+        client = MCPClientFactory.create_client("stdio", server_command=f"{sys.executable} -m mcp_impl.server")
+        await client.start_server()
+    else:
+        client = MCPClientFactory.create_client(mode, base_url=f"http://127.0.0.1:{port}")
+    stack.push_async_callback(client.close)
+
+    async def call(tool: str, args: Dict[str, Any]) -> bool:
+        return (await client.send_request({"tool": tool, "args": args})).get("status") == "success"
+
+    return call
+
+
+async def wait_until_ready(call: CallTool, tool: str, probes: int) -> None:
+    """Send rounds of concurrent probe calls until one completes quickly.
+
+    Pre-forked workers accept connections before their tool process pools are warm, so
+    an open port alone does not mean the server is ready.
+    """
+    args = tool_calls()[tool]
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            ok = await asyncio.gather(*(call(tool, args) for _ in range(probes)))
+        except Exception:
+            ok = [False]
+        if all(ok) and time.perf_counter() - started < READY_LATENCY:
+            return
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server was not ready within {READY_TIMEOUT}s")
+
+
+# --- Load generation ---
+
+async def drive(call: CallTool, mix: List[Tuple[str, float]], concurrency: int,
+                duration: float, warmup: float, seed: int = 0) -> Dict[str, Any]:
+    """Closed-loop load: ``concurrency`` callers issue requests back to back.
+
+    Calls finishing during the first ``warmup`` seconds are not recorded.
+    """
+    calls = tool_calls()
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    errors = 0
+    counter = 0
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    async def caller():
+        nonlocal errors, counter
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            tool = rng.choices(names, weights)[0]
+            counter += 1
+            try:
+                ok = await call(tool, vary(calls[tool], counter))
+            except Exception:
+                ok = False
+            finished = time.perf_counter()
+            if finished >= measure_from and finished < stop_at:
+                latencies.append(finished - now)
+                errors += not ok
+
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "latency_ms": {
+            "mean": round(1000 * sum(latencies) / len(latencies), 3) if latencies else None,
+            **{f"p{q}": round(1000 * percentile(latencies, q), 3) if latencies else None for q in (50, 95, 99)},
+            "max": round(1000 * latencies[-1], 3) if latencies else None,
+        },
+    }
+
+
+async def bench_mode(mode: str, args: argparse.Namespace, mix: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+    """Start the server for ``mode`` once and run every concurrency level against it."""
+    legacy = args.stack == "legacy"
+    port = free_port()
+    config = write_config(args.config, port, args.tracing)
+    process = None
+    try:
+        async with AsyncExitStack() as stack:
+            if mode != "stdio":
+                if legacy:
+                    process = start_http_server(mode, config, args.workers, app="legacy")
+                else:
+                    process = start_http_server(mode, config)
+                await wait_for_port(port, process)
+            open_client = open_legacy_client if legacy else open_mcp_client
+            call = await open_client(stack, mode, config, port)
+            await wait_until_ready(call, mix[0][0], probes=4 * (args.workers if legacy else 1))
+
+            rows = []
+            for concurrency in args.concurrency:
+                # stdio servers are children of this harness; HTTP servers are their own tree
+                sampler = UsageSampler(process.pid if process else os.getpid(), include_root=process is not None)
+                client_cpu = time.process_time()
+                # Start sampling after the warm-up so only the measured window is counted
+                asyncio.get_running_loop().call_later(args.warmup, sampler.start)
+                result = await drive(call, mix, concurrency, args.duration, args.warmup)
+                usage = sampler.stop(args.duration)
+                row = {
+                    "mode": mode, "concurrency": concurrency, **result, **usage,
+                    "client_cpu_percent": round(100 * (time.process_time() - client_cpu) / (args.duration + args.warmup), 1),
+                }
+                rows.append(row)
+                print(format_row(row), flush=True)
+            return rows
+    finally:
+        if process is not None:
+            stop_server(process)
+        os.unlink(config)
+
+
+# --- Reporting ---
+
+HEADER = (f"{'mode':<12}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+          f"{'srv cpu%':>10}{'srv rss MB':>12}")
+
+
+def format_row(row: Dict[str, Any]) -> str:
+    def show(value: Any) -> str:
+        return "-" if value is None else str(value)
+
+    return (f"{row['mode']:<12}{row['concurrency']:>6}{row['throughput_rps']:>10}{show(row['latency_ms']['p50']):>10}"
+            f"{show(row['latency_ms']['p99']):>10}{row['errors']:>8}{show(row['server_cpu_percent']):>10}"
+            f"{show(row['server_rss_mb']):>12}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Print req/s and p99 changes against an earlier result file."""
+    before = {(row["mode"], row["concurrency"]): row for row in baseline["results"]}
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'}:")
+    print(f"{'mode':<12}{'conc':>6}{'req/s':>18}{'p99 ms':>22}")
+    for row in current["results"]:
+        old = before.get((row["mode"], row["concurrency"]))
+        if old is None:
+            continue
+
+        def delta(new: Optional[float], prev: Optional[float]) -> str:
+            if new is None or not prev:
+                return "-"
+            return f"{prev} -> {new} ({100 * (new - prev) / prev:+.1f}%)"
+
+        print(f"{row['mode']:<12}{row['concurrency']:>6}  {delta(row['throughput_rps'], old['throughput_rps']):>18}"
+              f"  {delta(row['latency_ms']['p99'], old['latency_ms']['p99']):>22}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP transports under load")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES, help="Transports to benchmark")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32], help="Concurrent callers per run")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted tool mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--stack", choices=["mcp", "legacy"], default="mcp",
+                        help="mcp: FastMCP servers + MCP sessions; legacy: the agent's protocol and clients")
+    parser.add_argument("--workers", type=int, default=2, help="Pre-forked workers for legacy sse/streamhttp")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config", "config.yaml"), help="Base configuration")
+    parser.add_argument("--tracing", action="store_true", help="Keep span tracing on in the servers")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/transports-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    mix = parse_mix(args.mix)
+
+    # Servers and the legacy stdio client resolve paths relative to the project root
+    os.chdir(ROOT)
+    print(HEADER)
+    rows = []
+    for mode in args.modes:
+        rows.extend(asyncio.run(bench_mode(mode, args, mix)))
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "stack": args.stack,
+            "workers": args.workers if args.stack == "legacy" else 1,
+            "mix": dict(mix),
+            "duration": args.duration,
+            "warmup": args.warmup,
+        },
+        "results": rows,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"transports-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,28 +9,62 @@ import argparse
 from pathlib import Path
 
 from agent.agent import create_advertising_agent_from_config, demo_advertising_agent
-from mcp_impl.server import run_stdio_server, run_sse_server, run_streamable_http_server
+from mcp_impl.server import (
+    run_stdio_server, run_sse_server, run_streamable_http_server, configure_server_runtime, serve_workers,
+    MCPServerFactory
+)
 
+# Server apps: "mcp" is the FastMCP server (MCP client sessions); "legacy" is the JSON API of
+# mcp_impl/server.py (/execute, /jobs, /stream, /stats, /artifacts) the agent's own clients use
+SERVER_APPS = ["mcp", "legacy"]
 
-async def run_server(mode: str, config_path: str = "config/config.yaml"):
-    """Run MCP server in specified mode."""
+
+def load_config(config_path: str):
     import yaml
 
-    # Load config
     with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+        return yaml.safe_load(f)
+
+
+async def run_server(mode: str, config_path: str = "config/config.yaml", app: str = "mcp"):
+    """Run MCP server in specified mode (``app``: "mcp" for FastMCP, "legacy" for the JSON API)."""
+    config = load_config(config_path)
 
     host = config['server']['host']
     port = config['server']['port']
+    configure_server_runtime(config)
 
-    if mode == "stdio":
+    if mode not in ("stdio", "sse", "streamhttp"):
+        raise ValueError(f"Unsupported mode: {mode}")
+    if app == "legacy":
+        # The app every pre-forked worker serves (python main.py server --app legacy --workers N)
+        server = MCPServerFactory.create_server(mode)
+        if mode == "stdio":
+            await server.run()
+        else:
+            print(f"{'SSE' if mode == 'sse' else 'Streamable HTTP'} server running on http://{host}:{port}")
+            await server.run(host=host, port=port)
+    elif mode == "stdio":
         await run_stdio_server()
     elif mode == "sse":
         await run_sse_server(host=host, port=port)
-    elif mode == "streamhttp":
-        await run_streamable_http_server(host=host, port=port)
     else:
-        raise ValueError(f"Unsupported mode: {mode}")
+        await run_streamable_http_server(host=host, port=port)
+
+
+def run_server_workers(mode: str, workers: int, config_path: str = "config/config.yaml"):
+    """Run the SSE/streamable HTTP MCP server in ``workers`` pre-forked processes."""
+    config = load_config(config_path)
+
+    # Configure before forking so every worker inherits the same runtime settings
+    configure_server_runtime(config)
+    serve_workers(
+        mode,
+        host=config['server']['host'],
+        port=config['server']['port'],
+        workers=workers,
+        graceful_timeout=config['server'].get('graceful_timeout', 30)
+    )
 
 
 async def run_agent(config_path: str = "config/config.yaml"):
@@ -43,6 +77,26 @@ async def run_agent(config_path: str = "config/config.yaml"):
         await agent.close()
 
 
+async def run_agent_server(config_path: str = "config/config.yaml"):
+    """Serve agent queries over HTTP to many concurrent users."""
+    from agent.server import AgentServer
+
+    settings = load_config(config_path).get('agent_server') or {}
+    agent = await create_advertising_agent_from_config(config_path)
+
+    try:
+        server = AgentServer(
+            agent,
+            max_concurrent_queries=settings.get('max_concurrent_queries', 32),
+            max_pending_queries=settings.get('max_pending_queries', 256)
+        )
+        host, port = settings.get('host', '127.0.0.1'), settings.get('port', 8100)
+        print(f"Agent server running on http://{host}:{port}")
+        await server.run(host=host, port=port)
+    finally:
+        await agent.close()
+
+
 async def run_demo():
     """Run a demo of the advertising agent."""
     print("Running Advertising Agent Demo...")
@@ -53,8 +107,8 @@ def main():
     parser = argparse.ArgumentParser(description="Advertising Agent MCP Project")
     parser.add_argument(
         "command",
-        choices=["server", "agent", "demo"],
-        help="Command to run: server, agent, or demo"
+        choices=["server", "agent", "agent-server", "demo"],
+        help="Command to run: server, agent, agent-server, or demo"
     )
     parser.add_argument(
         "--mode",
@@ -62,6 +116,18 @@ def main():
         default="stdio",
         help="Communication mode for server (default: stdio)"
     )
+    parser.add_argument(
+        "--app",
+        choices=SERVER_APPS,
+        default=None,
+        help="Server app: mcp (FastMCP) or legacy (the JSON API the agent's clients use) (default: server.app or mcp)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Serve legacy sse/streamhttp from N pre-forked worker processes (default: server.workers or 1)"
+    )
     parser.add_argument(
         "--config",
         default="config/config.yaml",
@@ -76,9 +142,20 @@ def main():
         sys.exit(1)
 
     if args.command == "server":
-        asyncio.run(run_server(args.mode, args.config))
+        server_config = load_config(args.config)['server']
+        app = args.app or server_config.get('app', 'mcp')
+        workers = args.workers or server_config.get('workers', 1)
+        if workers > 1:
+            # FastMCP keeps its sessions in one process; only the legacy apps share state across workers
+            if app != "legacy" or args.mode == "stdio":
+                parser.error("--workers > 1 needs --app legacy and --mode sse or streamhttp")
+            run_server_workers(args.mode, workers, args.config)
+        else:
+            asyncio.run(run_server(args.mode, args.config, app))
     elif args.command == "agent":
         asyncio.run(run_agent(args.config))
+    elif args.command == "agent-server":
+        asyncio.run(run_agent_server(args.config))
     elif args.command == "demo":
         asyncio.run(run_demo())
 
@@ -0,0 +1,210 @@
+"""
+Tool Result Cache
+LRU + TTL cache for deterministic tool results, shared by the MCP servers and clients.
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+
+def _normalize(value: Any) -> Any:
+    # Integral floats and ints must produce the same key (100000 == 100000.0)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def canonical_key(tool_name: str, args: Dict[str, Any]) -> str:
+    """Build a canonical cache key for a tool call (order-insensitive for dict keys)."""
+    return tool_name + ":" + json.dumps(_normalize(args or {}), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class ToolResultCache:
+    """Thread-safe LRU cache with per-entry TTL for opted-in tools."""
+
+    def __init__(self, tools: Iterable[str] = (), max_entries: int = 1024, ttl_seconds: float = 300.0,
+                 tool_ttls: Optional[Dict[str, float]] = None):
+        self.tools = set(tools)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.tool_ttls = dict(tool_ttls or {})
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def enabled_for(self, tool_name: str) -> bool:
+        """Whether results of ``tool_name`` may be cached."""
+        return tool_name in self.tools and self.max_entries > 0
+
+    def get(self, tool_name: str, args: Dict[str, Any]) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss or expired entry."""
+        key = canonical_key(tool_name, args)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, tool_name: str, args: Dict[str, Any], value: Any) -> None:
+        """Store ``value`` for the call, evicting the least recently used entries."""
+        key = canonical_key(tool_name, args)
+        expires = time.monotonic() + self.tool_ttls.get(tool_name, self.ttl_seconds)
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "tools": sorted(self.tools),
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    @classmethod
+    def from_config(cls, cache_settings: Optional[Dict[str, Any]],
+                    tools_config: Optional[Dict[str, Any]]) -> "ToolResultCache":
+        """Build a cache from ``cache`` settings and per-tool ``cache: true`` opt-in flags."""
+        cache_settings = cache_settings or {}
+        tools = []
+        tool_ttls = {}
+        for name, settings in (tools_config or {}).items():
+            if isinstance(settings, dict) and settings.get("cache"):
+                tools.append(name)
+                if "cache_ttl" in settings:
+                    tool_ttls[name] = float(settings["cache_ttl"])
+        return cls(
+            tools=tools,
+            max_entries=int(cache_settings.get("max_entries", 1024)),
+            ttl_seconds=float(cache_settings.get("ttl_seconds", 300)),
+            tool_ttls=tool_ttls,
+        )
+
+
+class SharedToolResultCache(ToolResultCache):
+    """Result cache whose entries live in a multiprocessing manager, shared by pre-forked workers.
+
+    ``store`` maps keys to ``(expires_at, value)`` and ``index`` maps keys to insertion
+    times; both are manager dicts and ``lock`` a manager lock guarding eviction. Values
+    arrive unpickled, so no extra copies are needed. Hit/miss counters stay per process
+    (worker stats are aggregated separately) and eviction drops the oldest insertions.
+    """
+
+    def __init__(self, store, index, lock, tools: Iterable[str] = (), max_entries: int = 1024,
+                 ttl_seconds: float = 300.0, tool_ttls: Optional[Dict[str, float]] = None):
+        super().__init__(tools, max_entries, ttl_seconds, tool_ttls)
+        self._store = store
+        self._index = index
+        self._shared_lock = lock
+
+    def get(self, tool_name: str, args: Dict[str, Any]) -> Optional[Any]:
+        key = canonical_key(tool_name, args)
+        entry = self._store.get(key)
+        if entry is None or entry[0] < time.time():
+            if entry is not None:
+                self._store.pop(key, None)
+                self._index.pop(key, None)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry[1]
+
+    def put(self, tool_name: str, args: Dict[str, Any], value: Any) -> None:
+        key = canonical_key(tool_name, args)
+        now = time.time()
+        self._store[key] = (now + self.tool_ttls.get(tool_name, self.ttl_seconds), value)
+        self._index[key] = now
+        if len(self._index) > self.max_entries:
+            self._evict()
+
+    def _evict(self) -> None:
+        with self._shared_lock:
+            excess = len(self._index) - self.max_entries
+            if excess <= 0:
+                return
+            # Evict an extra 10% so the scan is amortized over many inserts
+            oldest = sorted(self._index.items(), key=lambda item: item[1])[:excess + self.max_entries // 10]
+            for key, _ in oldest:
+                self._store.pop(key, None)
+                self._index.pop(key, None)
+        with self._lock:
+            self.evictions += len(oldest)
+
+    def clear(self) -> None:
+        self._store.clear()
+        self._index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["size"] = len(self._store)
+        return stats
+
+
+_result_cache: Optional[ToolResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def configure_result_cache(cache_settings: Optional[Dict[str, Any]] = None,
+                           tools_config: Optional[Dict[str, Any]] = None) -> ToolResultCache:
+    """(Re)create the process-wide server-side result cache."""
+    global _result_cache
+    with _result_cache_lock:
+        _result_cache = ToolResultCache.from_config(cache_settings, tools_config)
+        return _result_cache
+
+
+def get_result_cache() -> ToolResultCache:
+    """Return the process-wide server-side result cache (caching nothing until configured)."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ToolResultCache()
+        return _result_cache
+
+
+def share_result_cache(store, index, lock) -> ToolResultCache:
+    """Move the process-wide cache onto shared storage, keeping its configured settings."""
+    global _result_cache
+    with _result_cache_lock:
+        current = _result_cache or ToolResultCache()
+        _result_cache = SharedToolResultCache(
+            store, index, lock,
+            tools=current.tools,
+            max_entries=current.max_entries,
+            ttl_seconds=current.ttl_seconds,
+            tool_ttls=current.tool_ttls,
+        )
+        return _result_cache
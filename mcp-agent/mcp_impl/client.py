@@ -4,18 +4,38 @@ Supports stdio, SSE, and streamable HTTP communication modes.
 """
 
 import asyncio
+import itertools
 import json
-import sys
-import subprocess
-from typing import Dict, Any, Optional
+import os
+import signal
+import time
+import uuid
+from typing import Dict, Any, Optional, List, AsyncIterator
 from abc import ABC, abstractmethod
 
 import httpx
 
+from mcp_impl.cache import ToolResultCache
+from mcp_impl.http_pool import HTTPClientSettings, ResilientCaller, get_http_client, get_http_settings
+from mcp_impl.metrics import observe_client_request
+from mcp_impl.tracing import get_tracer
+from mcp_impl.serialization import (
+    FrameBuffer, Serializer, encode_frame, get_serializer, preference_list, read_frame_async, text_serializer
+)
+
 
 class MCPClientInterface(ABC):
     """Abstract interface for MCP clients."""
 
+    # Optional client-side result cache; identical cacheable calls never leave the process
+    result_cache: Optional[ToolResultCache] = None
+    # Transport label for client metrics
+    transport = "unknown"
+
+    def enable_result_cache(self, cache: ToolResultCache) -> None:
+        """Attach a client-side result cache."""
+        self.result_cache = cache
+
     @abstractmethod
     async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Send request to server."""
@@ -26,45 +46,233 @@ class MCPClientInterface(ABC):
         """Handle server response."""
         pass
 
+    async def call_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a single tool, answering from the client-side result cache when possible."""
+        cache = self.result_cache
+        if cache is not None and cache.enabled_for(tool_name):
+            cached = cache.get(tool_name, tool_args)
+            if cached is not None:
+                return {"tool": tool_name, "result": cached, "status": "success", "cached": True}
+
+        tracer = get_tracer()
+        started = time.perf_counter()
+        response: Dict[str, Any] = {"error": "tool_execution_cancelled", "status": "error"}
+        with tracer.span("mcp.client.call_tool", "client",
+                         {"mcp.tool": tool_name, "mcp.transport": self.transport}) as span:
+            try:
+                # The server continues this trace from the envelope's ``trace`` field
+                response = await self.send_request(tracer.inject({"tool": tool_name, "args": tool_args}))
+            except Exception as e:
+                response = {"error": str(e), "status": "error"}
+                raise
+            finally:
+                observe_client_request(self.transport, tool_name, response, time.perf_counter() - started)
+                if span is not None:
+                    span.record_response(response)
+
+        if cache is not None and cache.enabled_for(tool_name) and response.get("status") == "success":
+            cache.put(tool_name, tool_args, response["result"])
+        return response
+
+    async def send_batch(self, requests: List[Dict[str, Any]], ordered: bool = True) -> List[Dict[str, Any]]:
+        """Send several tool calls in one round-trip; the server runs them concurrently.
+
+        Each returned response carries the ``index`` of its request. With ``ordered``
+        results follow request order, otherwise they come back in completion order.
+        """
+        tracer = get_tracer()
+        with tracer.span("mcp.client.send_batch", "client",
+                         {"mcp.transport": self.transport, "mcp.batch_size": len(requests)}):
+            response = await self.send_request(tracer.inject({"batch": requests, "ordered": ordered}))
+        if "batch" not in response:
+            raise RuntimeError(f"Batch request failed: {response.get('error', response)}")
+        return response["batch"]
+
+
+def _http_serializer(name: Optional[str]) -> Serializer:
+    """Serializer for an HTTP client; "auto" (or None) means the fastest JSON encoder."""
+    return get_serializer(name) if name and name != "auto" else text_serializer()
+
+
+class PooledHTTPClient:
+    """Shared pieces of the HTTP clients: pooled connections plus retry / hedging policy.
+
+    ``base_url`` may be a list; the first entry is the primary server and the rest
+    (together with ``settings.base_urls``) are used for failover and hedged requests.
+    Unless given its own ``httpx.AsyncClient``, the client borrows the process-wide pool.
+    """
+
+    def _init_http(self, base_url, timeout: int, settings: Optional[HTTPClientSettings],
+                   client: Optional[httpx.AsyncClient], tool_timeouts: Optional[Dict[str, float]] = None) -> None:
+        self.settings = settings or get_http_settings()
+        urls = [base_url] if isinstance(base_url, str) else list(base_url)
+        self.base_urls = list(dict.fromkeys(url.rstrip("/") for url in urls + self.settings.base_urls))
+        self.base_url = self.base_urls[0]
+        self.timeout = timeout
+        # Tools whose server-side deadline is longer than ``timeout`` get their own
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self.caller = ResilientCaller(self.base_urls, self.settings)
+        self._own_client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._own_client if self._own_client is not None else get_http_client()
+
+    def _timeout_for(self, request: Dict[str, Any]) -> float:
+        """HTTP timeout for a tool call (or the longest of a batch's calls)."""
+        tools = [item.get("tool") for item in request.get("batch") or []] or [request.get("tool")]
+        return max(self.tool_timeouts.get(tool, self.timeout) for tool in tools)
+
+    async def _close_http(self) -> None:
+        # The shared pool outlives any one client; only close a client we were handed
+        if self._own_client is not None:
+            await self._own_client.aclose()
+
+
+def _encode_body(serializer: Serializer, request: Dict[str, Any]) -> Dict[str, Any]:
+    """httpx keyword arguments for a request body and Accept header in ``serializer``'s encoding."""
+    return {
+        "content": serializer.dumps(request),
+        "headers": {"Content-Type": serializer.content_type, "Accept": serializer.content_type},
+    }
+
 
 class StdioMCPClient(MCPClientInterface):
-    """MCP Client using stdio communication."""
+    """MCP Client using stdio communication.
+
+    Requests are tagged with an ``id`` and multiplexed over a single server subprocess,
+    so many calls can be in flight at once and responses may complete out of order.
+    All subprocess I/O goes through asyncio streams and never blocks the event loop.
+
+    With ``serializer`` set ("auto" or a serializer name) the client negotiates the
+    encoding and ``framing`` ("line" or "length") with the server right after starting it;
+    otherwise it speaks newline-delimited JSON.
+    """
 
-    def __init__(self, server_command: str):
+    transport = "stdio"
+
+    # Upper bound for one response line (image payloads can be large)
+    STREAM_LIMIT = 64 * 1024 * 1024
+
+    def __init__(self, server_command: str, serializer: Optional[str] = None, framing: str = "line"):
         self.server_command = server_command
-        self.process: Optional[subprocess.Popen] = None
+        self.requested_serializer = serializer
+        self.requested_framing = framing
+        self.serializer = get_serializer("json")
+        self.framing = "line"
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader_task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def outstanding(self) -> int:
+        """Number of requests sent but not yet answered."""
+        return len(self._pending)
 
     async def start_server(self):
         """Start the stdio server process."""
         # Accept either a list of args or a string command. Prefer list for safety.
         cmd = self.server_command
         if isinstance(cmd, str):
-            # Default to using main.py entrypoint if a simple string was provided
-            # Split into args for Popen
+            # Split into args for create_subprocess_exec
             import shlex
             cmd = shlex.split(cmd)
 
-        self.process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=self.STREAM_LIMIT,
+            # Own process group, so a hard stop also reaches any processes the server started
+            start_new_session=True
         )
+        if self.requested_serializer:
+            await self._negotiate(process)
+        # Published only now: concurrent first callers must not write before negotiation ends
+        self.process = process
+        self._reader_task = asyncio.create_task(self._read_responses())
+
+    async def _negotiate(self, process: asyncio.subprocess.Process):
+        """Agree on serializer and framing before any pipelined traffic starts."""
+        offer = {
+            "serializers": list(preference_list(self.requested_serializer)),
+            "framings": [self.requested_framing, "line"],
+        }
+        process.stdin.write(encode_frame(json.dumps({"negotiate": offer}).encode("utf-8")))
+        await process.stdin.drain()
+        line = await process.stdout.readline()
+        try:
+            chosen = json.loads(line).get("negotiate")
+        except json.JSONDecodeError:
+            chosen = None
+        # Servers that do not understand negotiation answer with an error: stay on JSON lines
+        if chosen:
+            self.serializer = get_serializer(chosen["serializer"])
+            self.framing = chosen["framing"]
+
+    async def _read_responses(self):
+        """Route id-tagged responses from stdout to their waiting requests."""
+        try:
+            while True:
+                frame = await read_frame_async(self.process.stdout, self.framing)
+                if frame is None:
+                    break
+                try:
+                    response = self.serializer.loads(frame)
+                except Exception:
+                    response = None
+                if not isinstance(response, dict) or "id" not in response:
+                    # The server could not tell which request this answers: fail them all
+                    # rather than leave the one it rejected waiting forever
+                    error = response.get("error") if isinstance(response, dict) else "undecodable response"
+                    self._fail_pending(RuntimeError(f"stdio MCP server sent a reply without an id: {error}"))
+                    continue
+                future = self._pending.pop(response.pop("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            # Server exited: fail everything still waiting
+            self._fail_pending(ConnectionError("stdio MCP server closed its output"))
+
+    def _fail_pending(self, error: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
 
     async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Send request via stdin and receive response via stdout."""
         if not self.process:
-            await self.start_server()
-
-        request_json = json.dumps(request, ensure_ascii=False)
-        self.process.stdin.write(request_json + "\n")
-        self.process.stdin.flush()
-
-        response_line = self.process.stdout.readline().strip()
-        response = json.loads(response_line)
-
-        return response
+            async with self._start_lock:
+                if not self.process:
+                    await self.start_server()
+
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        payload = self.serializer.dumps({**request, "id": request_id})
+        try:
+            self.process.stdin.write(encode_frame(payload, self.framing))
+            await self.process.stdin.drain()
+            return await future
+        except asyncio.CancelledError:
+            # Caller gave up (e.g. its own timeout), possibly while the request was still
+            # being written: the frame is buffered in full, so let the server stop the work too
+            if self._pending.pop(request_id, None) is not None:
+                self._send_cancel(request_id)
+            raise
+        except Exception:
+            self._pending.pop(request_id, None)
+            raise
+
+    def _send_cancel(self, request_id: int) -> None:
+        try:
+            self.process.stdin.write(encode_frame(self.serializer.dumps({"cancel": request_id}), self.framing))
+        except Exception:
+            pass  # Server already gone
 
     async def handle_response(self, response: Dict[str, Any]) -> None:
         """Handle server response."""
@@ -73,21 +281,248 @@ class StdioMCPClient(MCPClientInterface):
         else:
             print(f"Client received result: {response}")
 
+    async def close(self):
+        """Stop the stdio server process."""
+        killed = False
+        if self.process:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                # wait() returns only once stdout is closed, which needs every process
+                # sharing it gone: processes the server started would outlive it otherwise
+                self._kill_server()
+                await self.process.wait()
+                killed = True
+            self.process = None
+        if self._reader_task:
+            if killed:
+                # Nothing more is coming from a killed server
+                self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+
+    def _kill_server(self) -> None:
+        """Kill the server and everything it started."""
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            # No process groups here (or the group is gone): the server alone then
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+
+class StdioMCPClientPool(MCPClientInterface):
+    """Pool of warm stdio server processes, balanced by least outstanding requests."""
+
+    transport = "stdio"
+
+    def __init__(self, server_command: str, size: int = 2, serializer: Optional[str] = None, framing: str = "line"):
+        self.server_command = server_command
+        self.clients = [StdioMCPClient(server_command, serializer, framing) for _ in range(max(1, size))]
+        self._start_lock = asyncio.Lock()
 
-class SSEMCPClient(MCPClientInterface):
-    """MCP Client using Server-Sent Events."""
+    async def start_server(self):
+        """Start (pre-warm) every server process in the pool."""
+        async with self._start_lock:
+            await asyncio.gather(*(client.start_server() for client in self.clients if not client.process))
 
-    def __init__(self, base_url: str, timeout: int = 30):
-        self.base_url = base_url.rstrip("/")
-        self.timeout = timeout
-        self.client = httpx.AsyncClient(timeout=timeout)
+    def _pick_client(self) -> StdioMCPClient:
+        return min(self.clients, key=lambda client: client.outstanding)
 
     async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Send request via HTTP POST."""
-        url = f"{self.base_url}/execute"
-        response = await self.client.post(url, json=request)
+        """Send request to the least-loaded server process."""
+        if not all(client.process for client in self.clients):
+            await self.start_server()
+        return await self._pick_client().send_request(request)
+
+    async def send_batch(self, requests: List[Dict[str, Any]], ordered: bool = True) -> List[Dict[str, Any]]:
+        """Split a batch across the pool's processes and merge the results."""
+        if not all(client.process for client in self.clients):
+            await self.start_server()
+
+        chunks = [list(range(i, len(requests), len(self.clients))) for i in range(len(self.clients))]
+        chunks = [chunk for chunk in chunks if chunk]
+
+        async def run_chunk(client: StdioMCPClient, indices: List[int]) -> List[Dict[str, Any]]:
+            responses = await client.send_batch([requests[i] for i in indices], ordered=ordered)
+            for response in responses:
+                response["index"] = indices[response["index"]]
+            return responses
+
+        clients = sorted(self.clients, key=lambda client: client.outstanding)
+        merged = [
+            response
+            for responses in await asyncio.gather(*(run_chunk(c, idx) for c, idx in zip(clients, chunks)))
+            for response in responses
+        ]
+        if ordered:
+            merged.sort(key=lambda response: response["index"])
+        return merged
+
+    async def handle_response(self, response: Dict[str, Any]) -> None:
+        """Handle server response."""
+        await self.clients[0].handle_response(response)
+
+    async def close(self):
+        """Stop all server processes."""
+        await asyncio.gather(*(client.close() for client in self.clients))
+
+
+class SSEMCPClient(PooledHTTPClient, MCPClientInterface):
+    """MCP Client using Server-Sent Events.
+
+    With ``use_session`` the client keeps one ``/sse`` event stream open, submits tool
+    calls as jobs via ``POST /jobs`` and receives their results over the stream, so many
+    concurrent calls share a single long-lived connection. Otherwise each call is a
+    synchronous ``POST /execute``.
+    """
+
+    transport = "sse"
+
+    FINAL_EVENTS = ("result", "error")
+
+    def __init__(self, base_url, timeout: int = 30, use_session: bool = False,
+                 serializer: Optional[str] = None, settings: Optional[HTTPClientSettings] = None,
+                 client: Optional[httpx.AsyncClient] = None, tool_timeouts: Optional[Dict[str, float]] = None):
+        self._init_http(base_url, timeout, settings, client, tool_timeouts)
+        self.use_session = use_session
+        # Body encoding for /execute and /jobs (events on the stream are always JSON)
+        self.serializer = _http_serializer(serializer)
+        self.session_id: Optional[str] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._session_ready: Optional[asyncio.Future] = None
+        self._jobs: Dict[str, asyncio.Queue] = {}
+        self._cancels: set = set()  # in-flight DELETE /jobs tasks for abandoned jobs
+
+    async def connect(self) -> str:
+        """Open the event stream (once) and return the session id."""
+        async with self._connect_lock:
+            if self._listener is None or self._listener.done():
+                self._session_ready = asyncio.get_running_loop().create_future()
+                self._listener = asyncio.create_task(self._listen())
+            # Shielded: a caller timing out must not cancel the session for everyone else
+            return await asyncio.shield(self._session_ready)
+
+    async def _listen(self):
+        """Read the event stream and route job events to their queues."""
+        try:
+            url = f"{self.base_url}/sse"
+            # No read timeout: the stream idles between keep-alive pings
+            async with self.client.stream("GET", url, timeout=httpx.Timeout(self.timeout, read=None)) as response:
+                response.raise_for_status()
+                event_type, data_lines = "message", []
+                async for line in response.aiter_lines():
+                    if line == "":
+                        if data_lines:
+                            self._dispatch(event_type, "\n".join(data_lines))
+                        event_type, data_lines = "message", []
+                    elif line.startswith(":"):
+                        continue
+                    else:
+                        name, _, value = line.partition(":")
+                        value = value[1:] if value.startswith(" ") else value
+                        if name == "event":
+                            event_type = value
+                        elif name == "data":
+                            data_lines.append(value)
+        except Exception as e:
+            if self._session_ready and not self._session_ready.done():
+                self._session_ready.set_exception(e)
+        finally:
+            # Stream ended before its session event: don't leave connect() waiting
+            if self._session_ready and not self._session_ready.done():
+                self._session_ready.set_exception(
+                    httpx.RemoteProtocolError("SSE stream closed before the session started"))
+            # Stream closed: fail every job still waiting for its result
+            self.session_id = None
+            for queue in self._jobs.values():
+                queue.put_nowait({"event": "error", "error": "SSE session closed", "status": "error"})
+            self._jobs.clear()
+
+    def _dispatch(self, event_type: str, data: str) -> None:
+        if event_type == "session":
+            self.session_id = text_serializer().loads(data)["session_id"]
+            if not self._session_ready.done():
+                self._session_ready.set_result(self.session_id)
+            return
+        if event_type == "ping":
+            return
+        payload = text_serializer().loads(data)
+        queue = self._jobs.get(payload.pop("job_id", None))
+        if queue is not None:
+            queue.put_nowait({"event": event_type, **payload})
+
+    async def stream_job(self, request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Submit a job and yield its progress/partial events, ending with the final response.
+
+        Intermediate frames carry an ``event`` key; the final frame has the regular
+        response shape. If the caller stops early (or is cancelled) the job is cancelled
+        on the server. The whole job, from connecting to the final frame, must finish
+        within the tool's timeout or ``asyncio.TimeoutError`` is raised.
+        """
+        timeout = self._timeout_for(request)
+        deadline = asyncio.get_running_loop().time() + timeout
+        session_id = await asyncio.wait_for(self.connect(), timeout)
+        job_id = uuid.uuid4().hex
+        # Register before submitting: events may arrive before the POST returns
+        queue: asyncio.Queue = asyncio.Queue()
+        self._jobs[job_id] = queue
+        finished = False
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/jobs", timeout=timeout,
+                **_encode_body(self.serializer, {**get_tracer().inject(request),
+                                                 "session_id": session_id, "job_id": job_id})
+            )
+            response.raise_for_status()
+            while True:
+                remaining = deadline - asyncio.get_running_loop().time()
+                frame = await asyncio.wait_for(queue.get(), max(remaining, 0))
+                if frame.get("event") in self.FINAL_EVENTS:
+                    finished = True
+                    frame.pop("event")
+                    yield frame
+                    break
+                yield frame
+        finally:
+            self._jobs.pop(job_id, None)
+            if not finished:
+                task = asyncio.ensure_future(self.cancel_job(job_id, session_id))
+                self._cancels.add(task)
+                task.add_done_callback(self._cancels.discard)
+
+    async def cancel_job(self, job_id: str, session_id: Optional[str] = None) -> bool:
+        """Ask the server to cancel a running session job; False if it was not running."""
+        try:
+            response = await self.client.delete(f"{self.base_url}/jobs/{job_id}", timeout=self.timeout,
+                                                params={"session_id": session_id or self.session_id})
+        except httpx.HTTPError:
+            return False
+        return response.status_code == 200
+
+    async def _execute_once(self, base_url: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.client.post(f"{base_url}/execute", timeout=self._timeout_for(request),
+                                          **_encode_body(self.serializer, request))
         response.raise_for_status()
-        return response.json()
+        return self.serializer.loads(response.content)
+
+    async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Send request as an SSE session job, or via HTTP POST to /execute (with retries)."""
+        if self.use_session:
+            # The session lives on the primary server, so retries reconnect there
+            return await self.caller.call(request, lambda base_url: self._run_job(request))
+
+        return await self.caller.call(request, lambda base_url: self._execute_once(base_url, request))
+
+    async def _run_job(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        final = None
+        async for frame in self.stream_job(request):
+            final = frame
+        return final
 
     async def handle_response(self, response: Dict[str, Any]) -> None:
         """Handle server response."""
@@ -97,34 +532,99 @@ class SSEMCPClient(MCPClientInterface):
             print(f"SSE Client received result: {response}")
 
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
-
-
-class StreamableHTTPMCPClient(MCPClientInterface):
-    """MCP Client using streamable HTTP."""
-
-    def __init__(self, base_url: str, timeout: int = 30):
-        self.base_url = base_url.rstrip("/")
-        self.timeout = timeout
-        self.client = httpx.AsyncClient(timeout=timeout)
+        """Close the event stream and the HTTP client."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._close_http()
+
+
+class StreamableHTTPMCPClient(PooledHTTPClient, MCPClientInterface):
+    """MCP Client using streamable HTTP.
+
+    ``serializer`` picks the wire encoding per connection: JSON serializers exchange
+    ``data:`` lines, ``"msgpack"`` switches the response to length-prefixed binary frames.
+    """
+
+    transport = "streamhttp"
+
+    def __init__(self, base_url, timeout: int = 30, serializer: Optional[str] = None,
+                 settings: Optional[HTTPClientSettings] = None, client: Optional[httpx.AsyncClient] = None,
+                 tool_timeouts: Optional[Dict[str, float]] = None):
+        self._init_http(base_url, timeout, settings, client, tool_timeouts)
+        self.serializer = _http_serializer(serializer)
+
+    async def _iter_frames(self, payload: Dict[str, Any], base_url: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """POST ``payload`` to /stream and yield each frame as it arrives."""
+        url = f"{base_url or self.base_url}/stream"
+        binary = self.serializer.binary
+        # Decode straight from the byte stream: no per-line str decoding or concatenation
+        frames = FrameBuffer("length" if binary else "line")
+        async with self.client.stream("POST", url, timeout=self._timeout_for(payload),
+                                      **_encode_body(self.serializer, payload)) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                for frame in frames.feed(chunk):
+                    if binary:
+                        yield self.serializer.loads(frame)
+                    elif frame.startswith(b"data: "):
+                        data = frame[6:]  # Remove "data: " prefix
+                        if data == b"[DONE]":
+                            return
+                        yield self.serializer.loads(data)
+
+    async def _send_once(self, base_url: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        final = None
+        async for frame in self._iter_frames(request, base_url):
+            if "event" not in frame:
+                final = frame
+        if final is None:
+            raise RuntimeError("Stream ended without a final response")
+        return final
 
     async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Send request via streaming HTTP POST."""
-        url = f"{self.base_url}/stream"
-        response = await self.client.post(url, json=request)
-        response.raise_for_status()
-
-        # Read streaming response
-        full_response = ""
-        async for line in response.aiter_lines():
-            if line.startswith("data: "):
-                data = line[6:]  # Remove "data: " prefix
-                if data == "[DONE]":
-                    break
-                full_response += data
-
-        return json.loads(full_response)
+        """Send request via streaming HTTP POST and return the final frame (with retries)."""
+        return await self.caller.call(request, lambda base_url: self._send_once(base_url, request))
+
+    async def stream_request(self, request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield progress/partial frames as the tool produces them, then the final response.
+
+        Frames with an ``event`` key ("progress" or "partial") are intermediate; the last
+        frame has the regular response shape.
+        """
+        async for frame in self._iter_frames(get_tracer().inject({**request, "stream": True})):
+            yield frame
+
+    async def fetch_artifact(self, artifact_uri: str, dest: Optional[str] = None) -> bytes:
+        """Download a generated artifact (e.g. an image handle's ``artifact_uri``) as chunked binary.
+
+        When ``dest`` is given the bytes are streamed to that file and b"" is returned.
+        """
+        url = f"{self.base_url}{artifact_uri}"
+        async with self.client.stream("GET", url, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if dest is None:
+                return b"".join([chunk async for chunk in response.aiter_bytes()])
+            with open(dest, "wb") as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+        return b""
+
+    async def send_batch(self, requests: List[Dict[str, Any]], ordered: bool = True) -> List[Dict[str, Any]]:
+        """Send a batch; unordered batches are streamed back one frame per completed call."""
+        if ordered:
+            return await super().send_batch(requests, ordered=True)
+
+        results = []
+        async for item in self._iter_frames(get_tracer().inject({"batch": requests, "ordered": False})):
+            if "index" not in item:
+                raise RuntimeError(f"Batch request failed: {item.get('error', item)}")
+            results.append(item)
+        return results
 
     async def handle_response(self, response: Dict[str, Any]) -> None:
         """Handle server response."""
@@ -134,8 +634,8 @@ class StreamableHTTPMCPClient(MCPClientInterface):
             print(f"Stream HTTP Client received result: {response}")
 
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
+        """Release the HTTP client."""
+        await self._close_http()
 
 
 class MCPClientFactory:
@@ -145,14 +645,22 @@ class MCPClientFactory:
     def create_client(mode: str, **kwargs) -> MCPClientInterface:
         """Create client instance based on communication mode."""
         if mode == "stdio":
-            server_command = kwargs.get("server_command", "python mcp_impl/server.py")
-            return StdioMCPClient(server_command)
+            server_command = kwargs.get("server_command", "python -m mcp_impl.server")
+            pool_size = kwargs.get("pool_size", 1)
+            serializer = kwargs.get("serializer")
+            framing = kwargs.get("framing", "line")
+            if pool_size > 1:
+                return StdioMCPClientPool(server_command, size=pool_size, serializer=serializer, framing=framing)
+            return StdioMCPClient(server_command, serializer=serializer, framing=framing)
         elif mode == "sse":
             base_url = kwargs.get("base_url", "http://127.0.0.1:8000")
-            return SSEMCPClient(base_url)
+            return SSEMCPClient(base_url, timeout=kwargs.get("timeout", 30), use_session=kwargs.get("use_session", False),
+                                serializer=kwargs.get("serializer"), settings=kwargs.get("settings"),
+                                tool_timeouts=kwargs.get("tool_timeouts"))
         elif mode == "streamhttp":
             base_url = kwargs.get("base_url", "http://127.0.0.1:8000")
-            return StreamableHTTPMCPClient(base_url)
+            return StreamableHTTPMCPClient(base_url, timeout=kwargs.get("timeout", 30), serializer=kwargs.get("serializer"),
+                                           settings=kwargs.get("settings"), tool_timeouts=kwargs.get("tool_timeouts"))
         else:
             raise ValueError(f"Unsupported mode: {mode}")
 
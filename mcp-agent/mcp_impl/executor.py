@@ -0,0 +1,505 @@
+"""
+Shared Tool Executor Pool
+Process-wide worker pool used by the legacy stdio, SSE and streamable HTTP servers.
+Each tool runs inline, on the thread pool or on a warm process pool, per its backend,
+under a per-tool deadline enforced with cancel tokens (threads) or by killing the worker (processes).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import concurrent.futures
+from dataclasses import dataclass, field
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from mcp_impl.metrics import observe_tool_call
+from mcp_impl.serialization import to_builtin
+from mcp_impl.tracing import Span, Tracer, get_tracer
+from tools.cancellation import CancelToken, ToolCancelledError, use_token
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the pool cannot accept more work (backpressure)."""
+
+    def __init__(self, tool_name: str, pending: int, limit: int):
+        super().__init__(f"Executor queue full ({pending}/{limit}) for tool '{tool_name}'")
+        self.tool_name = tool_name
+        self.pending = pending
+        self.limit = limit
+
+
+@dataclass
+class ExecutorConfig:
+    """Configuration for the shared tool executor pool."""
+    max_workers: int = 8
+    max_queue_depth: int = 64  # queued + running calls across all tools
+    tool_timeout: float = 30.0  # default deadline per call (seconds)
+    tool_timeouts: Dict[str, float] = field(default_factory=dict)  # per-tool deadlines
+    cancel_grace: float = 0.5  # seconds a timed-out process call gets to stop before it is killed
+    tool_concurrency: Dict[str, int] = field(default_factory=dict)
+    process_workers: int = 2  # warm worker processes for "process" tools (0 = use threads)
+    tool_backends: Dict[str, str] = field(default_factory=dict)  # per-tool backend overrides
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ExecutorConfig":
+        data = data or {}
+        return cls(
+            max_workers=int(data.get("max_workers", cls.max_workers)),
+            max_queue_depth=int(data.get("max_queue_depth", cls.max_queue_depth)),
+            tool_timeout=float(data.get("tool_timeout", cls.tool_timeout)),
+            tool_timeouts={name: float(t) for name, t in (data.get("tool_timeouts") or {}).items()},
+            cancel_grace=float(data.get("cancel_grace", cls.cancel_grace)),
+            tool_concurrency=dict(data.get("tool_concurrency") or {}),
+            process_workers=int(data.get("process_workers", cls.process_workers)),
+            tool_backends=dict(data.get("tool_backends") or {}),
+        )
+
+
+@dataclass
+class ToolStats:
+    """Per-tool execution counters and timings (seconds)."""
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    killed: int = 0  # timed-out process calls whose worker was killed
+    rejected: int = 0
+    queue_wait_total: float = 0.0
+    queue_wait_max: float = 0.0
+    execution_total: float = 0.0
+    execution_max: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        completed = max(self.calls, 1)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "killed": self.killed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": round(self.queue_wait_total / completed * 1000, 3),
+            "queue_wait_max_ms": round(self.queue_wait_max * 1000, 3),
+            "execution_avg_ms": round(self.execution_total / completed * 1000, 3),
+            "execution_max_ms": round(self.execution_max * 1000, 3),
+        }
+
+
+def _run_in_process(fn: Callable[..., Any], args: Dict[str, Any],
+                    deadline: Optional[float]) -> Tuple[Any, Optional[Exception], float, float]:
+    """Process-pool entry point: run the tool and ship back plain data (or its error) plus wall-clock timing."""
+    started = time.time()
+    # The worker only knows the deadline; tools polling it stop before they are killed
+    with use_token(CancelToken(deadline)):
+        try:
+            # Plain dicts/lists pickle much faster than Pydantic models
+            result = to_builtin(fn(**args))
+        except Exception as e:
+            # Returned, not raised, so a failed call is timed like a thread call
+            return None, e, started, time.time()
+    return result, None, started, time.time()
+
+
+def _init_process(pids: Any, initializer: Optional[Callable[..., None]], initargs: tuple) -> None:
+    """Process-pool initializer: report this worker's pid (for hard kills), then set up."""
+    pids.put(os.getpid())
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _warm_process() -> int:
+    time.sleep(0.05)  # Long enough that each warm-up task lands on a different worker
+    return os.getpid()
+
+
+class ToolExecutorPool:
+    """Long-lived thread and process pools with bounded queue depth and per-tool concurrency limits.
+
+    A tool's backend comes from ``config.tool_backends`` or the executor's ``backend``
+    attribute (see ``tools.ad_tools.ToolExecutor``); plain callables run on threads.
+    Worker processes are started with ``spawn`` and set up by ``process_initializer``.
+
+    Every call gets a CancelToken with its deadline (``tool_timeouts`` or ``tool_timeout``).
+    A timed-out or cancelled thread call cannot be stopped from outside: its token is
+    cancelled and it keeps its queue slot until the tool notices and returns. A timed-out or
+    cancelled process call that does not stop within ``cancel_grace`` gets the process pool
+    killed and replaced; other calls that were running on it are resubmitted once. Inline
+    calls cannot be interrupted at all, so a tool with its own ``tool_timeouts`` entry runs
+    on a thread instead.
+    """
+
+    def __init__(self, config: Optional[ExecutorConfig] = None,
+                 process_initializer: Optional[Callable[..., None]] = None, process_initargs: tuple = ()):
+        self.config = config or ExecutorConfig()
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.config.max_workers,
+            thread_name_prefix="mcp-tool"
+        )
+        self._process_initializer = process_initializer
+        self._process_initargs = process_initargs
+        self._process_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._process_pool_pid: Optional[int] = None
+        self._worker_pids: Dict[concurrent.futures.ProcessPoolExecutor, Any] = {}  # pool -> queue of pids
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._overrunning = 0  # timed-out or cancelled thread calls still running
+        # asyncio semaphores belong to the event loop that first waits on them
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tool_semaphores_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats: Dict[str, ToolStats] = {}
+
+    @property
+    def pending(self) -> int:
+        """Number of admitted calls that are queued or running."""
+        return self._pending
+
+    def _stats_for(self, tool_name: str) -> ToolStats:
+        stats = self._stats.get(tool_name)
+        if stats is None:
+            stats = self._stats[tool_name] = ToolStats()
+        return stats
+
+    def _semaphore_for(self, tool_name: str) -> Optional[asyncio.Semaphore]:
+        limit = self.config.tool_concurrency.get(tool_name)
+        if not limit:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._tool_semaphores_loop is not loop:
+                # A new event loop (e.g. another asyncio.run) gets fresh semaphores
+                self._tool_semaphores, self._tool_semaphores_loop = {}, loop
+            semaphore = self._tool_semaphores.get(tool_name)
+            if semaphore is None:
+                semaphore = self._tool_semaphores[tool_name] = asyncio.Semaphore(limit)
+            return semaphore
+
+    def backend_for(self, tool_name: str, fn: Callable[..., Any]) -> str:
+        backend = self.config.tool_backends.get(tool_name) or getattr(fn, "backend", "thread")
+        if backend == "process" and self.config.process_workers <= 0:
+            return "thread"
+        return self._interruptible(tool_name, backend)
+
+    def _interruptible(self, tool_name: str, backend: str) -> str:
+        # An inline call blocks the event loop until it returns, so no deadline can stop it
+        if backend == "inline" and tool_name in self.config.tool_timeouts:
+            return "thread"
+        return backend
+
+    def _get_process_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        # Created lazily and per process: a pool inherited through fork (pre-fork workers)
+        # belongs to the parent and must not be used
+        with self._lock:
+            if self._process_pool is None or self._process_pool_pid != os.getpid():
+                context = multiprocessing.get_context("spawn")
+                pids = context.SimpleQueue()
+                self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.config.process_workers,
+                    mp_context=context,
+                    initializer=_init_process,
+                    initargs=(pids, self._process_initializer, self._process_initargs),
+                )
+                self._process_pool_pid = os.getpid()
+                self._worker_pids = {self._process_pool: pids}  # pools from before a fork are not ours
+            return self._process_pool
+
+    def _kill_process_pool(self, pool: concurrent.futures.ProcessPoolExecutor) -> int:
+        """Kill ``pool``'s worker processes; the next process call starts a fresh pool.
+
+        Returns the number of processes killed (0 if they had all exited already).
+        """
+        with self._lock:
+            if self._process_pool is pool:
+                self._process_pool = None
+            pids = self._worker_pids.pop(pool, None)
+        killed = 0
+        for pid in self._drain_pids(pids):
+            try:
+                os.kill(pid, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+                killed += 1
+            except (ProcessLookupError, PermissionError):
+                pass  # Exited already
+        if not killed:
+            print("Warning: no live worker process found to kill in the tool process pool", file=sys.stderr)
+        pool.shutdown(wait=False, cancel_futures=True)
+        return killed
+
+    def _discard_process_pool(self, pool: concurrent.futures.ProcessPoolExecutor) -> None:
+        """Forget a broken pool so the next process call starts a fresh one."""
+        with self._lock:
+            if self._process_pool is pool:
+                self._process_pool = None
+            self._worker_pids.pop(pool, None)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _drain_pids(pids: Any) -> List[int]:
+        """Every pid the pool's workers reported (workers replaced after a crash included)."""
+        drained = []
+        while pids is not None and not pids.empty():
+            drained.append(pids.get())
+        return drained
+
+    def timeout_for(self, tool_name: str) -> float:
+        """The tool's deadline in seconds."""
+        return self.config.tool_timeouts.get(tool_name, self.config.tool_timeout)
+
+    def warm(self) -> None:
+        """Start every worker process now so the first CPU-heavy call doesn't pay for it."""
+        if self.config.process_workers <= 0:
+            return
+        pool = self._get_process_pool()
+        for future in [pool.submit(_warm_process) for _ in range(self.config.process_workers)]:
+            future.result()
+
+    def _admit(self, tool_name: str) -> None:
+        with self._lock:
+            if self._pending >= self.config.max_queue_depth:
+                self._stats_for(tool_name).rejected += 1
+                observe_tool_call(tool_name, "rejected")
+                raise ExecutorBusyError(tool_name, self._pending, self.config.max_queue_depth)
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, tool_name: str, fn: Callable[..., Any], args: Dict[str, Any],
+                  timeout: Optional[float] = None, backend: Optional[str] = None) -> Any:
+        """Run ``fn(**args)`` on the tool's backend (or ``backend`` if given).
+
+        ``timeout`` can only shorten the tool's configured deadline. Raises
+        ExecutorBusyError when the queue is full, asyncio.TimeoutError when the call
+        exceeds its deadline and ToolCancelledError when the tool stopped on request.
+        Process-backed tools return plain data.
+        """
+        backend = self._interruptible(tool_name, backend or self.backend_for(tool_name, fn))
+        limit = self.timeout_for(tool_name)
+        timeout = min(timeout, limit) if timeout else limit
+        token = CancelToken(time.time() + timeout)
+        self._admit(tool_name)
+        submitted = time.perf_counter()
+        timing: Dict[str, float] = {}
+        tracer = get_tracer()
+        span = tracer.start_span("tool.execute", attributes={"tool.name": tool_name, "tool.backend": backend}) \
+            if tracer.enabled else None
+
+        def _invoke():
+            timing["started"] = time.perf_counter()
+            try:
+                with use_token(token):
+                    return fn(**args)
+            finally:
+                timing["finished"] = time.perf_counter()
+
+        semaphore = self._semaphore_for(tool_name)
+        handed_off = False  # a thread call still running holds its slot until it returns
+        outcome = "success"
+        try:
+            if backend == "inline":
+                # Cheap tools: an executor hop would cost more than the call itself
+                return _invoke()
+
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                if backend == "process":
+                    return await self._run_process(tool_name, fn, args, token, submitted, timing)
+
+                future = self._pool.submit(_invoke)
+                try:
+                    return await asyncio.wait_for(asyncio.wrap_future(future), timeout=token.remaining())
+                except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                    token.cancel("timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled")
+                    if not future.done():
+                        handed_off = True
+                        self._hand_off(future, semaphore)
+                    raise
+            finally:
+                if semaphore is not None and not handed_off:
+                    semaphore.release()
+        except ToolCancelledError as e:
+            # The tool noticed its token; a passed deadline is reported as a timeout
+            outcome = "timeout" if e.reason == "timeout" else "cancelled"
+            with self._lock:
+                stats = self._stats_for(tool_name)
+                if e.reason == "timeout":
+                    stats.timeouts += 1
+                else:
+                    stats.cancelled += 1
+            if e.reason == "timeout":
+                raise asyncio.TimeoutError() from e
+            raise
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            with self._lock:
+                self._stats_for(tool_name).timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            token.cancel("cancelled")
+            with self._lock:
+                self._stats_for(tool_name).cancelled += 1
+            raise
+        except Exception:
+            outcome = "error"
+            with self._lock:
+                self._stats_for(tool_name).errors += 1
+            raise
+        finally:
+            if not handed_off:
+                self._release()
+            self._record(tool_name, submitted, timing, outcome)
+            if span is not None:
+                self._end_span(tracer, span, submitted, timing, outcome)
+
+    def _hand_off(self, future: concurrent.futures.Future, semaphore: Optional[asyncio.Semaphore]) -> None:
+        """Keep an abandoned thread call's queue slot (and tool slot) until it actually returns."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._overrunning += 1
+
+        def finished():
+            with self._lock:
+                self._overrunning -= 1
+            self._release()
+            if semaphore is not None:
+                semaphore.release()
+
+        def on_done(_):
+            try:
+                loop.call_soon_threadsafe(finished)
+            except RuntimeError:  # Event loop already closed
+                with self._lock:
+                    self._overrunning -= 1
+                self._release()
+
+        future.add_done_callback(on_done)
+
+    async def _run_process(self, tool_name: str, fn: Callable[..., Any], args: Dict[str, Any],
+                           token: CancelToken, submitted: float, timing: Dict[str, float]) -> Any:
+        for attempt in range(2):
+            pool = self._get_process_pool()
+            submitted_wall = time.time()
+            future = pool.submit(_run_in_process, getattr(fn, "fn", fn), args, token.deadline)
+            waiter = asyncio.wrap_future(future)
+            try:
+                result, error, started, finished = await asyncio.wait_for(asyncio.shield(waiter),
+                                                                          timeout=token.remaining())
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                token.cancel("timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled")
+                await self._stop_process_call(tool_name, pool, future, waiter)
+                raise
+            except BrokenProcessPool:
+                # Another call's worker was killed (or crashed): retry once on a fresh pool
+                self._discard_process_pool(pool)
+                if attempt or token.cancelled:
+                    raise
+                continue
+            # Translate the worker's wall-clock timing onto this process's clock
+            timing["started"] = submitted + (started - submitted_wall)
+            timing["finished"] = timing["started"] + (finished - started)
+            if error is not None:
+                raise error
+            return result
+
+    async def _stop_process_call(self, tool_name: str, pool: concurrent.futures.ProcessPoolExecutor,
+                                 future: concurrent.futures.Future, waiter: asyncio.Future) -> None:
+        """Stop an abandoned (timed-out or cancelled) process call so it frees its worker."""
+        # Whatever the abandoned call ends with is not reported
+        waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if future.cancel():
+            return  # Still queued
+        # Running: give the tool a moment to finish or notice its deadline, then kill the worker.
+        # Shielded so a second cancellation of the caller cannot skip the kill.
+        stop = asyncio.ensure_future(asyncio.wait({waiter}, timeout=self.config.cancel_grace))
+        try:
+            await asyncio.shield(stop)
+        except asyncio.CancelledError:
+            await stop
+        if not future.done() and self._kill_process_pool(pool):
+            with self._lock:
+                self._stats_for(tool_name).killed += 1
+
+    def _record(self, tool_name: str, submitted: float, timing: Dict[str, float], outcome: str) -> None:
+        started = timing.get("started")
+        if started is None:
+            observe_tool_call(tool_name, outcome)
+            return
+        queue_wait = started - submitted
+        execution = timing.get("finished", time.perf_counter()) - started
+        observe_tool_call(tool_name, outcome, queue_wait, execution)
+        with self._lock:
+            stats = self._stats_for(tool_name)
+            stats.calls += 1
+            stats.queue_wait_total += queue_wait
+            stats.queue_wait_max = max(stats.queue_wait_max, queue_wait)
+            stats.execution_total += execution
+            stats.execution_max = max(stats.execution_max, execution)
+
+    @staticmethod
+    def _end_span(tracer: Tracer, span: Span, submitted: float, timing: Dict[str, float], outcome: str) -> None:
+        # Queue wait and execution are attributes; the span itself covers both
+        span.set_attribute("tool.outcome", outcome)
+        if "started" in timing:
+            span.set_attribute("tool.queue_wait_ms", round((timing["started"] - submitted) * 1000, 3))
+            span.set_attribute("tool.execution_ms",
+                               round((timing.get("finished", time.perf_counter()) - timing["started"]) * 1000, 3))
+        if outcome != "success":
+            span.record_error(outcome)
+        tracer.end_span(span)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool occupancy and per-tool queue-wait vs execution timings."""
+        with self._lock:
+            return {
+                "max_workers": self.config.max_workers,
+                "process_workers": self.config.process_workers,
+                "max_queue_depth": self.config.max_queue_depth,
+                "pending": self._pending,
+                "overrunning": self._overrunning,
+                "tools": {name: stats.as_dict() for name, stats in self._stats.items()},
+            }
+
+    def shutdown_processes(self, wait: bool = True) -> None:
+        """Stop the worker processes (they are restarted lazily if needed again)."""
+        with self._lock:
+            pool, self._process_pool = self._process_pool, None
+            owned = self._process_pool_pid == os.getpid()
+            self._worker_pids.pop(pool, None)
+        if pool is not None and owned:
+            pool.shutdown(wait=wait)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the underlying worker threads and processes."""
+        self._pool.shutdown(wait=wait)
+        self.shutdown_processes(wait=wait)
+
+
+_executor_pool: Optional[ToolExecutorPool] = None
+_executor_pool_lock = threading.Lock()
+
+
+def configure_executor_pool(settings: Optional[Dict[str, Any]] = None,
+                            process_initializer: Optional[Callable[..., None]] = None,
+                            process_initargs: tuple = ()) -> ToolExecutorPool:
+    """(Re)create the process-wide executor pool from a config mapping."""
+    global _executor_pool
+    with _executor_pool_lock:
+        if _executor_pool is not None:
+            _executor_pool.shutdown(wait=False)
+        _executor_pool = ToolExecutorPool(ExecutorConfig.from_dict(settings), process_initializer, process_initargs)
+        return _executor_pool
+
+
+def get_executor_pool() -> ToolExecutorPool:
+    """Return the process-wide executor pool, creating it with defaults if needed."""
+    global _executor_pool
+    with _executor_pool_lock:
+        if _executor_pool is None:
+            _executor_pool = ToolExecutorPool()
+        return _executor_pool
@@ -0,0 +1,204 @@
+"""
+HTTP Connection Pool
+Shared keep-alive (HTTP/2 when available) connection pool for the MCP HTTP clients,
+with exponential-backoff retries and hedged requests across server URLs.
+"""
+
+import asyncio
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Callable, Awaitable
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Server replies that are worth retrying: overload and gateway hiccups
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+@dataclass
+class HTTPClientSettings:
+    """Connection pool, retry and hedging settings (``client`` section of config.yaml)."""
+    timeout: float = 30.0
+    http2: bool = True
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    retry_attempts: int = 3  # retries after the first attempt (idempotent tools only)
+    backoff_base: float = 0.1
+    backoff_max: float = 2.0
+    idempotent_tools: Optional[List[str]] = None  # None = every tool is safe to retry
+    base_urls: List[str] = field(default_factory=list)  # extra servers for failover / hedging
+    hedge_delay: Optional[float] = None  # seconds before a duplicate goes to the next URL
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "HTTPClientSettings":
+        data = data or {}
+        http = data.get("http") or {}
+        retry = data.get("retry") or {}
+        defaults = cls()
+        return cls(
+            timeout=float(data.get("timeout", defaults.timeout)),
+            http2=bool(http.get("http2", defaults.http2)),
+            max_connections=int(http.get("max_connections", defaults.max_connections)),
+            max_keepalive_connections=int(http.get("max_keepalive_connections", defaults.max_keepalive_connections)),
+            keepalive_expiry=float(http.get("keepalive_expiry", defaults.keepalive_expiry)),
+            retry_attempts=int(data.get("retry_attempts", defaults.retry_attempts)),
+            backoff_base=float(retry.get("backoff_base", defaults.backoff_base)),
+            backoff_max=float(retry.get("backoff_max", defaults.backoff_max)),
+            idempotent_tools=retry.get("idempotent_tools"),
+            base_urls=list(data.get("base_urls") or []),
+            hedge_delay=data.get("hedge_delay"),
+        )
+
+    def create_client(self) -> httpx.AsyncClient:
+        """A new pooled client; HTTP/2 is used only when the ``h2`` package is installed."""
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            http2=self.http2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+
+
+class ResilientCaller:
+    """Retries idempotent calls with full-jitter exponential backoff and hedges them across URLs.
+
+    Non-idempotent calls go to the primary URL once; only connection failures (the request
+    never reached the server) are retried for them.
+    """
+
+    def __init__(self, base_urls: List[str], settings: HTTPClientSettings):
+        self.base_urls = base_urls
+        self.settings = settings
+
+    def is_idempotent(self, request: Dict[str, Any]) -> bool:
+        allowed = self.settings.idempotent_tools
+        if allowed is None:
+            return True
+        if "batch" in request:
+            return all(item.get("tool") in allowed for item in request["batch"])
+        return request.get("tool") in allowed
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.settings.backoff_max, self.settings.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    @staticmethod
+    def _retryable_error(error: Exception, idempotent: bool) -> bool:
+        if isinstance(error, httpx.ConnectError):
+            return True
+        if not idempotent:
+            return False
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS
+        return isinstance(error, httpx.TransportError)
+
+    async def _hedged(self, send_once: Callable[[str], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Send to the primary URL; each ``hedge_delay`` without an answer, also try the next one."""
+        tasks: List[asyncio.Task] = []
+        errors: List[Exception] = []
+        try:
+            for index, base_url in enumerate(self.base_urls):
+                tasks.append(asyncio.create_task(send_once(base_url)))
+                last = index == len(self.base_urls) - 1
+                while True:
+                    pending = [task for task in tasks if not task.done()]
+                    if not pending:
+                        break
+                    done, _ = await asyncio.wait(
+                        pending, timeout=None if last else self.settings.hedge_delay,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        break  # Slow: hedge to the next URL
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        errors.append(task.exception())
+                    if not last:
+                        break  # Failed fast: move on to the next URL right away
+            raise errors[-1]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, request: Dict[str, Any],
+                   send_once: Callable[[str], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run ``send_once(base_url)`` under the retry / failover / hedging policy."""
+        idempotent = self.is_idempotent(request)
+        hedge = idempotent and self.settings.hedge_delay is not None and len(self.base_urls) > 1
+        attempts = 1 + max(0, self.settings.retry_attempts)
+
+        for attempt in range(attempts):
+            final = attempt == attempts - 1
+            try:
+                if hedge:
+                    response = await self._hedged(send_once)
+                else:
+                    # Plain retries rotate through the configured servers
+                    base_url = self.base_urls[attempt % len(self.base_urls)] if idempotent else self.base_urls[0]
+                    response = await send_once(base_url)
+            except Exception as e:
+                if final or not self._retryable_error(e, idempotent):
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+
+            # Backpressure from the server's executor pool: back off and try again
+            if idempotent and not final and isinstance(response, dict) and response.get("error") == "server_busy":
+                await asyncio.sleep(self.backoff(attempt, response.get("retry_after")))
+                continue
+            return response
+
+
+_settings = HTTPClientSettings()
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_pool_lock = threading.Lock()
+
+
+def configure_http_pool(settings: Optional[Dict[str, Any]] = None) -> HTTPClientSettings:
+    """Set the process-wide pool settings from the ``client`` config; the pool is rebuilt lazily."""
+    global _settings, _client, _client_loop
+    with _pool_lock:
+        _settings = HTTPClientSettings.from_dict(settings)
+        _client, _client_loop = None, None
+        return _settings
+
+
+def get_http_settings() -> HTTPClientSettings:
+    """Return the process-wide HTTP client settings."""
+    with _pool_lock:
+        return _settings
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared pooled client for the running event loop.
+
+    Connections are bound to an event loop, so a new loop gets a fresh pool.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        if _client is None or _client.is_closed or _client_loop is not loop:
+            _client, _client_loop = _settings.create_client(), loop
+        return _client
+
+
+async def close_http_pool() -> None:
+    """Close the shared client's connections (e.g. on shutdown)."""
+    global _client, _client_loop
+    with _pool_lock:
+        client, _client, _client_loop = _client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
@@ -0,0 +1,413 @@
+"""
+Metrics
+Process-wide counters and fixed-bucket latency/size histograms for the MCP servers, clients,
+tool executor and agent LLM calls, rendered in Prometheus text format or as JSON percentiles.
+"""
+
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple, Sequence
+
+# Seconds: 50us .. ~105s, doubling
+LATENCY_BUCKETS = tuple(0.00005 * 2 ** i for i in range(22))
+# Bytes: 64B .. 64MB, x4
+SIZE_BUCKETS = tuple(64 * 4 ** i for i in range(11))
+# Characters of LLM prompt / completion text
+TEXT_BUCKETS = tuple(256 * 2 ** i for i in range(10))
+# Requests per batched LLM step
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    """Monotonic counter per label combination."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def export(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(series: List[Dict[LabelValues, float]]) -> Dict[LabelValues, float]:
+        merged: Dict[LabelValues, float] = {}
+        for values in series:
+            for key, value in values.items():
+                merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+
+class Histogram:
+    """Fixed-bucket histogram per label combination; observing is one bisect and two adds."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per series: [count in each bucket..., count above the last bucket, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def export(self) -> Dict[LabelValues, List[float]]:
+        with self._lock:
+            return {key: list(series) for key, series in self._values.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(series: List[Dict[LabelValues, List[float]]]) -> Dict[LabelValues, List[float]]:
+        merged: Dict[LabelValues, List[float]] = {}
+        for values in series:
+            for key, counts in values.items():
+                total = merged.get(key)
+                merged[key] = list(counts) if total is None else [a + b for a, b in zip(total, counts)]
+        return merged
+
+    def quantile(self, counts: List[float], q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket (like PromQL)."""
+        total = sum(counts[:-1])
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0.0
+        for index, count in enumerate(counts[:-1]):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # Above the last bucket: report its bound
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """All metrics of this process; ``export`` / ``merge`` combine pre-forked workers."""
+
+    def __init__(self):
+        self.enabled = True
+        self._metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def export(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """Raw series of every metric (picklable, for sharing between processes)."""
+        return {name: metric.export() for name, metric in self._metrics.items()}
+
+    def reset(self) -> None:
+        """Drop every recorded series (e.g. after a benchmark's warm-up)."""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def merge(self, exports: List[Dict[str, Dict[LabelValues, Any]]]) -> Dict[str, Dict[LabelValues, Any]]:
+        return {
+            name: metric.merge([export.get(name, {}) for export in exports])
+            for name, metric in self._metrics.items()
+        }
+
+    def render_prometheus(self, values: Optional[Dict[str, Dict[LabelValues, Any]]] = None) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        values = self.export() if values is None else values
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, series in sorted(values.get(name, {}).items()):
+                labels = _format_labels(metric.labels, key)
+                if metric.type == "counter":
+                    lines.append(f"{name}{_wrap(labels)} {_number(series)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), series[:-1]):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                    lines.append(f"{name}_bucket{_wrap(labels, le)} {_number(cumulative)}")
+                lines.append(f"{name}_sum{_wrap(labels)} {_number(series[-1])}")
+                lines.append(f"{name}_count{_wrap(labels)} {_number(cumulative)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, values: Optional[Dict[str, Dict[LabelValues, Any]]] = None) -> Dict[str, Any]:
+        """JSON-friendly view: counter values and histogram count / mean / p50 / p95 / p99."""
+        values = self.export() if values is None else values
+        snapshot: Dict[str, Any] = {}
+        for name, metric in self._metrics.items():
+            entries = []
+            for key, series in sorted(values.get(name, {}).items()):
+                entry: Dict[str, Any] = dict(zip(metric.labels, key))
+                if metric.type == "counter":
+                    entry["value"] = series
+                else:
+                    count = sum(series[:-1])
+                    entry["count"] = count
+                    entry["mean"] = _round(series[-1] / count) if count else None
+                    for q in QUANTILES:
+                        entry[f"p{int(q * 100)}"] = _round(metric.quantile(series, q))
+                entries.append(entry)
+            if entries:
+                snapshot[name] = entries
+        return snapshot
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else float(f"{value:.4g}")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _wrap(labels: str, extra: str = "") -> str:
+    inner = ",".join(part for part in (labels, extra) if part)
+    return f"{{{inner}}}" if inner else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = MetricsRegistry()
+
+# Server side, per transport (stdio, sse, streamhttp; fastmcp-* for the FastMCP servers)
+SERVER_REQUESTS = REGISTRY.counter(
+    "mcp_server_requests_total", "Requests handled by the MCP servers", ("transport", "tool", "status"))
+SERVER_LATENCY = REGISTRY.histogram(
+    "mcp_server_request_duration_seconds", "Time from request decoded to response encoded", ("transport", "tool"))
+SERVER_REQUEST_BYTES = REGISTRY.histogram(
+    "mcp_server_request_size_bytes", "Encoded request size", ("transport", "tool"), SIZE_BUCKETS)
+SERVER_RESPONSE_BYTES = REGISTRY.histogram(
+    "mcp_server_response_size_bytes", "Encoded response size (all frames of a stream)", ("transport", "tool"), SIZE_BUCKETS)
+
+# Tool executor pool
+TOOL_CALLS = REGISTRY.counter(
+    "mcp_tool_calls_total", "Tool calls by outcome (success, error, timeout, cancelled, rejected)", ("tool", "outcome"))
+TOOL_QUEUE_WAIT = REGISTRY.histogram(
+    "mcp_tool_queue_wait_seconds", "Time a tool call waited for a worker", ("tool",))
+TOOL_EXECUTION = REGISTRY.histogram(
+    "mcp_tool_execution_seconds", "Time a tool call ran on its worker", ("tool",))
+
+# Client side
+CLIENT_REQUESTS = REGISTRY.counter(
+    "mcp_client_requests_total", "Tool calls sent by the MCP clients", ("transport", "tool", "status"))
+CLIENT_LATENCY = REGISTRY.histogram(
+    "mcp_client_request_duration_seconds", "Round-trip time of a tool call", ("transport", "tool"))
+
+# Agent LLM calls (stage: plan = tool-calling generation, final = answer generation)
+LLM_CALLS = REGISTRY.counter("agent_llm_calls_total", "LLM generations by stage and status", ("stage", "status"))
+LLM_LATENCY = REGISTRY.histogram("agent_llm_duration_seconds", "LLM generation time", ("stage",))
+LLM_FIRST_TOKEN = REGISTRY.histogram(
+    "agent_llm_time_to_first_token_seconds", "Time from queueing a generation to its first text", ("stage",))
+LLM_PROMPT_CHARS = REGISTRY.histogram(
+    "agent_llm_prompt_size_chars", "Prompt length after templating", ("stage",), TEXT_BUCKETS)
+LLM_COMPLETION_CHARS = REGISTRY.histogram(
+    "agent_llm_completion_size_chars", "Generated text length", ("stage",), TEXT_BUCKETS)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "agent_llm_prompt_tokens_total", "Prompt tokens by source (cached = reused KV state, prefilled = computed)",
+    ("stage", "source"))
+LLM_COMPLETION_TOKENS = REGISTRY.counter("agent_llm_completion_tokens_total", "Generated tokens", ("stage",))
+LLM_BATCH_SIZE = REGISTRY.histogram(
+    "agent_llm_batch_size", "Requests per batched step (phase: prefill, decode)", ("phase",), BATCH_BUCKETS)
+LLM_QUEUE_WAIT = REGISTRY.histogram("agent_llm_queue_wait_seconds", "Time a generation waited for a batch slot")
+
+# Agent model loads (agent/models.py registry)
+MODEL_LOADS = REGISTRY.counter("agent_model_loads_total", "Model loads by model and status", ("model", "status"))
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "agent_model_load_seconds", "Model load time", ("model",), buckets=tuple(0.1 * 2 ** i for i in range(16)))
+
+
+def response_status(response: Any) -> str:
+    """Short status label for a response dict: success, timeout, busy, cancelled or error."""
+    if not isinstance(response, dict) or response.get("status") != "error":
+        return "success"
+    return {
+        "tool_execution_timeout": "timeout",
+        "server_busy": "busy",
+        "tool_execution_cancelled": "cancelled",
+    }.get(response.get("error"), "error")
+
+
+def request_label(request: Dict[str, Any], known_tools) -> str:
+    """Tool label for a request; unknown names share one label to bound cardinality."""
+    if "batch" in request:
+        return "batch"
+    tool = request.get("tool")
+    return tool if tool in known_tools else "unknown"
+
+
+def observe_server_request(transport: str, tool: str, response: Any, seconds: float,
+                           request_bytes: Optional[int] = None, response_bytes: Optional[int] = None) -> None:
+    if not REGISTRY.enabled:
+        return
+    SERVER_REQUESTS.inc(transport, tool, response_status(response))
+    SERVER_LATENCY.observe(seconds, transport, tool)
+    if request_bytes is not None:
+        SERVER_REQUEST_BYTES.observe(request_bytes, transport, tool)
+    if response_bytes is not None:
+        SERVER_RESPONSE_BYTES.observe(response_bytes, transport, tool)
+
+
+def observe_tool_call(tool: str, outcome: str, queue_wait: Optional[float] = None,
+                      execution: Optional[float] = None) -> None:
+    if not REGISTRY.enabled:
+        return
+    TOOL_CALLS.inc(tool, outcome)
+    if queue_wait is not None:
+        TOOL_QUEUE_WAIT.observe(queue_wait, tool)
+    if execution is not None:
+        TOOL_EXECUTION.observe(execution, tool)
+
+
+def observe_client_request(transport: str, tool: str, response: Any, seconds: float) -> None:
+    if not REGISTRY.enabled:
+        return
+    CLIENT_REQUESTS.inc(transport, tool, response_status(response))
+    CLIENT_LATENCY.observe(seconds, transport, tool)
+
+
+def observe_llm_call(stage: str, status: str, seconds: float, prompt_chars: int,
+                     completion_chars: Optional[int] = None, prompt_tokens: Optional[int] = None,
+                     cached_tokens: int = 0, completion_tokens: int = 0) -> None:
+    if not REGISTRY.enabled:
+        return
+    LLM_CALLS.inc(stage, status)
+    LLM_LATENCY.observe(seconds, stage)
+    LLM_PROMPT_CHARS.observe(prompt_chars, stage)
+    if completion_chars is not None:
+        LLM_COMPLETION_CHARS.observe(completion_chars, stage)
+    if prompt_tokens is not None:
+        LLM_PROMPT_TOKENS.inc(stage, "cached", amount=cached_tokens)
+        LLM_PROMPT_TOKENS.inc(stage, "prefilled", amount=prompt_tokens - cached_tokens)
+        LLM_COMPLETION_TOKENS.inc(stage, amount=completion_tokens)
+
+
+def observe_llm_first_token(stage: str, seconds: float) -> None:
+    if REGISTRY.enabled:
+        LLM_FIRST_TOKEN.observe(seconds, stage)
+
+
+def observe_llm_step(phase: str, batch_size: int) -> None:
+    if REGISTRY.enabled:
+        LLM_BATCH_SIZE.observe(batch_size, phase)
+
+
+def observe_llm_queue_wait(seconds: float) -> None:
+    if REGISTRY.enabled:
+        LLM_QUEUE_WAIT.observe(seconds)
+
+
+def observe_model_load(model: str, status: str, seconds: float) -> None:
+    if not REGISTRY.enabled:
+        return
+    MODEL_LOADS.inc(model, status)
+    MODEL_LOAD_SECONDS.observe(seconds, model)
+
+
+class MetricsDumper:
+    """Background thread appending a JSON snapshot every ``interval`` seconds (stdio mode).
+
+    Writes to ``path`` (one JSON object per line) or to stderr; stdout carries the protocol.
+    """
+
+    def __init__(self, interval: float, path: Optional[str] = None):
+        self.interval = interval
+        self.path = os.path.expanduser(path) if path else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def dump(self) -> None:
+        line = json.dumps({"timestamp": time.time(), "pid": os.getpid(), "metrics": REGISTRY.snapshot()},
+                          ensure_ascii=False)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        else:
+            print(line, file=sys.stderr, flush=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def start(self) -> "MetricsDumper":
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread and write a final snapshot."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.dump()
+
+
+_settings: Dict[str, Any] = {}
+_settings_lock = threading.Lock()
+
+
+def configure_metrics(settings: Optional[Dict[str, Any]] = None) -> None:
+    """Apply the ``metrics`` section of config.yaml (enabled, dump_interval, dump_path)."""
+    global _settings
+    with _settings_lock:
+        _settings = dict(settings or {})
+        REGISTRY.enabled = bool(_settings.get("enabled", True))
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return REGISTRY
+
+
+def start_metrics_dump() -> Optional[MetricsDumper]:
+    """Start the periodic dump configured under ``metrics``; None when disabled."""
+    with _settings_lock:
+        settings = dict(_settings)
+    interval = float(settings.get("dump_interval") or 0)
+    if not REGISTRY.enabled or interval <= 0:
+        return None
+    return MetricsDumper(interval, settings.get("dump_path")).start()
@@ -0,0 +1,215 @@
+"""
+MCP Message Serialization
+Pluggable encoders (stdlib json, orjson, msgspec, MessagePack) and stdio framing,
+negotiated per connection.
+"""
+
+import asyncio
+import json
+import struct
+from typing import Dict, Any, Optional, Sequence, List, BinaryIO
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional fast path
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:  # optional binary encoding
+    msgpack = None
+
+FRAMINGS = ("line", "length")
+# Length-prefixed frames: 4-byte big-endian payload size, then the payload
+_LENGTH_PREFIX = struct.Struct(">I")
+
+
+def to_builtin(result: Any) -> Any:
+    """Turn a tool result into plain Python data, using Pydantic v2 ``model_dump`` when available."""
+    if hasattr(result, "model_dump"):
+        return result.model_dump()
+    if hasattr(result, "dict"):
+        return result.dict()
+    return result
+
+
+class Serializer:
+    """Encodes messages to bytes and back."""
+
+    name = "json"
+    content_type = "application/json"
+    # Binary encodings may contain newlines and need length-prefixed framing on stdio
+    binary = False
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data) -> Any:
+        return json.loads(data)
+
+    def dumps_text(self, obj: Any) -> str:
+        """Encode to ``str`` for text channels (SSE ``data:`` lines); JSON encodings only."""
+        return self.dumps(obj).decode("utf-8")
+
+
+class OrjsonSerializer(Serializer):
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+    def loads(self, data) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecJSONSerializer(Serializer):
+    name = "msgspec"
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data) -> Any:
+        return self._decoder.decode(data)
+
+
+class MsgpackSerializer(Serializer):
+    name = "msgpack"
+    content_type = "application/msgpack"
+    binary = True
+
+    def __init__(self):
+        if msgspec is not None:
+            self._dumps, self._loads = msgspec.msgpack.Encoder().encode, msgspec.msgpack.Decoder().decode
+        else:
+            self._dumps = lambda obj: msgpack.packb(obj, use_bin_type=True)
+            self._loads = lambda data: msgpack.unpackb(data, raw=False)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._dumps(obj)
+
+    def loads(self, data) -> Any:
+        return self._loads(data)
+
+    def dumps_text(self, obj: Any) -> str:
+        raise TypeError("msgpack is a binary encoding and cannot be sent as text")
+
+
+def _available_serializers() -> Dict[str, Serializer]:
+    serializers = {"json": Serializer()}
+    if orjson is not None:
+        serializers["orjson"] = OrjsonSerializer()
+    if msgspec is not None:
+        serializers["msgspec"] = MsgspecJSONSerializer()
+    if msgspec is not None or msgpack is not None:
+        serializers["msgpack"] = MsgpackSerializer()
+    return serializers
+
+
+SERIALIZERS = _available_serializers()
+# Fastest first; "auto" negotiates down this list
+PREFERENCE = [name for name in ("msgpack", "orjson", "msgspec", "json") if name in SERIALIZERS]
+
+
+def get_serializer(name: Optional[str] = None) -> Serializer:
+    """Serializer by name; unknown or missing names fall back to stdlib json."""
+    return SERIALIZERS.get(name or "json", SERIALIZERS["json"])
+
+
+def text_serializer() -> Serializer:
+    """Fastest available JSON serializer, for channels that must carry text."""
+    for name in PREFERENCE:
+        if not SERIALIZERS[name].binary:
+            return SERIALIZERS[name]
+    return SERIALIZERS["json"]
+
+
+def for_content_type(content_type: Optional[str]) -> Serializer:
+    """Serializer for an HTTP Content-Type / Accept header (JSON unless msgpack is asked for)."""
+    if content_type and "msgpack" in content_type and "msgpack" in SERIALIZERS:
+        return SERIALIZERS["msgpack"]
+    return text_serializer()
+
+
+def preference_list(serializer: Optional[str]) -> Sequence[str]:
+    """Expand a configured serializer ("auto" or a name) into the list offered during negotiation."""
+    if not serializer or serializer == "auto":
+        return PREFERENCE
+    return [serializer, "json"]
+
+
+def negotiate(offered: Sequence[str], framings: Sequence[str]) -> Dict[str, str]:
+    """Pick the first offered serializer and framing this side supports.
+
+    Binary serializers are only chosen together with length-prefixed framing.
+    """
+    framing = next((f for f in framings if f in FRAMINGS), "line")
+    for name in offered:
+        serializer = SERIALIZERS.get(name)
+        if serializer is not None and (framing == "length" or not serializer.binary):
+            return {"serializer": name, "framing": framing}
+    return {"serializer": "json", "framing": framing}
+
+
+def encode_frame(payload: bytes, framing: str = "line") -> bytes:
+    """Frame one encoded message for a byte stream."""
+    if framing == "length":
+        return _LENGTH_PREFIX.pack(len(payload)) + payload
+    return payload + b"\n"
+
+
+def read_frame(stream: BinaryIO, framing: str = "line") -> Optional[bytes]:
+    """Blocking read of one frame from a binary stream; None at EOF."""
+    if framing == "length":
+        header = stream.read(_LENGTH_PREFIX.size)
+        if len(header) < _LENGTH_PREFIX.size:
+            return None
+        return stream.read(_LENGTH_PREFIX.unpack(header)[0])
+    line = stream.readline()
+    return line or None
+
+
+async def read_frame_async(reader, framing: str = "line") -> Optional[bytes]:
+    """Read one frame from an ``asyncio.StreamReader``; None at EOF."""
+    if framing == "length":
+        try:
+            header = await reader.readexactly(_LENGTH_PREFIX.size)
+            return await reader.readexactly(_LENGTH_PREFIX.unpack(header)[0])
+        except asyncio.IncompleteReadError:
+            return None
+    line = await reader.readline()
+    return line or None
+
+
+class FrameBuffer:
+    """Incrementally split a byte stream (e.g. an HTTP response body) into frames."""
+
+    def __init__(self, framing: str = "line"):
+        self.framing = framing
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Add ``chunk`` and return every frame it completes."""
+        self._buffer += chunk
+        if self.framing == "line":
+            *frames, self._buffer = self._buffer.split(b"\n")
+            return frames
+
+        frames, offset, size = [], 0, len(self._buffer)
+        while size - offset >= _LENGTH_PREFIX.size:
+            length = _LENGTH_PREFIX.unpack_from(self._buffer, offset)[0]
+            end = offset + _LENGTH_PREFIX.size + length
+            if end > size:
+                break
+            frames.append(self._buffer[offset + _LENGTH_PREFIX.size:end])
+            offset = end
+        self._buffer = self._buffer[offset:]
+        return frames
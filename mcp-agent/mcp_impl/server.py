@@ -4,72 +4,364 @@ Simplified implementation using FastMCP for all communication modes.
 """
 
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request as StarletteRequest
 from tools.ad_tools import TOOL_EXECUTORS
+from mcp_impl.metrics import get_metrics, observe_server_request, observe_tool_call, start_metrics_dump
+from mcp_impl.tracing import get_tracer
 
 
-def create_mcp_server() -> FastMCP:
+def create_mcp_server(transport: str = "stdio") -> FastMCP:
     """Create and configure FastMCP server with advertising tools."""
 
     # Create FastMCP server
     server = FastMCP("advertising-agent")
 
+    def run_tool(name: str, **kwargs):
+        # Tools run directly here (no executor pool); record them under the transport
+        started = time.perf_counter()
+        response = {"status": "success"}
+        try:
+            with get_tracer().span("tool.execute", "server", {"tool.name": name, "mcp.transport": transport}):
+                return TOOL_EXECUTORS[name](**kwargs)
+        except Exception:
+            response = {"status": "error"}
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            observe_tool_call(name, response["status"], 0.0, elapsed)
+            observe_server_request(transport, name, response, elapsed)
+
+    @server.custom_route("/metrics", methods=["GET"])
+    async def metrics(request: StarletteRequest):
+        return metrics_response(request)
+
     # Add tools using decorators
     @server.tool()
     def budget_calculator(budget: float, platforms: list[str], region: str, duration_days: int):
         """Calculate optimal budget allocation for advertising campaigns across multiple platforms."""
-        return TOOL_EXECUTORS["budget_calculator"](budget=budget, platforms=platforms, region=region, duration_days=duration_days)
+        return run_tool("budget_calculator", budget=budget, platforms=platforms, region=region, duration_days=duration_days)
 
     @server.tool()
     def effect_analyzer(platform: str, budget: float, target_audience: str, campaign_type: str):
         """Analyze expected performance metrics for advertising campaigns."""
-        return TOOL_EXECUTORS["effect_analyzer"](platform=platform, budget=budget, target_audience=target_audience, campaign_type=campaign_type)
+        return run_tool("effect_analyzer", platform=platform, budget=budget, target_audience=target_audience, campaign_type=campaign_type)
 
     @server.tool()
     def compliance_checker(platform: str, region: str, ad_content: str, target_audience: str):
         """Check advertising content compliance with regional regulations."""
-        return TOOL_EXECUTORS["compliance_checker"](platform=platform, region=region, ad_content=ad_content, target_audience=target_audience)
+        return run_tool("compliance_checker", platform=platform, region=region, ad_content=ad_content, target_audience=target_audience)
+
+    @server.tool()
+    def compliance_batch_checker(platform: str, region: str, ad_contents: list[str], target_audience: str):
+        """Check many ad content variants for compliance with regional regulations in one call."""
+        return run_tool("compliance_batch_checker", platform=platform, region=region, ad_contents=ad_contents, target_audience=target_audience)
+
+    @server.tool()
+    def scenario_sweep(budget: list[float], platforms: list[list[str]], region: list[str], duration_days: list[int]):
+        """Evaluate many budget allocation and performance scenarios at once (columnar inputs)."""
+        return run_tool("scenario_sweep", budget=budget, platforms=platforms, region=region, duration_days=duration_days)
 
     @server.tool()
-    def var_image_generator(prompt: str, width: int = 1024, height: int = 1024, style: str | None = None):
+    def budget_optimizer(
+        budget: float,
+        platforms: list[str],
+        duration_days: int,
+        objective: str = "conversions",
+        min_spend: dict[str, float] | None = None,
+        max_spend: dict[str, float] | None = None,
+        max_daily_spend: dict[str, float] | None = None
+    ):
+        """Optimize budget allocation to maximize expected conversions or reach under spend constraints."""
+        return run_tool(
+            "budget_optimizer", budget=budget, platforms=platforms, duration_days=duration_days, objective=objective,
+            min_spend=min_spend, max_spend=max_spend, max_daily_spend=max_daily_spend
+        )
+
+    @server.tool()
+    def var_image_generator(prompt: str, width: int = 1024, height: int = 1024, style: str | None = None, inline: bool = False):
         """Generate advertising images from text prompts (VAR) using the registered executor."""
         # Delegate to executor
-        return TOOL_EXECUTORS["var_image_generator"](prompt=prompt, width=width, height=height, style=style)
+        return run_tool("var_image_generator", prompt=prompt, width=width, height=height, style=style, inline=inline)
 
     return server
 
 
 # Convenience functions for different modes
 async def run_stdio_server():
-    """Run MCP server in stdio mode."""
-    server = create_mcp_server()
-    await server.run_stdio_async()
+    """Run MCP server in stdio mode (metrics are dumped per ``metrics.dump_interval``)."""
+    server = create_mcp_server("stdio")
+    dumper = start_metrics_dump()
+    try:
+        await server.run_stdio_async()
+    finally:
+        if dumper is not None:
+            dumper.stop()
 
 
 async def run_sse_server(host: str = "127.0.0.1", port: int = 8000):
     """Run MCP server in SSE mode."""
-    server = create_mcp_server()
+    server = create_mcp_server("sse")
+    # FastMCP takes the bind address from its settings
+    server.settings.host, server.settings.port = host, port
     print(f"SSE server running on http://{host}:{port}")
-    await server.run_sse_async(host=host, port=port)
+    await server.run_sse_async()
 
 
 async def run_streamable_http_server(host: str = "127.0.0.1", port: int = 8000):
     """Run MCP server in streamable HTTP mode."""
-    server = create_mcp_server()
+    server = create_mcp_server("streamhttp")
+    server.settings.host, server.settings.port = host, port
     print(f"Streamable HTTP server running on http://{host}:{port}")
-    await server.run_streamable_http_async(host=host, port=port)
+    await server.run_streamable_http_async()
 
 import asyncio
 import json
+import re
 import sys
-from typing import Dict, Any, Optional
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List, AsyncIterator, ContextManager
 from abc import ABC, abstractmethod
 
-from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse
+from starlette.concurrency import iterate_in_threadpool
 from sse_starlette.sse import EventSourceResponse
 import uvicorn
 
-from tools.ad_tools import AD_TOOLS, TOOL_EXECUTORS
+from tools.ad_tools import AD_TOOLS, TOOL_EXECUTORS, TOOL_STREAMERS, configure_tools
+from mcp_impl.executor import ExecutorBusyError, configure_executor_pool, get_executor_pool
+from mcp_impl.cache import configure_result_cache, get_result_cache
+from tools.artifact_store import get_artifact_store
+from tools.cancellation import ToolCancelledError
+from mcp_impl.workers import (
+    cluster_metrics, cluster_stats, get_shared_state, get_worker_id, read_inbox, serve_prefork
+)
+from mcp_impl.metrics import (
+    configure_metrics, get_metrics, observe_server_request, request_label, start_metrics_dump
+)
+from mcp_impl.tracing import Span, Tracer, configure_tracing, flush_tracing
+from mcp_impl.serialization import (
+    encode_frame, for_content_type, get_serializer, negotiate, read_frame, text_serializer, to_builtin
+)
+
+
+def configure_server_runtime(config: Dict[str, Any]) -> None:
+    """Configure the shared executor pool, result cache and tools from the YAML config."""
+    server_config = config.get('server', {})
+    tools_config = config.get('tools') or {}
+    configure_tools(tools_config)
+    configure_metrics(config.get('metrics'))
+    configure_tracing(config.get('tracing'), service_name="mcp-server")
+    # Tool worker processes apply the same tools config when they start
+    configure_executor_pool(server_config.get('executor'), configure_tools, (tools_config,))
+    configure_result_cache(server_config.get('cache'), tools_config)
+
+
+@asynccontextmanager
+async def server_lifespan(app: FastAPI):
+    """Warm the tool process pool before the HTTP servers accept requests; stop it on shutdown."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, get_executor_pool().warm)
+    yield
+    # Pre-forked workers exit without running atexit hooks, so stop the processes explicitly
+    await loop.run_in_executor(None, get_executor_pool().shutdown_processes)
+    flush_tracing()
+
+
+def server_span(transport: str, request: Dict[str, Any], executors: Dict[str, Any]) -> ContextManager[Optional[Span]]:
+    """Server span for one request, continuing the caller's trace from the envelope's ``trace`` field."""
+    return get_tracer().span("mcp.server.request", "server",
+                             {"mcp.transport": transport, "mcp.tool": request_label(request, executors)},
+                             parent=Tracer.extract(request))
+
+
+async def execute_tool_request(executors: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a single tool request on the shared executor pool."""
+    try:
+        tool_name = request.get("tool")
+        tool_args = request.get("args", {})
+
+        if tool_name not in executors:
+            return {
+                "error": f"Tool '{tool_name}' not found",
+                "available_tools": list(executors.keys()),
+                "status": "error"
+            }
+
+        cache = get_result_cache()
+        if cache.enabled_for(tool_name):
+            cached = cache.get(tool_name, tool_args)
+            if cached is not None:
+                return {"tool": tool_name, "result": cached, "status": "success", "cached": True}
+
+        executor_fn = executors[tool_name]
+        try:
+            result = await get_executor_pool().run(tool_name, executor_fn, tool_args)
+        except asyncio.TimeoutError:
+            return {"tool": tool_name, "error": "tool_execution_timeout", "status": "error"}
+        except ToolCancelledError:
+            return {"tool": tool_name, "error": "tool_execution_cancelled", "status": "error"}
+        except ExecutorBusyError as e:
+            # Backpressure: tell the client to retry later instead of queueing unboundedly
+            return {
+                "tool": tool_name,
+                "error": "server_busy",
+                "detail": str(e),
+                "retry_after": 1,
+                "status": "error"
+            }
+
+        result = to_builtin(result)
+        if cache.enabled_for(tool_name):
+            cache.put(tool_name, tool_args, result)
+
+        return {
+            "tool": tool_name,
+            "result": result,
+            "status": "success"
+        }
+
+    except Exception as e:
+        return {
+            "error": str(e),
+            "status": "error"
+        }
+
+
+def _stream_frame(tool_name: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a streamer event into a response frame."""
+    event = dict(event)
+    event_type = event.pop("type", "partial")
+    if event_type == "result":
+        result = event["result"]
+        return {
+            "tool": tool_name,
+            "result": to_builtin(result),
+            "status": "success"
+        }
+    return {"tool": tool_name, "event": event_type, **event}
+
+
+async def stream_tool_request(executors: Dict[str, Any], streamers: Dict[str, Any],
+                              request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Execute a tool, yielding partial/progress frames as the tool produces them.
+
+    Tools without a streaming executor yield a single final frame. The last frame always
+    has the regular single-response shape (``status`` success or error).
+    """
+    tool_name = request.get("tool")
+    tool_args = request.get("args", {})
+    streamer = streamers.get(tool_name)
+    if streamer is None:
+        yield await execute_tool_request(executors, request)
+        return
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def drain(**args):
+        # Runs on the worker thread; hand each event to the event loop as it is produced
+        for event in streamer(**args):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+    # drain() hands events back to this loop, so it always runs on a thread
+    task = asyncio.ensure_future(get_executor_pool().run(tool_name, drain, tool_args, backend="thread"))
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            await asyncio.wait({next_event, task}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield _stream_frame(tool_name, next_event.result())
+                continue
+
+            next_event.cancel()
+            while not events.empty():
+                yield _stream_frame(tool_name, events.get_nowait())
+            break
+
+        error = task.exception()
+        if isinstance(error, asyncio.TimeoutError):
+            yield {"tool": tool_name, "error": "tool_execution_timeout", "status": "error"}
+        elif isinstance(error, ToolCancelledError):
+            yield {"tool": tool_name, "error": "tool_execution_cancelled", "status": "error"}
+        elif isinstance(error, ExecutorBusyError):
+            yield {"tool": tool_name, "error": "server_busy", "detail": str(error), "retry_after": 1, "status": "error"}
+        elif error is not None:
+            yield {"tool": tool_name, "error": str(error), "status": "error"}
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def _batch_items(request: Dict[str, Any]) -> List[Dict[str, Any]]:
+    items = request.get("batch")
+    if not isinstance(items, list):
+        raise ValueError("'batch' must be a list of {\"tool\", \"args\"} requests")
+    return items
+
+
+async def iter_batch_results(executors: Dict[str, Any], request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Run every call in a batch concurrently, yielding index-tagged responses as each completes."""
+    async def run_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        response = await execute_tool_request(executors, item)
+        response["index"] = index
+        return response
+
+    tasks = [asyncio.ensure_future(run_item(i, item)) for i, item in enumerate(_batch_items(request))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def execute_batch_request(executors: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a batch request: ``{"batch": [{"tool", "args"}, ...], "ordered": true}``.
+
+    Calls run concurrently. With ``ordered`` (default) results follow request order;
+    otherwise they are listed in completion order and matched by ``index``.
+    """
+    try:
+        if request.get("ordered", True):
+            items = _batch_items(request)
+            results = await asyncio.gather(*(execute_tool_request(executors, item) for item in items))
+            for index, response in enumerate(results):
+                response["index"] = index
+        else:
+            results = [response async for response in iter_batch_results(executors, request)]
+    except Exception as e:
+        return {
+            "error": str(e),
+            "status": "error"
+        }
+
+    return {"batch": list(results), "status": "success"}
+
+
+async def read_body(request: Request) -> Dict[str, Any]:
+    """Decode an HTTP request body according to its Content-Type (JSON or msgpack)."""
+    return for_content_type(request.headers.get("content-type")).loads(await request.body())
+
+
+def encoded_response(request: Request, payload: Dict[str, Any]) -> Response:
+    """Encode ``payload`` with the serializer the client asked for in its Accept header."""
+    serializer = for_content_type(request.headers.get("accept"))
+    return Response(content=serializer.dumps(payload), media_type=serializer.content_type)
+
+
+def metrics_response(request: Request) -> Response:
+    """``GET /metrics``: Prometheus text, or percentiles as JSON with ``?format=json``.
+
+    Under pre-fork workers the series of all workers are summed.
+    """
+    registry = get_metrics()
+    values = cluster_metrics()
+    if request.query_params.get("format") == "json":
+        return Response(content=text_serializer().dumps(registry.snapshot(values)), media_type="application/json")
+    return PlainTextResponse(registry.render_prometheus(values), media_type="text/plain; version=0.0.4")
 
 
 class MCPServerInterface(ABC):
@@ -86,134 +378,368 @@ class MCPServerInterface(ABC):
         pass
 
 
+# ``"id": <integer or string>`` in a frame that failed to decode
+_RAW_ID_PATTERN = re.compile(rb'"id"\s*:\s*(-?\d+|"(?:[^"\\]|\\.)*")')
+
+
+def _valid_id(request_id: Any) -> bool:
+    return isinstance(request_id, (str, int)) and not isinstance(request_id, bool)
+
+
 class StdioMCPServer(MCPServerInterface):
-    """MCP Server using stdio communication."""
+    """MCP Server using stdio communication.
+
+    Messages are newline-delimited JSON until the client negotiates otherwise by sending
+    ``{"negotiate": {"serializers": [...], "framings": [...]}}``; the reply (still in the
+    old encoding) names the chosen serializer and framing, used from then on.
+    """
 
     def __init__(self):
         self.tools = {tool.name: tool for tool in AD_TOOLS}
         self.executors = TOOL_EXECUTORS
+        self.serializer = get_serializer("json")
+        self.framing = "line"
 
     async def send_response(self, response: Dict[str, Any]) -> None:
         """Send response via stdout."""
-        response_json = json.dumps(response, ensure_ascii=False)
-        print(response_json, flush=True)
+        self._write(self.serializer.dumps(response))
+
+    def _write(self, payload: bytes) -> None:
+        sys.stdout.buffer.write(encode_frame(payload, self.framing))
+        sys.stdout.buffer.flush()
+
+    async def _negotiate(self, request: Dict[str, Any]) -> None:
+        offer = request.get("negotiate") or {}
+        chosen = negotiate(offer.get("serializers", []), offer.get("framings", []))
+        response = {"negotiate": chosen, "status": "success"}
+        if "id" in request:
+            response["id"] = request["id"]
+        await self.send_response(response)
+        self.serializer = get_serializer(chosen["serializer"])
+        self.framing = chosen["framing"]
 
     async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle tool execution request."""
-        import concurrent.futures
-        import asyncio
-
+        """Handle tool execution request (single call or batch)."""
+        if "batch" in request:
+            return await execute_batch_request(self.executors, request)
+        return await execute_tool_request(self.executors, request)
+
+    async def _handle_and_respond(self, request: Dict[str, Any], request_bytes: int) -> None:
+        """Handle one request and write its response (tagged with the request's ``id``, if any)."""
+        started = time.perf_counter()
+        with server_span("stdio", request, self.executors) as span:
+            try:
+                response = await self.handle_request(request)
+            except asyncio.CancelledError:
+                response = {"error": "tool_execution_cancelled", "status": "error"}
+                if "id" in request:
+                    response["id"] = request["id"]
+                await self.send_response(response)
+                raise
+            if span is not None:
+                span.record_response(response)
+        if "id" in request:
+            response["id"] = request["id"]
+        payload = self.serializer.dumps(response)
+        self._write(payload)
+        observe_server_request("stdio", request_label(request, self.executors), response,
+                               time.perf_counter() - started, request_bytes, len(payload))
+
+    async def _reject(self, error: str, request_id: Any = None) -> None:
+        """Answer a frame that cannot be handled; without an ``id`` the client cannot tell which."""
+        response = {"error": error, "status": "error"}
+        if request_id is not None:
+            response["id"] = request_id
+        await self.send_response(response)
+
+    def _recover_id(self, frame: bytes) -> Any:
+        """The ``id`` of an undecodable text frame, if it can still be found in the raw bytes."""
+        if self.serializer.binary:
+            return None
+        match = _RAW_ID_PATTERN.search(frame)
+        if match is None:
+            return None
         try:
-            tool_name = request.get("tool")
-            tool_args = request.get("args", {})
-
-            if tool_name not in self.executors:
-                return {
-                    "error": f"Tool '{tool_name}' not found",
-                    "available_tools": list(self.executors.keys()),
-                    "status": "error"
-                }
-
-            executor_fn = self.executors[tool_name]
-
-            # Run synchronous executor in a thread pool with timeout
-            loop = asyncio.get_running_loop()
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                task = loop.run_in_executor(pool, lambda: executor_fn(**tool_args))
-                try:
-                    result = await asyncio.wait_for(task, timeout=30.0)
-                except asyncio.TimeoutError:
-                    return {"tool": tool_name, "error": "tool_execution_timeout", "status": "error"}
-
-            return {
-                "tool": tool_name,
-                "result": result.dict() if hasattr(result, 'dict') else result,
-                "status": "success"
-            }
-
-        except Exception as e:
-            return {
-                "error": str(e),
-                "status": "error"
-            }
+            return json.loads(match.group(1))
+        except ValueError:
+            return None
 
     async def run(self):
-        """Run the stdio server."""
+        """Run the stdio server.
+
+        Requests carrying an ``id`` are pipelined: each is dispatched as its own task and
+        its response (tagged with the same ``id``) is written as soon as it completes, so
+        responses may arrive out of order. Requests without an ``id`` are answered in order.
+        ``{"cancel": <id>}`` cancels a pipelined request; it is answered with
+        ``tool_execution_cancelled``. Frames that are not a request object, and ids that are
+        invalid or still in flight, are answered with an error (carrying the id when known).
+        Metrics are dumped every ``metrics.dump_interval`` seconds (stdout carries the
+        protocol, so they go to ``dump_path`` or stderr).
+        """
+        loop = asyncio.get_running_loop()
+        in_flight: Dict[Any, asyncio.Task] = {}
+        # Start tool worker processes in the background while requests are already served
+        warm_up = loop.run_in_executor(None, get_executor_pool().warm)
+        dumper = start_metrics_dump()
         try:
-            for line in sys.stdin:
-                request = json.loads(line.strip())
-                response = await self.handle_request(request)
-                await self.send_response(response)
+            while True:
+                # Read stdin off the event loop so in-flight tools keep making progress
+                frame = await loop.run_in_executor(None, read_frame, sys.stdin.buffer, self.framing)
+                if frame is None:
+                    break
+                if self.framing == "line":
+                    frame = frame.strip()
+                    if not frame:
+                        continue
+
+                try:
+                    request = self.serializer.loads(frame)
+                except Exception as e:
+                    await self._reject(f"Invalid {self.serializer.name} request: {e}", self._recover_id(frame))
+                    continue
+                if not isinstance(request, dict):
+                    await self._reject(f"Invalid request: expected an object, got {type(request).__name__}")
+                    continue
+
+                if "negotiate" in request:
+                    # Switch encodings only once every earlier request has been read
+                    await self._negotiate(request)
+                elif "cancel" in request:
+                    task = in_flight.get(request["cancel"]) if _valid_id(request["cancel"]) else None
+                    if task is not None:
+                        task.cancel()
+                elif "id" in request:
+                    request_id = request["id"]
+                    if not _valid_id(request_id):
+                        await self._reject("Invalid request id: must be a string or an integer")
+                        continue
+                    if request_id in in_flight:
+                        await self._reject(f"Duplicate request id: {request_id!r} is still in flight", request_id)
+                        continue
+                    task = asyncio.create_task(self._handle_and_respond(request, len(frame)))
+                    in_flight[request_id] = task
+                    task.add_done_callback(lambda _, request_id=request_id: in_flight.pop(request_id, None))
+                else:
+                    await self._handle_and_respond(request, len(frame))
+
+            # Drain pipelined requests before exiting on EOF
+            if in_flight:
+                await asyncio.gather(*in_flight.values(), return_exceptions=True)
+            await asyncio.gather(warm_up, return_exceptions=True)
         except KeyboardInterrupt:
             pass
+        finally:
+            if dumper is not None:
+                dumper.stop()
+
+
+class SSESession:
+    """One connected SSE client: its outgoing event queue and running jobs."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.jobs: Dict[str, asyncio.Task] = {}
+
+    def push(self, event: str, job_id: str, payload: Dict[str, Any]) -> int:
+        """Queue an event for the stream; returns the encoded size."""
+        data = text_serializer().dumps_text({"job_id": job_id, **payload})
+        self.events.put_nowait({"event": event, "id": job_id, "data": data})
+        return len(data)
+
+    def close(self) -> None:
+        for task in self.jobs.values():
+            task.cancel()
+        self.jobs.clear()
 
 
 class SSEMCPServer(MCPServerInterface):
-    """MCP Server using Server-Sent Events."""
+    """MCP Server using Server-Sent Events.
+
+    Clients open ``GET /sse`` to get a session id, submit work with ``POST /jobs`` (which
+    returns a job id immediately) and receive ``progress``, ``partial``, ``result`` and
+    ``error`` events for all of their jobs over that one event stream. ``DELETE /jobs/{id}``
+    cancels a job. ``POST /execute`` remains available for synchronous calls.
+
+    Under pre-fork workers a job may reach a worker that does not hold its session; it is
+    forwarded to the owning worker's inbox and runs there.
+    """
+
+    KEEPALIVE_SECONDS = 30
 
     def __init__(self):
         self.tools = {tool.name: tool for tool in AD_TOOLS}
         self.executors = TOOL_EXECUTORS
-        self.app = FastAPI()
+        self.streamers = TOOL_STREAMERS
+        self.sessions: Dict[str, SSESession] = {}
+        self._inbox_reader: Optional[asyncio.Task] = None
+        self.app = FastAPI(lifespan=server_lifespan)
         self.setup_routes()
 
     def setup_routes(self):
         @self.app.get("/sse")
         async def sse_endpoint():
+            session = SSESession(uuid.uuid4().hex)
+            self.sessions[session.session_id] = session
+            shared = get_shared_state()
+            if shared is not None:
+                shared.session_owners[session.session_id] = get_worker_id()
+                if self._inbox_reader is None:
+                    self._inbox_reader = asyncio.create_task(read_inbox(self._accept_forwarded_job))
+
             async def event_generator():
-                while True:
-                    # Keep connection alive
-                    yield {"event": "ping", "data": "keep-alive"}
-                    await asyncio.sleep(30)
+                try:
+                    yield {"event": "session", "data": json.dumps({"session_id": session.session_id})}
+                    while True:
+                        try:
+                            event = await asyncio.wait_for(session.events.get(), timeout=self.KEEPALIVE_SECONDS)
+                        except asyncio.TimeoutError:
+                            # Keep connection alive
+                            yield {"event": "ping", "data": "keep-alive"}
+                            continue
+                        yield event
+                finally:
+                    # Client went away: stop its jobs and forget the session
+                    self.sessions.pop(session.session_id, None)
+                    if shared is not None:
+                        shared.session_owners.pop(session.session_id, None)
+                    session.close()
 
             return EventSourceResponse(event_generator())
 
+        @self.app.post("/jobs")
+        async def submit_job(request: Request):
+            data = await read_body(request)
+            session_id = data.get("session_id")
+            job_id = str(data.get("job_id") or uuid.uuid4().hex)
+            session = self.sessions.get(session_id)
+            if session is None:
+                shared = get_shared_state()
+                owner = shared.session_owners.get(session_id) if shared is not None else None
+                if owner is None:
+                    raise HTTPException(status_code=404, detail="Unknown or closed SSE session")
+                # The session's stream is held by another worker: run the job there
+                shared.inboxes[owner].put({"session_id": session_id, "job_id": job_id, "request": data})
+                return {"job_id": job_id, "session_id": session_id, "status": "accepted"}
+
+            if job_id in session.jobs:
+                raise HTTPException(status_code=409, detail=f"Job '{job_id}' is already running")
+
+            self._start_job(session, job_id, data)
+            return {"job_id": job_id, "session_id": session.session_id, "status": "accepted"}
+
+        @self.app.delete("/jobs/{job_id}")
+        async def cancel_job(job_id: str, session_id: str):
+            session = self.sessions.get(session_id)
+            if session is None:
+                shared = get_shared_state()
+                owner = shared.session_owners.get(session_id) if shared is not None else None
+                if owner is None:
+                    raise HTTPException(status_code=404, detail="Unknown or closed SSE session")
+                shared.inboxes[owner].put({"session_id": session_id, "job_id": job_id, "cancel": True})
+                return {"job_id": job_id, "session_id": session_id, "status": "cancelling"}
+
+            if not self._cancel_job(session, job_id):
+                raise HTTPException(status_code=404, detail=f"Job '{job_id}' is not running")
+            return {"job_id": job_id, "session_id": session_id, "status": "cancelling"}
+
         @self.app.post("/execute")
         async def execute_tool(request: Request):
-            data = await request.json()
-            response = await self.handle_request(data)
-            return response
+            started = time.perf_counter()
+            data = await read_body(request)
+            with server_span("sse", data, self.executors) as span:
+                response = await self.handle_request(data)
+                if span is not None:
+                    span.record_response(response)
+            encoded = encoded_response(request, response)
+            observe_server_request("sse", request_label(data, self.executors), response, time.perf_counter() - started,
+                                   len(await request.body()), len(encoded.body))
+            return encoded
+
+        @self.app.get("/metrics")
+        async def metrics(request: Request):
+            return metrics_response(request)
+
+        @self.app.get("/stats")
+        async def executor_stats():
+            stats = {
+                **get_executor_pool().stats(),
+                "cache": get_result_cache().stats(),
+                "sse_sessions": len(self.sessions),
+                "sse_jobs": sum(len(session.jobs) for session in self.sessions.values()),
+            }
+            cluster = cluster_stats()
+            if cluster is not None:
+                stats["cluster"] = cluster
+            return stats
+
+    def _start_job(self, session: SSESession, job_id: str, request: Dict[str, Any]) -> None:
+        task = asyncio.create_task(self._run_job(session, job_id, request))
+        session.jobs[job_id] = task
+        task.add_done_callback(lambda _: session.jobs.pop(job_id, None))
+
+    def _cancel_job(self, session: SSESession, job_id: str) -> bool:
+        """Cancel a running job; it reports ``tool_execution_cancelled`` on the stream."""
+        task = session.jobs.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    def _accept_forwarded_job(self, message: Dict[str, Any]) -> None:
+        """Start (or cancel) a job another worker received for one of this worker's sessions."""
+        session = self.sessions.get(message["session_id"])
+        if session is None:
+            return
+        job_id = message["job_id"]
+        if message.get("cancel"):
+            self._cancel_job(session, job_id)
+            return
+        if job_id in session.jobs:
+            session.push("error", job_id, {"error": f"Job '{job_id}' is already running", "status": "error"})
+            return
+        self._start_job(session, job_id, message["request"])
+
+    async def _run_job(self, session: SSESession, job_id: str, request: Dict[str, Any]) -> None:
+        """Run one job and push its events onto the session's stream."""
+        started = time.perf_counter()
+        sent = 0
+        final: Dict[str, Any] = {"status": "success"}
+        with server_span("sse", request, self.executors) as span:
+            try:
+                if "batch" in request:
+                    final = await execute_batch_request(self.executors, request)
+                    sent += session.push("result" if final.get("status") == "success" else "error", job_id, final)
+                    return
+
+                async for frame in stream_tool_request(self.executors, self.streamers, request):
+                    if "event" in frame:
+                        sent += session.push(frame.pop("event"), job_id, frame)
+                    else:
+                        final = frame
+                        sent += session.push("result" if frame.get("status") == "success" else "error", job_id, frame)
+            except asyncio.CancelledError:
+                final = {"error": "tool_execution_cancelled", "status": "error"}
+                sent += session.push("error", job_id, final)
+                raise
+            except Exception as e:
+                final = {"error": str(e), "status": "error"}
+                sent += session.push("error", job_id, final)
+            finally:
+                observe_server_request("sse", request_label(request, self.executors), final,
+                                       time.perf_counter() - started, response_bytes=sent)
+                if span is not None:
+                    span.record_response(final)
 
     async def send_response(self, response: Dict[str, Any]) -> None:
         """Send response via SSE (not directly used in this implementation)."""
         pass
 
     async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle tool execution request."""
-        import concurrent.futures
-        import asyncio
-
-        try:
-            tool_name = request.get("tool")
-            tool_args = request.get("args", {})
-
-            if tool_name not in self.executors:
-                return {
-                    "error": f"Tool '{tool_name}' not found",
-                    "available_tools": list(self.executors.keys()),
-                    "status": "error"
-                }
-
-            executor_fn = self.executors[tool_name]
-            loop = asyncio.get_running_loop()
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                task = loop.run_in_executor(pool, lambda: executor_fn(**tool_args))
-                try:
-                    result = await asyncio.wait_for(task, timeout=30.0)
-                except asyncio.TimeoutError:
-                    return {"tool": tool_name, "error": "tool_execution_timeout", "status": "error"}
-
-            return {
-                "tool": tool_name,
-                "result": result.dict() if hasattr(result, 'dict') else result,
-                "status": "success"
-            }
-
-        except Exception as e:
-            return {
-                "error": str(e),
-                "status": "error"
-            }
+        """Handle tool execution request (single call or batch)."""
+        if "batch" in request:
+            return await execute_batch_request(self.executors, request)
+        return await execute_tool_request(self.executors, request)
 
     async def run(self, host: str = "127.0.0.1", port: int = 8000):
         """Run the SSE server."""
@@ -228,24 +754,99 @@ class StreamableHTTPMCPServer(MCPServerInterface):
     def __init__(self):
         self.tools = {tool.name: tool for tool in AD_TOOLS}
         self.executors = TOOL_EXECUTORS
-        self.app = FastAPI()
+        self.streamers = TOOL_STREAMERS
+        self.app = FastAPI(lifespan=server_lifespan)
         self.setup_routes()
 
     def setup_routes(self):
         @self.app.post("/stream")
         async def stream_tool_execution(request: Request):
-            data = await request.json()
-            response = await self.handle_request(data)
+            started = time.perf_counter()
+            data = await read_body(request)
+            serializer = for_content_type(request.headers.get("accept"))
+            request_bytes = len(await request.body())
+            sent = {"bytes": 0, "final": {"status": "success"}}
+
+            def encode(frame: Dict[str, Any]) -> bytes:
+                if "status" in frame:
+                    sent["final"] = frame
+                # Binary encodings use length-prefixed frames; JSON keeps "data:" lines
+                if serializer.binary:
+                    return encode_frame(serializer.dumps(frame), "length")
+                return b"data: " + serializer.dumps(frame) + b"\n\n"
+
+            done = b"" if serializer.binary else b"data: [DONE]\n\n"
+            media_type = serializer.content_type if serializer.binary else None
+
+            async def metered(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+                # Recorded once the last frame is written (or the client goes away)
+                with server_span("streamhttp", data, self.executors) as span:
+                    try:
+                        async for chunk in chunks:
+                            sent["bytes"] += len(chunk)
+                            yield chunk
+                    finally:
+                        observe_server_request("streamhttp", request_label(data, self.executors), sent["final"],
+                                               time.perf_counter() - started, request_bytes, sent["bytes"])
+                        if span is not None:
+                            span.record_response(sent["final"])
+
+            if data.get("stream") and "batch" not in data:
+                async def generate():
+                    # Forward partial results as the tool produces them
+                    async for frame in stream_tool_request(self.executors, self.streamers, data):
+                        yield encode(frame)
+                    yield done
+
+                return StreamingResponse(metered(generate()), media_type=media_type or "text/event-stream")
+
+            if "batch" in data and not data.get("ordered", True):
+                async def generate():
+                    # Stream each batch entry as soon as its tool finishes
+                    try:
+                        async for response in iter_batch_results(self.executors, data):
+                            yield encode(response)
+                    except Exception as e:
+                        yield encode({"error": str(e), "status": "error"})
+                    yield done
+            else:
+                async def generate():
+                    # Stream the response (run inside ``metered`` so the tool is traced under it)
+                    yield encode(await self.handle_request(data))
+                    yield done
+
+            return StreamingResponse(
+                metered(generate()),
+                media_type=media_type or "text/plain"
+            )
 
-            async def generate():
-                # Stream the response
-                response_json = json.dumps(response, ensure_ascii=False)
-                yield f"data: {response_json}\n\n"
-                yield "data: [DONE]\n\n"
+        @self.app.get("/stats")
+        async def executor_stats():
+            stats = {**get_executor_pool().stats(), "cache": get_result_cache().stats()}
+            cluster = cluster_stats()
+            if cluster is not None:
+                stats["cluster"] = cluster
+            return stats
+
+        @self.app.get("/metrics")
+        async def metrics(request: Request):
+            return metrics_response(request)
+
+        @self.app.get("/artifacts/{artifact_id}")
+        async def get_artifact(artifact_id: str):
+            # Serve generated artifacts (images) as chunked binary, never re-encoded into JSON
+            store = get_artifact_store()
+            try:
+                info = store.info(artifact_id)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid artifact id")
+            if info is None:
+                raise HTTPException(status_code=404, detail="Artifact not found")
 
             return StreamingResponse(
-                generate(),
-                media_type="text/plain"
+                iterate_in_threadpool(store.iter_chunks(artifact_id)),
+                media_type=info["mime_type"],
+                headers={"Content-Length": str(info["size_bytes"]), "Cache-Control": "public, max-age=31536000, immutable"}
             )
 
     async def send_response(self, response: Dict[str, Any]) -> None:
@@ -253,41 +854,10 @@ class StreamableHTTPMCPServer(MCPServerInterface):
         pass
 
     async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle tool execution request."""
-        import concurrent.futures
-        import asyncio
-
-        try:
-            tool_name = request.get("tool")
-            tool_args = request.get("args", {})
-
-            if tool_name not in self.executors:
-                return {
-                    "error": f"Tool '{tool_name}' not found",
-                    "available_tools": list(self.executors.keys()),
-                    "status": "error"
-                }
-
-            executor_fn = self.executors[tool_name]
-            loop = asyncio.get_running_loop()
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                task = loop.run_in_executor(pool, lambda: executor_fn(**tool_args))
-                try:
-                    result = await asyncio.wait_for(task, timeout=30.0)
-                except asyncio.TimeoutError:
-                    return {"tool": tool_name, "error": "tool_execution_timeout", "status": "error"}
-
-            return {
-                "tool": tool_name,
-                "result": result.dict() if hasattr(result, 'dict') else result,
-                "status": "success"
-            }
-
-        except Exception as e:
-            return {
-                "error": str(e),
-                "status": "error"
-            }
+        """Handle tool execution request (single call or batch)."""
+        if "batch" in request:
+            return await execute_batch_request(self.executors, request)
+        return await execute_tool_request(self.executors, request)
 
     async def run(self, host: str = "127.0.0.1", port: int = 8000):
         """Run the streamable HTTP server."""
@@ -312,6 +882,15 @@ class MCPServerFactory:
             raise ValueError(f"Unsupported mode: {mode}")
 
 
+def serve_workers(mode: str, host: str = "127.0.0.1", port: int = 8000, workers: int = 2,
+                  graceful_timeout: float = 30.0) -> None:
+    """Serve the SSE or streamable HTTP server from ``workers`` pre-forked processes (blocking)."""
+    if mode not in ("sse", "streamhttp"):
+        raise ValueError(f"Multiple workers need an HTTP mode (sse or streamhttp), got: {mode}")
+    # Each worker builds its own app after the fork
+    serve_prefork(lambda: MCPServerFactory.create_server(mode).app, host, port, workers, graceful_timeout)
+
+
 # Unified interface functions
 async def send_request(server: MCPServerInterface, request: Dict[str, Any]) -> Dict[str, Any]:
     """Unified function to send request to server."""
@@ -323,4 +902,16 @@ async def handle_response(response: Dict[str, Any]) -> None:
     if "error" in response:
         print(f"Error: {response['error']}")
     else:
-        print(f"Success: {response}")
\ No newline at end of file
+        print(f"Success: {response}")
+
+
+if __name__ == "__main__":
+    # Legacy stdio server entry point used by StdioMCPClient
+    import os
+    import yaml
+
+    config_path = os.environ.get("MCP_AGENT_CONFIG", "config/config.yaml")
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            configure_server_runtime(yaml.safe_load(f))
+    asyncio.run(StdioMCPServer().run())
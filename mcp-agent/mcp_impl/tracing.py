@@ -0,0 +1,265 @@
+"""
+Request Tracing
+Lightweight span tracing across agent, MCP client, server and tools. Trace context travels
+in the request envelope as a W3C ``traceparent``; spans are written as OTLP/JSON lines.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterator, NamedTuple
+
+# OTLP span kinds
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+FLUSH_INTERVAL = 1.0  # seconds between exporter flushes
+FLUSH_BATCH = 256  # spans buffered before an early flush
+
+
+class SpanContext(NamedTuple):
+    trace_id: str  # 32 hex digits
+    span_id: str  # 16 hex digits
+    sampled: bool
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, value: Any) -> Optional["SpanContext"]:
+        """Parse a W3C ``traceparent`` header value; None if malformed."""
+        if not isinstance(value, str):
+            return None
+        parts = value.strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            flags = int(parts[3], 16)
+            int(parts[1], 16), int(parts[2], 16)
+        except ValueError:
+            return None
+        return cls(parts[1], parts[2], bool(flags & 1))
+
+
+class Span:
+    """One timed operation. Only sampled spans are exported."""
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], kind: str,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: Any) -> None:
+        self.error = str(error) or type(error).__name__
+
+    def record_response(self, response: Any) -> None:
+        """Mark the span failed when an MCP response has an error status."""
+        if isinstance(response, dict) and response.get("status") == "error":
+            self.record_error(response.get("error", "error"))
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error is not None else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class FileSpanExporter:
+    """Appends finished spans to a file, one OTLP/JSON ``ExportTraceServiceRequest`` per line.
+
+    The OpenTelemetry Collector's ``otlpjsonfile`` receiver can replay the file into any
+    tracing backend. Spans are buffered and flushed every ``FLUSH_INTERVAL`` seconds.
+    """
+
+    def __init__(self, path: str, service_name: str):
+        self.path = os.path.expanduser(path)
+        self.service_name = service_name
+        self._start()
+
+    def _start(self) -> None:
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span.to_otlp())
+            full = len(self._spans) >= FLUSH_BATCH
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if not spans:
+            return
+        line = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service_name}},
+                {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "mcp-agent"}, "spans": spans}],
+        }]}, ensure_ascii=False)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _run(self) -> None:
+        while not self._stop.wait(FLUSH_INTERVAL):
+            self.flush()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self.flush()
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("mcp_current_span", default=None)
+
+
+class Tracer:
+    """Creates spans under the current one (or a remote parent) and hands them to the exporter.
+
+    Root spans are sampled with ``sample_rate``; child spans follow their parent.
+    """
+
+    def __init__(self, exporter: Optional[FileSpanExporter] = None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+                   parent: Optional[SpanContext] = None) -> Span:
+        """Start a span without making it current (see ``span`` for the usual form)."""
+        if parent is None:
+            current = _current.get()
+            parent = current.context if current is not None else None
+        if parent is None:
+            context = SpanContext(_random_hex(16), _random_hex(8), random.random() < self.sample_rate)
+            return Span(name, context, None, kind, attributes)
+        return Span(name, SpanContext(parent.trace_id, _random_hex(8), parent.sampled), parent.span_id, kind, attributes)
+
+    def end_span(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if span.context.sampled and self.exporter is not None:
+            self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+             parent: Optional[SpanContext] = None) -> Iterator[Optional[Span]]:
+        """Run the block inside a new current span; yields None when tracing is off."""
+        if self.exporter is None:
+            yield None
+            return
+        span = self.start_span(name, kind, attributes, parent)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            try:
+                _current.reset(token)
+            except ValueError:
+                pass  # Closed from another context (e.g. an abandoned async generator)
+            self.end_span(span)
+
+    def inject(self, envelope: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a request envelope carrying the current span's ``traceparent``."""
+        current = _current.get()
+        if self.exporter is None or current is None:
+            return envelope
+        return {**envelope, "trace": {"traceparent": current.context.traceparent}}
+
+    @staticmethod
+    def extract(envelope: Dict[str, Any]) -> Optional[SpanContext]:
+        """Remote parent from a request envelope's ``trace`` field, if any."""
+        trace = envelope.get("trace")
+        return SpanContext.from_traceparent(trace.get("traceparent")) if isinstance(trace, dict) else None
+
+
+def _random_hex(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+def current_span() -> Optional[Span]:
+    """The span the calling code runs in, if any."""
+    return _current.get()
+
+
+_tracer = Tracer()
+_tracer_lock = threading.Lock()
+
+
+def configure_tracing(settings: Optional[Dict[str, Any]] = None, service_name: str = "mcp-agent") -> Tracer:
+    """Apply the ``tracing`` section of config.yaml (enabled, path, sample_rate)."""
+    global _tracer
+    settings = settings or {}
+    with _tracer_lock:
+        if _tracer.exporter is not None:
+            _tracer.exporter.shutdown()
+        exporter = None
+        if settings.get("enabled") and settings.get("path"):
+            exporter = FileSpanExporter(settings["path"], service_name)
+        _tracer = Tracer(exporter, float(settings.get("sample_rate", 1.0)))
+        return _tracer
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer (a no-op until ``configure_tracing`` enables it)."""
+    return _tracer
+
+
+def flush_tracing() -> None:
+    """Write buffered spans now (pre-forked workers exit without running atexit hooks)."""
+    exporter = _tracer.exporter
+    if exporter is not None:
+        exporter.flush()
+
+
+def _after_fork_in_child() -> None:
+    # The flush thread does not survive fork, and the parent's buffered spans are its own
+    exporter = _tracer.exporter
+    if exporter is not None:
+        exporter._start()
+
+
+atexit.register(flush_tracing)
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,200 @@
+"""
+Pre-fork Workers
+Runs an ASGI app in N worker processes behind one shared listening socket, with the
+tool result cache and stats shared between workers and graceful draining on shutdown.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+from multiprocessing.managers import SyncManager
+from typing import Dict, Any, Optional, Callable
+
+import uvicorn
+
+from mcp_impl.cache import share_result_cache, get_result_cache
+from mcp_impl.executor import get_executor_pool
+from mcp_impl.metrics import get_metrics
+
+STATS_INTERVAL = 1.0  # seconds between worker stats snapshots
+RESPAWN_DELAY = 1.0  # seconds before replacing a worker that died
+
+
+class SharedState:
+    """Cross-worker state held by a manager process started before the workers fork."""
+
+    def __init__(self, manager: SyncManager, workers: int):
+        self.workers = workers
+        self.cache_store = manager.dict()
+        self.cache_index = manager.dict()
+        self.cache_lock = manager.Lock()
+        self.worker_stats = manager.dict()  # worker id -> latest stats snapshot
+        self.worker_metrics = manager.dict()  # worker id -> raw metric series
+        self.session_owners = manager.dict()  # SSE session id -> worker id
+        self.inboxes = [manager.Queue() for _ in range(workers)]  # work forwarded to a worker
+
+
+_state: Optional[SharedState] = None
+_worker_id: Optional[int] = None
+
+
+def get_shared_state() -> Optional[SharedState]:
+    """Shared state when running as a pre-forked worker, otherwise None."""
+    return _state
+
+
+def get_worker_id() -> Optional[int]:
+    """Index of this worker process, or None outside pre-fork mode."""
+    return _worker_id
+
+
+def worker_snapshot() -> Dict[str, Any]:
+    """This process's executor and cache stats."""
+    return {
+        "pid": os.getpid(),
+        "updated": time.time(),
+        "executor": get_executor_pool().stats(),
+        "cache": get_result_cache().stats(),
+    }
+
+
+def cluster_stats() -> Optional[Dict[str, Any]]:
+    """Per-worker stats snapshots plus totals across workers; None outside pre-fork mode."""
+    if _state is None:
+        return None
+    _state.worker_stats[_worker_id] = worker_snapshot()
+    snapshots = dict(_state.worker_stats)
+
+    tools: Dict[str, Dict[str, int]] = {}
+    cache = {"hits": 0, "misses": 0, "evictions": 0}
+    for snapshot in snapshots.values():
+        for name, stats in snapshot["executor"]["tools"].items():
+            totals = tools.setdefault(name, {"calls": 0, "errors": 0, "timeouts": 0, "cancelled": 0,
+                                                 "killed": 0, "rejected": 0})
+            for counter in totals:
+                totals[counter] += stats[counter]
+        for counter in cache:
+            cache[counter] += snapshot["cache"][counter]
+    lookups = cache["hits"] + cache["misses"]
+    cache["hit_rate"] = round(cache["hits"] / lookups, 4) if lookups else 0.0
+    cache["size"] = len(_state.cache_store)
+
+    return {
+        "workers": {str(worker): snapshot for worker, snapshot in sorted(snapshots.items())},
+        "totals": {"pending": sum(s["executor"]["pending"] for s in snapshots.values()),
+                   "tools": tools, "cache": cache},
+    }
+
+
+def cluster_metrics() -> Optional[Dict[str, Any]]:
+    """Metric series summed over all workers; None outside pre-fork mode."""
+    if _state is None:
+        return None
+    metrics = get_metrics()
+    _state.worker_metrics[_worker_id] = metrics.export()
+    return metrics.merge(list(_state.worker_metrics.values()))
+
+
+async def read_inbox(handler: Callable[[Dict[str, Any]], None]) -> None:
+    """Hand every message forwarded to this worker to ``handler`` (runs until cancelled)."""
+    inbox = _state.inboxes[_worker_id]
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            message = await loop.run_in_executor(None, inbox.get, True, 1.0)
+        except queue.Empty:
+            continue
+        handler(message)
+
+
+async def _publish_stats() -> None:
+    while True:
+        _state.worker_stats[_worker_id] = worker_snapshot()
+        _state.worker_metrics[_worker_id] = get_metrics().export()
+        await asyncio.sleep(STATS_INTERVAL)
+
+
+async def _serve_worker(server: uvicorn.Server, sock: socket.socket) -> None:
+    publisher = asyncio.create_task(_publish_stats())
+    try:
+        await server.serve(sockets=[sock])
+    finally:
+        publisher.cancel()
+        _state.worker_stats.pop(_worker_id, None)
+
+
+def _worker_main(worker_id: int, sock: socket.socket, app_factory: Callable[[], Any],
+                 state: SharedState, graceful_timeout: float) -> None:
+    global _state, _worker_id
+    _state, _worker_id = state, worker_id
+    # Drop the supervisor's handlers inherited through fork; uvicorn installs its own
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, signal.SIG_DFL)
+    share_result_cache(state.cache_store, state.cache_index, state.cache_lock)
+
+    config = uvicorn.Config(app_factory(), timeout_graceful_shutdown=graceful_timeout)
+    # uvicorn handles SIGTERM/SIGINT itself: stop accepting, finish in-flight requests, exit
+    asyncio.run(_serve_worker(uvicorn.Server(config), sock))
+
+
+def serve_prefork(app_factory: Callable[[], Any], host: str, port: int, workers: int,
+                  graceful_timeout: float = 30.0) -> None:
+    """Serve ``app_factory()`` from ``workers`` forked processes sharing one listening socket.
+
+    The socket is bound once in the parent and inherited, so the kernel spreads
+    connections across workers. Workers that die are replaced; SIGINT/SIGTERM make
+    every worker drain its in-flight requests (up to ``graceful_timeout``) and exit.
+    """
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # The manager must outlive the workers while they drain, so it ignores Ctrl-C
+    manager = SyncManager()
+    manager.start(signal.signal, (signal.SIGINT, signal.SIG_IGN))
+    state = SharedState(manager, workers)
+    context = multiprocessing.get_context("fork")
+    stopping = threading.Event()
+
+    def spawn(worker_id: int) -> multiprocessing.Process:
+        process = context.Process(
+            target=_worker_main, args=(worker_id, sock, app_factory, state, graceful_timeout),
+            name=f"mcp-worker-{worker_id}", daemon=False
+        )
+        process.start()
+        return process
+
+    def request_stop(signum, frame):
+        stopping.set()
+
+    previous = {sig: signal.signal(sig, request_stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+    processes = {worker_id: spawn(worker_id) for worker_id in range(workers)}
+    print(f"Serving on http://{host}:{port} with {workers} workers (pids {[p.pid for p in processes.values()]})")
+
+    try:
+        while not stopping.wait(RESPAWN_DELAY):
+            for worker_id, process in processes.items():
+                if not process.is_alive():
+                    print(f"Worker {worker_id} (pid {process.pid}) exited with {process.exitcode}; restarting")
+                    processes[worker_id] = spawn(worker_id)
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM: graceful drain
+        deadline = time.monotonic() + graceful_timeout + 5
+        for process in processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        manager.shutdown()
+        sock.close()
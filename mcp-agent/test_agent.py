@@ -0,0 +1,159 @@
+"""
+Tests for agent query streaming (agent/agent.py, agent/server.py): incremental tool-call
+parsing, the order of streamed events, early close, and the HTTP query endpoints, with the
+stub backend and an in-process tool stand-in.
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent.agent import AdvertisingAgent, AgentConfig, ToolCallParser
+from agent.server import AgentServer
+
+PLAN = """Planning 2 tool calls.
+TOOL_CALL: budget_calculator
+{"budget": 5000, "platforms": ["google"]}
+TOOL_CALL: effect_analyzer
+{
+  "platform": "google",
+  "budget": "${1.result.platform_allocation.google}"
+}"""
+QUERY = "Spend $5000 on Google in Europe for 10 days"
+
+
+def test_parser_returns_calls_as_their_blocks_complete():
+    parser = ToolCallParser()
+    calls = []
+    completed_at = []
+    for position in range(0, len(PLAN), 3):  # Chunks cut through names, JSON and newlines
+        found = parser.feed(PLAN[position:position + 3])
+        calls += found
+        completed_at += [position] * len(found)
+    calls += parser.close()
+    assert calls == [
+        {"tool": "budget_calculator", "args": {"budget": 5000, "platforms": ["google"]}},
+        {"tool": "effect_analyzer", "args": {"platform": "google", "budget": "${1.result.platform_allocation.google}"}},
+    ]
+    # The first call is known long before the text ends
+    assert completed_at and completed_at[0] < len(PLAN) // 2
+
+
+def test_parser_skips_malformed_blocks():
+    parser = ToolCallParser()
+    text = 'TOOL_CALL: a\nnot json\nTOOL_CALL: b\n{}\nTOOL_CALL: c\n{"x": 1}'
+    assert parser.feed(text) == []
+    assert parser.close() == [{"tool": "c", "args": {"x": 1}}]
+
+
+class FakeTools:
+    """``call_tool`` stand-in: answers every tool after ``delay`` seconds and records the calls."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, tool, args):
+        self.calls.append((tool, args))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(tool)
+            raise
+        result = {"platform_allocation": {p: 100.0 for p in args.get("platforms", [])}}
+        return {"tool": tool, "result": result, "status": "success"}
+
+
+def make_agent(tools, decode_tps=0):
+    agent = AdvertisingAgent(AgentConfig(llm_model="stub-model", llm_backend="stub", max_tokens=1024,
+                                         backend_options={"decode_tps": decode_tps}))
+    agent.call_tool = tools
+    return agent
+
+
+def test_stream_query_event_order():
+    tools = FakeTools()
+    agent = make_agent(tools, decode_tps=2000)
+
+    async def main():
+        return [event async for event in agent.stream_query(QUERY)]
+
+    events = asyncio.run(main())
+    types = [event["type"] for event in events]
+    assert types[0] == "plan" and types[-1] == "done"
+    # Tool calls start while the plan is still being generated
+    assert types.index("tool_call") < max(i for i, kind in enumerate(types) if kind == "plan")
+    # Every result follows its call, and the answer starts only after all results are in
+    calls = [e for e in events if e["type"] == "tool_call"]
+    results = {e["index"]: i for i, e in enumerate(events) if e["type"] == "tool_result"}
+    assert [(c["index"], c["tool"]) for c in calls] == [(1, "budget_calculator"), (2, "effect_analyzer")]
+    assert all(events.index(call) < results[call["index"]] for call in calls)
+    assert max(results.values()) < types.index("token")
+
+    # The dependent call got the first call's output substituted
+    assert tools.calls[1] == ("effect_analyzer", {"platform": "google", "budget": 100.0, "target_audience": "general",
+                                                  "campaign_type": "conversion"})
+    answer = "".join(e["text"] for e in events if e["type"] == "token")
+    assert events[-1]["response"] == answer and answer.startswith("Summary of the campaign analysis")
+
+
+def test_process_user_query_returns_the_streamed_answer():
+    agent = make_agent(FakeTools())
+    response = asyncio.run(agent.process_user_query(QUERY))
+    assert response.endswith("- budget_calculator: done\n- effect_analyzer: done")
+
+
+def test_closing_the_stream_cancels_running_tool_calls():
+    tools = FakeTools(delay=30)
+    agent = make_agent(tools, decode_tps=500)
+
+    async def main():
+        stream = agent.stream_query(QUERY)
+        async for event in stream:
+            if event["type"] == "tool_call":
+                break
+        await asyncio.sleep(0.01)  # Let the call start
+        await stream.aclose()
+
+    asyncio.run(asyncio.wait_for(main(), timeout=10))
+    assert tools.cancelled == ["budget_calculator"]
+
+
+@pytest.fixture
+def client():
+    def make(**limits):
+        server = AgentServer(make_agent(FakeTools()), **limits)
+        return TestClient(server.app)
+    return make
+
+
+def test_query_endpoint(client):
+    with client() as http:
+        response = http.post("/query", json={"query": QUERY})
+        assert response.status_code == 200
+        assert response.json()["response"].startswith("Summary of the campaign analysis")
+        assert http.post("/query", json={"text": QUERY}).status_code == 400
+        assert http.get("/health").json()["queries_running"] == 0
+
+
+def test_stream_endpoint_sends_events(client):
+    with client() as http:
+        with http.stream("POST", "/query/stream", json={"query": QUERY}) as response:
+            assert response.status_code == 200
+            body = "".join(response.iter_text())
+    events = [line.split(":", 1)[1].strip() for line in body.splitlines() if line.startswith("event:")]
+    data = [json.loads(line.split(":", 1)[1]) for line in body.splitlines() if line.startswith("data:")]
+    assert events[0] == "plan" and events[-1] == "done"
+    assert {"tool_call", "tool_result", "token"} <= set(events)
+    assert "elapsed_ms" in data[-1]
+
+
+def test_full_server_answers_busy(client):
+    with client(max_pending_queries=0) as http:
+        response = http.post("/query", json={"query": QUERY})
+        assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+        assert response.json() == {"error": "server_busy", "retry_after": 1, "status": "error"}
+        assert http.post("/query/stream", json={"query": QUERY}).status_code == 503
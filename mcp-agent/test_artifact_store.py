@@ -0,0 +1,82 @@
+"""
+Tests for the content-addressed artifact store (tools/artifact_store.py): writes, reads,
+ids, and size/age eviction.
+"""
+
+import os
+import time
+
+import pytest
+
+from tools import artifact_store
+from tools.ad_tools import configure_tools, var_image_tool
+from tools.artifact_store import ArtifactStore, artifact_key
+
+
+def age(store, artifact_id, seconds):
+    stamp = time.time() - seconds
+    os.utime(store.path_for(artifact_id), (stamp, stamp))
+
+
+@pytest.fixture
+def ids():
+    return [artifact_key(n=i) for i in range(5)]
+
+
+def test_put_and_read_back(tmp_path, ids):
+    store = ArtifactStore(tmp_path)
+    info = store.put(ids[0], [b"abc", b"def"], "text/plain", {"k": "v"})
+    assert info == {"artifact_id": ids[0], "mime_type": "text/plain", "size_bytes": 6, "metadata": {"k": "v"}}
+    assert store.info(ids[0]) == info
+    assert b"".join(store.iter_chunks(ids[0], chunk_size=4)) == b"abcdef"
+    assert store.info(ids[1]) is None
+
+
+def test_keys_are_canonical_and_ids_validated(tmp_path):
+    assert artifact_key(a=1, b="x") == artifact_key(b="x", a=1)
+    assert artifact_key(a=1) != artifact_key(a=2)
+    with pytest.raises(ValueError):
+        ArtifactStore(tmp_path).info("../../etc/passwd")
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path, ids):
+    store = ArtifactStore(tmp_path, max_bytes=3000)
+    for i, artifact_id in enumerate(ids[:3]):
+        store.put(artifact_id, [b"x" * 1000], "application/octet-stream")
+        age(store, artifact_id, 100 - i)
+    store.info(ids[0])  # Reading makes the oldest artifact the most recently used
+    store.put(ids[3], [b"x" * 1000], "application/octet-stream")
+    assert [store.exists(a) for a in ids[:4]] == [True, False, True, True]
+    assert not store.path_for(ids[1]).with_suffix(".json").exists()
+
+
+def test_new_artifact_is_kept_even_above_the_cap(tmp_path, ids):
+    store = ArtifactStore(tmp_path, max_bytes=3000)
+    store.put(ids[0], [b"x" * 1000], "application/octet-stream")
+    store.put(ids[1], [b"x" * 5000], "application/octet-stream")
+    assert not store.exists(ids[0]) and store.exists(ids[1])
+
+
+def test_age_cap_evicts_stale_artifacts(tmp_path, ids):
+    store = ArtifactStore(tmp_path, max_age_seconds=50)
+    store.put(ids[0], [b"old"], "text/plain")
+    store.put(ids[1], [b"recent"], "text/plain")
+    age(store, ids[0], 60)
+    age(store, ids[1], 10)
+    store.put(ids[2], [b"new"], "text/plain")
+    assert [store.exists(a) for a in ids[:3]] == [False, True, True]
+    assert store.evict() == 0
+
+
+def test_image_tool_uses_configured_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "_artifact_store", None)
+    configure_tools({"var_image_generator": {"artifact_dir": str(tmp_path), "max_size_mb": 1, "max_age_days": 30}})
+    store = artifact_store.get_artifact_store()
+    assert (store.root, store.max_bytes, store.max_age_seconds) == (tmp_path, 1024 * 1024, 30 * 86400.0)
+
+    first = var_image_tool("Summer sale banner", width=64, height=32)
+    second = var_image_tool("Summer sale banner", width=64, height=32, inline=True)
+    assert not first.cached and second.cached
+    assert first.artifact_id == second.artifact_id
+    assert second.image_data_url.startswith("data:image/svg+xml")
+    assert os.path.dirname(first.artifact_path).startswith(str(tmp_path))
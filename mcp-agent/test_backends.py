@@ -0,0 +1,153 @@
+"""
+Tests for the inference backends (agent/backends.py): the prefix cache (alone and behind
+the stub backend), step-wise generation and the rule-based stub backend the other agent
+tests run on.
+"""
+
+import json
+
+import pytest
+
+from agent.backends import (CHARS_PER_TOKEN, Completion, GenerationRequest, InferenceBackend, PrefixCache, chatml,
+                            common_prefix_length, create_backend)
+
+
+def stub(**options):
+    backend = create_backend("stub", "stub-model", options=options)
+    backend.load()
+    return backend
+
+
+def prompt(query):
+    return chatml([{"role": "system", "content": "You plan ad campaigns."}, {"role": "user", "content": query}])
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("", "abc", 0), ("abc", "abd", 2), ("abc", "abc", 3), ("abcdef", "abc", 3), ((1, 2, 3), (1, 2, 4, 5), 2),
+])
+def test_common_prefix_length(a, b, expected):
+    assert common_prefix_length(a, b) == expected
+
+
+def test_prefix_cache_finds_longest_shared_prefix():
+    cache = PrefixCache(max_entries=2)
+    assert cache.lookup("anything") == (0, None)
+    cache.store("system prompt A", "a")
+    cache.store("system prompt B", "b")
+    assert cache.lookup("system prompt B plus more") == (15, "b")
+    cache.store("other", "o")  # Evicts the least recently used entry ("A")
+    assert cache.lookup("system prompt A") == (14, "b")
+
+
+def test_prefix_cache_longer_state_supersedes_its_prefixes():
+    cache = PrefixCache()
+    cache.store("turn one", 1)
+    cache.store("turn one, turn two", 2)
+    assert cache.lookup("turn one") == (8, 2)
+    assert len(cache._entries) == 1
+
+
+def test_prefix_cache_can_be_disabled():
+    backend = stub(prefix_cache=0, max_batch_size=3)
+    backend.prefix_cache.store("text", 1)
+    assert backend.prefix_cache.lookup("text") == (0, None)
+    assert backend.max_batch_size == 3 and backend.options == {}
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown inference backend"):
+        create_backend("nope", "model")
+
+
+def test_stub_parses_queries():
+    backend = stub()
+    assert backend.parse_query("Spend $100,000 on TikTok and Google in Europe for 2 weeks") == (
+        100000.0, ["tiktok", "google"], "europe", 14)
+    assert backend.parse_query("预算5万，抖音，东南亚，3个月") == (50000.0, ["tiktok"], "southeast_asia", 90)
+    assert backend.parse_query("help") == (10000.0, ["tiktok", "facebook"], "global", 30)
+
+
+def test_stub_plans_tool_calls_and_summarises_results():
+    backend = stub()
+    plan = backend.complete(prompt("Check compliance of $5k on facebook"), 1024, 0.7).text
+    calls = [line for line in plan.splitlines() if line.startswith("TOOL_CALL:")]
+    assert calls == ["TOOL_CALL: budget_calculator", "TOOL_CALL: effect_analyzer", "TOOL_CALL: compliance_checker"]
+    first = json.loads(plan.splitlines()[plan.splitlines().index(calls[0]) + 1])
+    assert first == {"budget": 5000.0, "platforms": ["facebook"], "region": "global", "duration_days": 30}
+
+    results = 'Tool results:\nTool 1 (budget_calculator): {"status": "success"}\nTool 2 (effect_analyzer): {"status": "error"}'
+    answer = backend.complete(prompt(results), 1024, 0.7).text
+    assert answer.endswith("- budget_calculator: done\n- effect_analyzer: failed")
+
+
+def test_stepwise_generation_matches_complete():
+    backend = stub(prefix_cache=0)
+    expected = backend.complete(prompt("$2000 on google"), 1024, 0.7)
+
+    request = GenerationRequest(prompt("$2000 on google"), 1024, 0.7)
+    backend.prefill([request])
+    texts = [request.text]
+    while not request.done:
+        backend.decode([request])
+        texts.append(request.text)
+    assert request.completion() == expected
+    assert all(len(later) - len(earlier) == CHARS_PER_TOKEN for earlier, later in zip(texts, texts[1:-1]))
+    assert request.completion_tokens == len(texts)
+
+
+def test_max_tokens_truncates_generation():
+    completion = stub().complete(prompt("$2000 on google"), 3, 0.7)
+    assert len(completion.text) == 3 * CHARS_PER_TOKEN and completion.completion_tokens == 3
+
+
+def test_follow_up_prompt_reuses_cached_prefix():
+    backend = stub()
+    first = prompt("$2000 on google")
+    plan = backend.complete(first, 1024, 0.7)
+    assert plan.cached_tokens == 0 and plan.prompt_tokens == len(first) // CHARS_PER_TOKEN
+
+    follow_up = first + plan.text + "<|im_end|>\n" + chatml([{"role": "user", "content": "Tool results:\n"}])
+    answer = backend.complete(follow_up, 1024, 0.7)
+    assert answer.cached_tokens == len(first + plan.text) // CHARS_PER_TOKEN
+
+
+def follow_up(backend, query):
+    """A conversation's plan turn, then the prompt of its tool-results turn."""
+    first = prompt(query)
+    plan = backend.complete(first, 1024, 0.7)
+    return first + plan.text, first + plan.text + "<|im_end|>\n" + chatml([{"role": "user", "content": "Tool results:\n"}])
+
+
+def test_stub_follow_up_hits_its_own_conversation():
+    backend = stub()
+    history, next_turn = follow_up(backend, "$2000 on google")
+    follow_up(backend, "$2000 on tiktok")  # Shares the system prompt and most of the query
+    answer = backend.complete(next_turn, 1024, 0.7)
+    assert answer.cached_tokens == len(history) // CHARS_PER_TOKEN
+
+
+def test_stub_prefix_cache_evicts_old_conversations():
+    backend = stub(prefix_cache=1)
+    history, next_turn = follow_up(backend, "$1000 on google")
+    follow_up(backend, "$5000 on facebook")  # Takes the only slot
+    assert backend.complete(next_turn, 1024, 0.7).cached_tokens < len(history) // CHARS_PER_TOKEN
+
+
+def test_backends_without_batching_complete_in_prefill():
+    class OneShot(InferenceBackend):
+        name = "one-shot"
+
+        def load(self):
+            pass
+
+        def render_prompt(self, messages):
+            return chatml(messages)
+
+        def complete(self, prompt, max_tokens, temperature, top_p=0.9):
+            return Completion("whole answer", len(prompt) // CHARS_PER_TOKEN, 0, 2)
+
+    request = GenerationRequest(prompt("$2000 on google"), 1024, 0.7)
+    OneShot("model").prefill([request])
+    assert request.done and request.completion() == Completion("whole answer", request.prompt_tokens, 0, 2)
+    with pytest.raises(NotImplementedError):
+        OneShot("model").decode([request])
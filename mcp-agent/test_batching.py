@@ -0,0 +1,152 @@
+"""
+Tests for continuous batching (agent/batching.py): batched steps, slot refill, streaming,
+cancellation and backend failures, driven by the stub backend.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from agent.backends import GenerationRequest, StubBackend, chatml
+from agent.batching import GenerationScheduler
+
+
+class RecordingStub(StubBackend):
+    """Stub backend logging the batch size of every step and the requests it is told to drop."""
+
+    def __init__(self, **options):
+        super().__init__("stub-model", options=options)
+        self.load()
+        self.steps = []
+        self.cancelled = []
+        self.fail_next = False
+
+    def prefill(self, requests):
+        self.steps.append(("prefill", len(requests)))
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("device lost")
+        super().prefill(requests)
+
+    def decode(self, requests):
+        self.steps.append(("decode", len(requests)))
+        super().decode(requests)
+
+    def cancel(self, requests):
+        self.cancelled.extend(requests)
+
+
+def prompt(query):
+    return chatml([{"role": "user", "content": query}])
+
+
+QUERIES = [prompt(f"${budget} on google") for budget in (1000, 2000, 3000, 4000)]
+
+
+def idle_stats(scheduler, timeout=2.0):
+    """Scheduler stats once its thread has retired every request (results resolve just before)."""
+    deadline = time.monotonic() + timeout
+    while scheduler.stats()["running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return scheduler.stats()
+
+
+def test_concurrent_generations_share_steps():
+    backend = RecordingStub(prefix_cache=0)
+    expected = [backend.complete(query, 64, 0.7) for query in QUERIES]
+    backend.steps.clear()
+    scheduler = GenerationScheduler(backend, max_batch_size=8)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.generate(query, 64, 0.7) for query in QUERIES))
+
+    assert asyncio.run(main()) == expected
+    decodes = [size for phase, size in backend.steps if phase == "decode"]
+    # Batched, the generations take about as many steps as the longest one alone
+    assert max(decodes) == len(QUERIES)
+    assert len(decodes) < sum(completion.completion_tokens for completion in expected) / 2
+    stats = idle_stats(scheduler)
+    assert (stats["backend"], stats["completed"], stats["running"], stats["waiting"]) == ("stub", 4, 0, 0)
+
+
+def test_batch_size_is_capped_and_slots_refilled():
+    backend = RecordingStub()
+    scheduler = GenerationScheduler(backend, max_batch_size=2)
+
+    async def main():
+        return await asyncio.gather(scheduler.generate(prompt("$5000 on google"), 2, 0.7),
+                                    *(scheduler.generate(query, 64, 0.7) for query in QUERIES[:2]))
+
+    short, *_ = asyncio.run(main())
+    assert short.completion_tokens == 2
+    assert max(size for _, size in backend.steps) == 2
+    # The third request was admitted as soon as the short one finished, not after the batch drained
+    assert backend.steps.index(("prefill", 1)) < len(backend.steps) // 2
+
+
+def test_non_batching_backend_runs_one_at_a_time():
+    backend = RecordingStub()
+    backend.supports_batching = False
+    assert GenerationScheduler(backend, max_batch_size=8).max_batch_size == 1
+
+
+def test_stream_yields_text_as_it_is_generated():
+    backend = RecordingStub(decode_tps=500, prefix_cache=0)
+    scheduler = GenerationScheduler(backend)
+    request = GenerationRequest(QUERIES[0], 64, 0.7)
+
+    async def main():
+        return [piece async for piece in scheduler.stream(request)]
+
+    pieces = asyncio.run(main())
+    assert len(pieces) > 1 and "".join(pieces) == request.text
+    assert request.completion() == backend.complete(QUERIES[0], 64, 0.7)
+
+
+def test_cancelled_generation_leaves_the_batch():
+    backend = RecordingStub(decode_tps=200)
+    scheduler = GenerationScheduler(backend)
+
+    async def main():
+        doomed = asyncio.create_task(scheduler.generate(QUERIES[0], 1024, 0.7))
+        survivor = asyncio.create_task(scheduler.generate(QUERIES[1], 1024, 0.7))
+        await asyncio.sleep(0.05)
+        doomed.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await doomed
+        return await survivor
+
+    completion = asyncio.run(main())
+    assert completion.text.startswith("Planning")
+    assert [request.prompt for request in backend.cancelled] == [QUERIES[0]]
+    assert backend.steps[-1] == ("decode", 1)
+
+
+def test_closing_a_stream_early_cancels_it():
+    backend = RecordingStub(decode_tps=200)
+    scheduler = GenerationScheduler(backend)
+
+    async def main():
+        stream = scheduler.stream(GenerationRequest(QUERIES[0], 1024, 0.7))
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+        return first
+
+    assert asyncio.run(main())
+    assert len(backend.cancelled) == 1
+    assert idle_stats(scheduler)["running"] == 0
+
+
+def test_backend_error_fails_the_step_not_the_scheduler():
+    backend = RecordingStub()
+    scheduler = GenerationScheduler(backend)
+    backend.fail_next = True
+
+    async def main():
+        with pytest.raises(RuntimeError, match="device lost"):
+            await scheduler.generate(QUERIES[0], 64, 0.7)
+        return await scheduler.generate(QUERIES[1], 64, 0.7)
+
+    assert asyncio.run(main()).text.startswith("Planning")
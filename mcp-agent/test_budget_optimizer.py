@@ -0,0 +1,99 @@
+"""
+Tests for the budget optimizer (tools/budget_optimizer.py): optimality, constraints,
+batched vs single-plan parity and input validation.
+"""
+
+import numpy as np
+import pytest
+
+from tools.ad_tools import budget_calculator_tool, budget_optimizer_tool
+from tools.budget_optimizer import (
+    expected_response, initial_rates, optimize_allocations, optimize_budget, saturation_spend
+)
+
+PLATFORMS = ["tiktok", "facebook", "instagram", "google"]
+
+
+def marginal_returns(result, platforms, days, objective="conversions"):
+    rates = initial_rates(platforms, objective)
+    saturation = saturation_spend(platforms, days)
+    return rates / (1.0 + result["allocation"] / saturation)
+
+
+@pytest.mark.parametrize("budget", [1000, 200000, 2000000])
+def test_solution_equalizes_marginal_returns(budget):
+    result = optimize_budget(budget, PLATFORMS, 30)
+    assert result["allocation"].sum() == pytest.approx(budget, rel=1e-9)
+    funded = result["allocation"] > 1e-6
+    slopes = marginal_returns(result, PLATFORMS, 30)
+    # Funded platforms earn the marginal value on their last dollar; unfunded ones less on their first
+    np.testing.assert_allclose(slopes[funded], result["marginal_value"], rtol=1e-6)
+    assert (slopes[~funded] <= result["marginal_value"] * (1 + 1e-6)).all()
+
+
+@pytest.mark.parametrize("objective", ["conversions", "reach"])
+def test_beats_the_proportional_split(objective):
+    platforms, days, budget = PLATFORMS, 14, 120000
+    proportional = budget_calculator_tool(budget, platforms, "europe", days).platform_allocation
+    spend = np.array([proportional[p] for p in platforms])
+    rates, saturation = initial_rates(platforms, objective), saturation_spend(platforms, days)
+    optimized = optimize_budget(budget, platforms, days, objective)
+    assert optimized[objective].sum() >= expected_response(spend, rates, saturation).sum()
+
+
+def test_respects_min_max_and_daily_limits():
+    result = optimize_budget(
+        50000, PLATFORMS, 10,
+        min_spend={"google": 5000}, max_spend={"tiktok": 8000}, max_daily_spend={"instagram": 300}
+    )
+    allocation = dict(zip(PLATFORMS, result["allocation"]))
+    assert allocation["google"] >= 5000 - 1e-6
+    assert allocation["tiktok"] <= 8000 + 1e-6
+    assert allocation["instagram"] <= 3000 + 1e-6
+    assert result["allocation"].sum() == pytest.approx(50000, rel=1e-9)
+
+
+def test_caps_below_budget_leave_it_unallocated():
+    output = budget_optimizer_tool(10000, ["tiktok", "google"], 5, max_daily_spend={"tiktok": 100, "google": 200})
+    assert output.platform_allocation == {"tiktok": 500.0, "google": 1000.0}
+    assert output.unallocated_budget == 8500.0
+    assert any("unallocated" in r for r in output.recommendations)
+
+
+def test_batched_solver_matches_single_plans():
+    budgets = np.array([1000.0, 25000.0, 400000.0])
+    rates = initial_rates(PLATFORMS, "conversions")
+    saturation = saturation_spend(PLATFORMS, 30)
+    lower, upper = np.zeros(4), np.full(4, np.inf)
+    allocation, marginal = optimize_allocations(budgets, rates, saturation, lower, upper)
+    for row, budget in enumerate(budgets):
+        single = optimize_budget(float(budget), PLATFORMS, 30)
+        np.testing.assert_allclose(allocation[row], single["allocation"], rtol=1e-9, atol=1e-6)
+        assert marginal[row] == pytest.approx(single["marginal_value"])
+
+
+@pytest.mark.parametrize("kwargs,message", [
+    ({"platforms": []}, "At least one platform"),
+    ({"platforms": ["tiktok", " "]}, "non-empty strings"),
+    ({"platforms": ["tiktok"], "max_spend": {"facebok": 100}}, "not in the plan"),
+    ({"platforms": ["tiktok"], "min_spend": {"tiktok": 2000}}, "exceed the total budget"),
+    ({"platforms": ["tiktok"], "objective": "likes"}, "Unsupported objective"),
+    ({"platforms": ["tiktok"], "duration_days": 0}, "duration_days must be positive"),
+    ({"platforms": ["tiktok"], "budget": -1}, "Budget must be non-negative"),
+    ({"platforms": ["tiktok"], "budget": float("nan")}, "Budget must be non-negative"),
+])
+def test_invalid_inputs(kwargs, message):
+    kwargs = {"budget": 1000, "duration_days": 10, **kwargs}
+    with pytest.raises(ValueError, match=message):
+        optimize_budget(**kwargs)
+
+
+def test_zero_day_campaign_is_rejected_before_solving():
+    # Used to divide by zero when spreading the allocation over the days
+    with pytest.raises(ValueError, match="duration_days must be positive"):
+        budget_optimizer_tool(budget=1000, platforms=["tiktok", "facebook"], duration_days=0)
+
+
+def test_empty_batch_solver_input():
+    with pytest.raises(ValueError, match="At least one platform"):
+        optimize_allocations(np.array([1000.0]), np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0))
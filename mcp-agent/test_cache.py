@@ -0,0 +1,105 @@
+"""
+Tests for the tool result cache (mcp_impl/cache.py): keys, LRU + TTL, and the
+manager-backed cache shared by pre-forked workers.
+"""
+
+import multiprocessing
+import time
+
+import pytest
+
+from mcp_impl.cache import SharedToolResultCache, ToolResultCache, canonical_key
+
+
+def test_canonical_key_ignores_order_and_integral_floats():
+    assert canonical_key("t", {"a": 1, "b": [2.0, 3]}) == canonical_key("t", {"b": [2, 3], "a": 1.0})
+    assert canonical_key("t", {"a": 1.5}) != canonical_key("t", {"a": 1})
+    assert canonical_key("t", {}) != canonical_key("u", {})
+
+
+def test_only_opted_in_tools_are_cached():
+    cache = ToolResultCache(tools=["budget_calculator"])
+    assert cache.enabled_for("budget_calculator")
+    assert not cache.enabled_for("var_image_generator")
+    assert not ToolResultCache(tools=["budget_calculator"], max_entries=0).enabled_for("budget_calculator")
+
+
+def test_get_returns_copies():
+    cache = ToolResultCache(tools=["t"])
+    value = {"allocation": {"tiktok": 1.0}}
+    cache.put("t", {"x": 1}, value)
+    value["allocation"]["tiktok"] = 2.0
+    hit = cache.get("t", {"x": 1})
+    assert hit == {"allocation": {"tiktok": 1.0}}
+    hit["allocation"]["tiktok"] = 3.0
+    assert cache.get("t", {"x": 1}) == {"allocation": {"tiktok": 1.0}}
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ToolResultCache(tools=["t"], max_entries=2)
+    cache.put("t", {"x": 1}, 1)
+    cache.put("t", {"x": 2}, 2)
+    assert cache.get("t", {"x": 1}) == 1  # 2 is now least recently used
+    cache.put("t", {"x": 3}, 3)
+    assert cache.get("t", {"x": 2}) is None
+    assert cache.get("t", {"x": 1}) == 1 and cache.get("t", {"x": 3}) == 3
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = ToolResultCache(tools=["t", "short"], ttl_seconds=10, tool_ttls={"short": 1})
+    cache.put("t", {}, "long")
+    cache.put("short", {}, "short")
+    now[0] += 5
+    assert cache.get("t", {}) == "long"
+    assert cache.get("short", {}) is None
+    now[0] += 6
+    assert cache.get("t", {}) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_from_config_reads_opt_in_flags():
+    cache = ToolResultCache.from_config(
+        {"max_entries": 16, "ttl_seconds": 60},
+        {"budget_calculator": {"cache": True, "cache_ttl": 5}, "effect_analyzer": {"cache": True},
+         "var_image_generator": {"enabled": True}}
+    )
+    assert cache.tools == {"budget_calculator", "effect_analyzer"}
+    assert (cache.max_entries, cache.ttl_seconds, cache.tool_ttls) == (16, 60.0, {"budget_calculator": 5.0})
+
+
+def _put_from_worker(store, index, lock):
+    SharedToolResultCache(store, index, lock, tools=["t"]).put("t", {"x": 1}, {"from": "worker"})
+
+
+@pytest.fixture
+def manager():
+    with multiprocessing.Manager() as manager:
+        yield manager
+
+
+def test_shared_cache_is_visible_across_processes(manager):
+    store, index, lock = manager.dict(), manager.dict(), manager.Lock()
+    worker = multiprocessing.Process(target=_put_from_worker, args=(store, index, lock))
+    worker.start()
+    worker.join(30)
+    assert worker.exitcode == 0
+
+    cache = SharedToolResultCache(store, index, lock, tools=["t"])
+    assert cache.get("t", {"x": 1}) == {"from": "worker"}
+    assert cache.get("t", {"x": 2}) is None
+    assert cache.stats()["size"] == 1
+
+
+def test_shared_cache_evicts_oldest_insertions(manager):
+    cache = SharedToolResultCache(manager.dict(), manager.dict(), manager.Lock(), tools=["t"], max_entries=10)
+    for i in range(11):
+        cache.put("t", {"x": i}, i)
+    # One over the limit evicts the oldest entry plus 10% slack
+    assert cache.get("t", {"x": 0}) is None and cache.get("t", {"x": 1}) is None
+    assert cache.get("t", {"x": 10}) == 10
+    assert cache.stats()["size"] == 9 and cache.evictions == 2
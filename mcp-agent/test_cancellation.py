@@ -0,0 +1,60 @@
+"""
+Tests for cooperative cancellation (tools/cancellation.py): tokens, deadlines and the
+per-thread current token.
+"""
+
+import pickle
+import threading
+import time
+
+import pytest
+
+from tools.cancellation import CancelToken, ToolCancelledError, check_cancelled, current_token, use_token
+
+
+def test_token_without_deadline_never_expires():
+    token = CancelToken()
+    assert not token.cancelled and token.reason is None and token.remaining() is None
+    token.check()
+
+
+def test_explicit_cancel_keeps_first_reason():
+    token = CancelToken(time.time() + 60)
+    token.cancel("cancelled")
+    token.cancel("timeout")
+    assert token.cancelled and token.reason == "cancelled"
+    with pytest.raises(ToolCancelledError) as error:
+        token.check()
+    assert error.value.reason == "cancelled"
+
+
+def test_passed_deadline_is_a_timeout():
+    token = CancelToken(time.time() - 1)
+    assert token.cancelled and token.reason == "timeout" and token.remaining() == 0.0
+    with pytest.raises(ToolCancelledError, match="timed out"):
+        token.check()
+
+
+def test_error_keeps_reason_across_pickling():
+    error = pickle.loads(pickle.dumps(ToolCancelledError("timeout")))
+    assert error.reason == "timeout" and "timed out" in str(error)
+
+
+def test_current_token_is_per_thread_and_restored():
+    outer, inner = CancelToken(), CancelToken()
+    inner.cancel()
+    seen = {}
+
+    def other_thread():
+        seen["other"] = current_token()
+
+    with use_token(outer):
+        with use_token(inner):
+            with pytest.raises(ToolCancelledError):
+                check_cancelled()
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+        assert current_token() is outer
+    assert seen["other"] is not inner and not seen["other"].cancelled
+    check_cancelled()  # Outside any call: never cancelled
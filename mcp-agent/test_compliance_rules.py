@@ -0,0 +1,106 @@
+"""
+Tests for the compiled compliance rules (tools/compliance_rules.py): the single-pass
+scanner against naive matching, the shipped rule file against the original hand-written
+checks, and rule validation.
+"""
+
+import random
+import re
+
+import pytest
+
+from tools.ad_tools import compliance_batch_checker_tool, compliance_checker_tool
+from tools.compliance_rules import DEFAULT_RULES_PATH, ComplianceRule, ComplianceRuleSet, FieldScanner
+
+WORDS = ["free", "free shipping", "shipping", "ship", "children", "child", "alcohol", "guarantee",
+         "money back", "money", "back", "sale", "now", "100%", "win", "winner"]
+
+
+def original_checks(platform, region, ad_content, target_audience):
+    """The compliance checks as they were hard-coded before the rule engine."""
+    content, audience = ad_content.lower(), target_audience.lower()
+    issues, recommendations = [], []
+    if region == "europe":
+        if "free" in content and "shipping" in content:
+            issues.append("EU regulations require clear terms for 'free' offers")
+            recommendations.append("Add clear terms and conditions for free shipping")
+        if "children" in audience:
+            issues.append("Stricter regulations for ads targeting children in EU")
+            recommendations.append("Consult local regulations for child-targeted advertising")
+    elif region == "asia":
+        if "alcohol" in content:
+            issues.append("Alcohol advertising restrictions vary by Asian country")
+            recommendations.append("Check specific country regulations for alcohol ads")
+    if platform == "tiktok" and len(content) > 2200:
+        issues.append("TikTok caption limit is 2200 characters")
+        recommendations.append("Shorten caption to fit platform limits")
+    if "guarantee" in content and "money back" in content:
+        recommendations.append("Ensure money-back guarantee terms are clearly stated")
+    return issues, recommendations
+
+
+def random_text(rng, words=20):
+    return " ".join(rng.choice(WORDS + ["lorem", "ipsum"]) for _ in range(words)).upper()
+
+
+def test_default_rules_match_original_checks():
+    rng = random.Random(11)
+    for _ in range(500):
+        platform = rng.choice(["tiktok", "facebook", "google"])
+        region = rng.choice(["europe", "asia", "north_america"])
+        content = random_text(rng, rng.choice([5, 20, 500]))
+        audience = random_text(rng, 3)
+        result = compliance_checker_tool(platform, region, content, audience)
+        assert (result.issues, result.recommendations) == original_checks(platform, region, content, audience)
+
+
+def test_scanner_matches_naive_search():
+    keywords = {"free", "free shipping", "ship", "shipping", "win", "winner", "in"}
+    regexes = [r"\d+%", r"win\w*", r"(?:buy|get) now"]
+    scanner = FieldScanner(keywords, regexes)
+    rng = random.Random(5)
+    for _ in range(500):
+        text = random_text(rng, rng.randint(0, 12)).lower() + rng.choice(["", " buy now", " get now", " 50%"])
+        found_keywords, found_regexes = scanner.scan(text)
+        assert found_keywords == {k for k in keywords if k in text}
+        assert found_regexes == {r for r in regexes if re.search(r, text)}
+
+
+def test_batch_matches_single_checks():
+    rng = random.Random(3)
+    contents = [random_text(rng) for _ in range(50)]
+    batch = compliance_batch_checker_tool("tiktok", "europe", contents, "Parents of children")
+    singles = [compliance_checker_tool("tiktok", "europe", content, "Parents of children") for content in contents]
+    assert batch.results == singles
+    assert batch.compliant_count == sum(r.compliant for r in singles)
+
+
+def test_rule_scoping_and_match_modes():
+    rules = ComplianceRuleSet([
+        ComplianceRule.from_dict({"id": "any", "keywords": ["Casino", "bet"], "match": "any",
+                                  "platforms": ["facebook"], "message": "gambling"}),
+        ComplianceRule.from_dict({"id": "regex", "regex": r"\bno\.? ?1\b", "regions": ["europe"],
+                                  "severity": "recommendation", "recommendation": "substantiate claims"}),
+        ComplianceRule.from_dict({"id": "audience", "field": "audience", "keywords": ["teen"], "message": "minors"}),
+    ])
+    result = rules.check("facebook", "europe", "The No. 1 place to BET", "teens")
+    assert result == {"issues": ["gambling", "minors"], "recommendations": ["substantiate claims"],
+                      "matched_rules": ["any", "regex", "audience"]}
+    assert rules.check("google", "asia", "The No. 1 place to bet", "adults")["matched_rules"] == []
+
+
+@pytest.mark.parametrize("rule", [
+    {"id": "none"},
+    {"id": "two", "keywords": ["a"], "max_length": 3},
+    {"id": "field", "keywords": ["a"], "field": "title"},
+    {"id": "match", "keywords": ["a"], "match": "some"},
+    {"id": "severity", "keywords": ["a"], "severity": "fatal"},
+])
+def test_invalid_rules_are_rejected(rule):
+    with pytest.raises(ValueError, match=rule["id"]):
+        ComplianceRule.from_dict(rule)
+
+
+def test_shipped_rule_file_loads():
+    rules = ComplianceRuleSet.from_file(DEFAULT_RULES_PATH)
+    assert {rule.id for rule in rules.rules} >= {"eu_free_offer_terms", "tiktok_caption_length"}
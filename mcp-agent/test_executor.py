@@ -0,0 +1,214 @@
+"""
+Tests for the shared tool executor pool (mcp_impl/executor.py): backends, backpressure,
+stats for failed calls, deadlines, and killing/resubmitting process calls.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from mcp_impl.executor import ExecutorBusyError, ExecutorConfig, ToolExecutorPool
+from tools.cancellation import check_cancelled
+
+
+def echo(value):
+    return {"value": value, "thread": threading.current_thread().name}
+
+
+def sleepy(seconds):
+    time.sleep(seconds)
+    return {"pid": os.getpid()}
+
+
+def polling(seconds):
+    # Cooperative tool: stops as soon as its token is cancelled or its deadline passes
+    end = time.time() + seconds
+    while time.time() < end:
+        check_cancelled()
+        time.sleep(0.01)
+    return {"done": True}
+
+
+def failing(message):
+    raise ValueError(message)
+
+
+def crash_once(marker):
+    # Kills its worker the first time, then behaves
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return {"pid": os.getpid()}
+
+
+def inline(fn):
+    fn.backend = "inline"
+    return fn
+
+
+@pytest.fixture
+def pool():
+    pool = ToolExecutorPool(ExecutorConfig(max_workers=2, max_queue_depth=4, process_workers=1, cancel_grace=0.2))
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def test_thread_and_inline_backends(pool):
+    async def main():
+        threaded = await pool.run("echo", echo, {"value": 1})
+        on_loop = await pool.run("echo", inline(lambda value: echo(value)), {"value": 2})
+        return threaded, on_loop, threading.current_thread().name
+
+    threaded, on_loop, loop_thread = asyncio.run(main())
+    assert threaded["thread"].startswith("mcp-tool")
+    assert on_loop["thread"] == loop_thread
+    assert pool.stats()["tools"]["echo"]["calls"] == 2
+    assert pool.pending == 0
+
+
+def test_full_queue_is_rejected():
+    pool = ToolExecutorPool(ExecutorConfig(max_workers=1, max_queue_depth=1, process_workers=0))
+    release = threading.Event()
+
+    async def main():
+        held = asyncio.ensure_future(pool.run("hold", release.wait, {}))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorBusyError):
+            await pool.run("echo", echo, {"value": 1})
+        release.set()
+        await held
+
+    asyncio.run(main())
+    assert pool.stats()["tools"]["echo"]["rejected"] == 1
+    pool.shutdown()
+
+
+def test_tool_concurrency_limit_works_on_every_event_loop():
+    pool = ToolExecutorPool(ExecutorConfig(max_workers=4, tool_concurrency={"sleepy": 1}, process_workers=0))
+
+    async def main():
+        started = time.perf_counter()
+        await asyncio.gather(*(pool.run("sleepy", sleepy, {"seconds": 0.1}) for _ in range(2)))
+        return time.perf_counter() - started
+
+    # The second asyncio.run must not reuse the first loop's semaphore
+    assert [asyncio.run(main()) >= 0.2 for _ in range(2)] == [True, True]
+    pool.shutdown()
+
+
+def test_inline_tool_with_deadline_runs_on_thread():
+    pool = ToolExecutorPool(ExecutorConfig(tool_timeouts={"slow_inline": 1}, process_workers=0))
+    fn = inline(lambda: None)
+    assert pool.backend_for("slow_inline", fn) == "thread"
+    assert pool.backend_for("fast_inline", fn) == "inline"
+    pool.shutdown()
+
+
+def test_thread_timeout_stops_cooperative_tool(pool):
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run("polling", polling, {"seconds": 5}, timeout=0.2)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    stats = pool.stats()
+    assert stats["tools"]["polling"]["timeouts"] == 1
+    assert stats["pending"] == 0 and stats["overrunning"] == 0
+
+
+def test_thread_overrun_keeps_its_slot_until_it_returns(pool):
+    release = threading.Event()
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run("hold", release.wait, {}, timeout=0.1)
+        assert pool.stats()["overrunning"] == 1 and pool.pending == 1
+        release.set()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert pool.stats()["overrunning"] == 0 and pool.pending == 0
+
+
+def test_process_backend_runs_in_a_worker(pool):
+    result = asyncio.run(pool.run("sleepy", sleepy, {"seconds": 0}, backend="process"))
+    assert result["pid"] != os.getpid()
+    assert pool.stats()["tools"]["sleepy"]["calls"] == 1
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_failed_call_is_counted_and_timed(pool, backend):
+    async def main():
+        with pytest.raises(ValueError, match="bad input"):
+            await pool.run("failing", failing, {"message": "bad input"}, backend=backend)
+
+    asyncio.run(main())
+    stats = pool.stats()["tools"]["failing"]
+    assert (stats["calls"], stats["errors"]) == (1, 1)
+    assert stats["execution_max_ms"] >= 0 and pool.pending == 0
+
+
+def test_calls_on_crashed_pool_are_resubmitted(tmp_path):
+    pool = ToolExecutorPool(ExecutorConfig(process_workers=2))
+
+    async def main():
+        pool.warm()
+        survivor = asyncio.ensure_future(pool.run("sleepy", sleepy, {"seconds": 1}, backend="process"))
+        await asyncio.sleep(0.2)
+        crashed = await pool.run("crash", crash_once, {"marker": str(tmp_path / "crashed")}, backend="process")
+        return crashed, await survivor
+
+    crashed, survivor = asyncio.run(main())
+    # Both calls were retried on a fresh pool after the first worker died
+    assert (tmp_path / "crashed").exists() and "pid" in crashed and "pid" in survivor
+    assert pool.stats()["tools"]["crash"]["errors"] == 0
+    pool.shutdown(wait=False)
+
+
+def test_process_timeout_kills_worker_and_recovers(pool):
+    async def main():
+        first = await pool.run("sleepy", sleepy, {"seconds": 0}, backend="process")
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run("sleepy", sleepy, {"seconds": 30}, timeout=0.5, backend="process")
+        second = await pool.run("sleepy", sleepy, {"seconds": 0}, backend="process")
+        return first, second
+
+    started = time.perf_counter()
+    first, second = asyncio.run(main())
+    assert time.perf_counter() - started < 20
+    assert first["pid"] != second["pid"]
+    assert pool.stats()["tools"]["sleepy"]["killed"] == 1
+
+
+def test_process_cancellation_kills_worker(pool):
+    async def main():
+        pool.warm()
+        task = asyncio.ensure_future(pool.run("sleepy", sleepy, {"seconds": 30}, backend="process"))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    stats = pool.stats()
+    assert stats["tools"]["sleepy"]["killed"] == 1
+    assert stats["tools"]["sleepy"]["cancelled"] == 1
+    assert stats["pending"] == 0
+
+
+def test_calls_on_killed_pool_are_resubmitted():
+    pool = ToolExecutorPool(ExecutorConfig(process_workers=2, cancel_grace=0.1))
+
+    async def main():
+        pool.warm()
+        survivor = asyncio.ensure_future(pool.run("sleepy", sleepy, {"seconds": 1}, backend="process"))
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run("stuck", sleepy, {"seconds": 30}, timeout=0.3, backend="process")
+        return await survivor
+
+    assert "pid" in asyncio.run(main())
+    assert pool.stats()["tools"]["stuck"]["killed"] == 1
+    pool.shutdown(wait=False)
@@ -0,0 +1,137 @@
+"""
+Tests for the HTTP client pool (mcp_impl/http_pool.py): retry, failover and hedging
+policy, and the per-event-loop shared client.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from mcp_impl.http_pool import HTTPClientSettings, ResilientCaller, configure_http_pool, get_http_client
+
+URLS = ["http://a", "http://b"]
+
+
+def settings(**overrides):
+    values = {"retry_attempts": 2, "backoff_base": 0.001, "backoff_max": 0.01}
+    values.update(overrides)
+    return HTTPClientSettings(**values)
+
+
+def status_error(code):
+    request = httpx.Request("POST", "http://a/execute")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+
+class FakeServers:
+    """``send_once`` stand-in: per-URL scripted outcomes (exception, dict or delay), in call order."""
+
+    def __init__(self, scripts, delay=None):
+        self.scripts = {url: list(outcomes) for url, outcomes in scripts.items()}
+        self.delay = delay or {}
+        self.calls = []
+
+    async def __call__(self, base_url):
+        self.calls.append(base_url)
+        await asyncio.sleep(self.delay.get(base_url, 0))
+        outcome = self.scripts[base_url].pop(0) if len(self.scripts[base_url]) > 1 else self.scripts[base_url][0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def call(caller, servers, request=None):
+    return asyncio.run(caller.call(request or {"tool": "budget_calculator"}, servers))
+
+
+def test_idempotent_calls_retry_and_rotate_urls():
+    servers = FakeServers({"http://a": [status_error(503)], "http://b": [{"status": "success"}]})
+    assert call(ResilientCaller(URLS, settings()), servers) == {"status": "success"}
+    assert servers.calls == ["http://a", "http://b"]
+
+
+def test_non_idempotent_calls_only_retry_connection_errors():
+    caller = ResilientCaller(URLS, settings(idempotent_tools=["budget_calculator"]))
+    request = {"tool": "var_image_generator"}
+
+    servers = FakeServers({"http://a": [status_error(503)]})
+    with pytest.raises(httpx.HTTPStatusError):
+        call(caller, servers, request)
+    assert servers.calls == ["http://a"]
+
+    servers = FakeServers({"http://a": [httpx.ConnectError("refused"), {"status": "success"}]})
+    assert call(caller, servers, request) == {"status": "success"}
+    assert servers.calls == ["http://a", "http://a"]
+
+
+def test_batches_are_idempotent_only_if_every_tool_is():
+    caller = ResilientCaller(URLS, settings(idempotent_tools=["budget_calculator"]))
+    assert caller.is_idempotent({"batch": [{"tool": "budget_calculator"}]})
+    assert not caller.is_idempotent({"batch": [{"tool": "budget_calculator"}, {"tool": "var_image_generator"}]})
+
+
+def test_client_errors_are_not_retried():
+    servers = FakeServers({"http://a": [status_error(400)]})
+    with pytest.raises(httpx.HTTPStatusError):
+        call(ResilientCaller(URLS, settings()), servers)
+    assert len(servers.calls) == 1
+
+
+def test_server_busy_backs_off_then_gives_up():
+    busy = {"error": "server_busy", "retry_after": 0.05, "status": "error"}
+    servers = FakeServers({"http://a": [busy], "http://b": [busy]})
+    started = time.perf_counter()
+    assert call(ResilientCaller(URLS, settings()), servers) == busy
+    assert len(servers.calls) == 3
+    assert time.perf_counter() - started >= 0.1  # Two waits honouring retry_after
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    caller = ResilientCaller(URLS, settings(backoff_base=1.0, backoff_max=2.0))
+    assert all(0 <= caller.backoff(attempt) <= 2.0 for attempt in range(10))
+    assert caller.backoff(0, retry_after=5) == 5
+
+
+def test_slow_primary_is_hedged():
+    servers = FakeServers({"http://a": [{"from": "a"}], "http://b": [{"from": "b"}]},
+                          delay={"http://a": 1.0})
+    caller = ResilientCaller(URLS, settings(hedge_delay=0.05))
+    started = time.perf_counter()
+    assert call(caller, servers) == {"from": "b"}
+    assert time.perf_counter() - started < 0.5
+    assert servers.calls == ["http://a", "http://b"]
+
+
+def test_failed_primary_moves_on_without_waiting_for_hedge_delay():
+    servers = FakeServers({"http://a": [httpx.ConnectError("down")], "http://b": [{"from": "b"}]})
+    caller = ResilientCaller(URLS, settings(hedge_delay=5))
+    started = time.perf_counter()
+    assert call(caller, servers) == {"from": "b"}
+    assert time.perf_counter() - started < 1
+
+
+def test_settings_from_config():
+    parsed = HTTPClientSettings.from_dict({
+        "timeout": 12, "retry_attempts": 1, "base_urls": ["http://b"], "hedge_delay": 0.2,
+        "http": {"max_connections": 8}, "retry": {"backoff_base": 0.5, "idempotent_tools": ["budget_calculator"]},
+    })
+    assert (parsed.timeout, parsed.retry_attempts, parsed.base_urls, parsed.hedge_delay) == (12.0, 1, ["http://b"], 0.2)
+    assert (parsed.max_connections, parsed.backoff_base, parsed.idempotent_tools) == (8, 0.5, ["budget_calculator"])
+
+
+def test_shared_client_is_per_event_loop():
+    configure_http_pool({"timeout": 7})
+
+    async def get_twice():
+        client = get_http_client()
+        same = get_http_client() is client
+        await client.aclose()
+        return client, same
+
+    first, same = asyncio.run(get_twice())
+    second, _ = asyncio.run(get_twice())
+    assert same and first is not second
+    assert first.timeout.read == 7
+    configure_http_pool()
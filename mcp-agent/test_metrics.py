@@ -0,0 +1,119 @@
+"""
+Tests for the metrics registry (mcp_impl/metrics.py): counters, histograms and their
+quantiles, merging worker exports, the Prometheus and JSON views, and the dump thread.
+"""
+
+import json
+
+import pytest
+
+from mcp_impl import metrics
+from mcp_impl.metrics import MetricsDumper, MetricsRegistry, configure_metrics, request_label, response_status
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("tool", "status"))
+    latency = registry.histogram("latency_seconds", "Latency", ("tool",), buckets=(1, 2, 4))
+    requests.inc("a", "success")
+    requests.inc("a", "success", amount=2)
+    requests.inc("b", "error")
+    for value in (0.5, 1.5, 1.5, 3):
+        latency.observe(value, "a")
+    return registry
+
+
+def test_counter_and_histogram_series(registry):
+    exported = registry.export()
+    assert exported["requests_total"] == {("a", "success"): 3.0, ("b", "error"): 1.0}
+    # One count per bucket, one above the last bucket, then the sum
+    assert exported["latency_seconds"] == {("a",): [1, 2, 1, 0, 6.5]}
+    assert registry.counter("requests_total", "ignored") is registry.counter("requests_total", "again")
+
+
+def test_histogram_quantiles(registry):
+    histogram = registry.histogram("latency_seconds", "Latency")
+    series = registry.export()["latency_seconds"][("a",)]
+    assert histogram.quantile(series, 0.5) == 1.5
+    assert histogram.quantile(series, 1.0) == 4
+    assert histogram.quantile([0, 0, 0, 5, 100.0], 0.5) == 4  # Above the last bucket
+    assert histogram.quantile([0, 0, 0, 0, 0.0], 0.5) is None
+
+
+def test_merge_adds_worker_exports(registry):
+    first = registry.export()
+    registry.reset()
+    assert registry.export() == {"requests_total": {}, "latency_seconds": {}}
+    registry.counter("requests_total", "Requests").inc("b", "error")
+    registry.histogram("latency_seconds", "Latency").observe(8, "a")
+
+    merged = registry.merge([first, registry.export()])
+    assert merged["requests_total"] == {("a", "success"): 3.0, ("b", "error"): 2.0}
+    assert merged["latency_seconds"] == {("a",): [1, 2, 1, 1, 14.5]}
+
+
+def test_prometheus_rendering(registry):
+    registry.counter("requests_total", "Requests").inc('quote"d', "success")
+    lines = registry.render_prometheus().splitlines()
+    assert lines[:2] == ["# HELP requests_total Requests", "# TYPE requests_total counter"]
+    assert 'requests_total{tool="a",status="success"} 3' in lines
+    assert 'requests_total{tool="quote\\"d",status="success"} 1' in lines
+    assert lines[-6:] == [
+        'latency_seconds_bucket{tool="a",le="1"} 1',
+        'latency_seconds_bucket{tool="a",le="2"} 3',
+        'latency_seconds_bucket{tool="a",le="4"} 4',
+        'latency_seconds_bucket{tool="a",le="+Inf"} 4',
+        'latency_seconds_sum{tool="a"} 6.5',
+        'latency_seconds_count{tool="a"} 4',
+    ]
+
+
+def test_snapshot(registry):
+    snapshot = registry.snapshot()
+    assert snapshot["requests_total"] == [{"tool": "a", "status": "success", "value": 3.0},
+                                          {"tool": "b", "status": "error", "value": 1.0}]
+    assert snapshot["latency_seconds"] == [{"tool": "a", "count": 4, "mean": 1.625,
+                                            "p50": 1.5, "p95": 3.6, "p99": 3.92}]
+    registry.reset()
+    assert registry.snapshot() == {}
+
+
+def test_status_and_tool_labels():
+    assert response_status({"status": "success"}) == "success"
+    assert response_status({"status": "error", "error": "tool_execution_timeout"}) == "timeout"
+    assert response_status({"status": "error", "error": "server_busy"}) == "busy"
+    assert response_status({"status": "error", "error": "tool_execution_cancelled"}) == "cancelled"
+    assert response_status({"status": "error", "error": "boom"}) == "error"
+    assert request_label({"tool": "budget_calculator"}, {"budget_calculator"}) == "budget_calculator"
+    assert request_label({"tool": "made_up"}, {"budget_calculator"}) == "unknown"
+    assert request_label({"batch": []}, {"budget_calculator"}) == "batch"
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.REGISTRY.reset()
+    try:
+        configure_metrics({"enabled": False})
+        metrics.observe_tool_call("budget_calculator", "success", queue_wait=0.1, execution=0.2)
+        assert metrics.TOOL_CALLS.export() == {}
+        configure_metrics()
+        metrics.observe_tool_call("budget_calculator", "success", queue_wait=0.1, execution=0.2)
+        assert metrics.TOOL_CALLS.export() == {("budget_calculator", "success"): 1.0}
+    finally:
+        configure_metrics()
+        metrics.REGISTRY.reset()
+
+
+def test_dumper_appends_json_lines(tmp_path):
+    path = tmp_path / "dump" / "metrics.jsonl"
+    metrics.REGISTRY.reset()
+    try:
+        metrics.observe_client_request("stdio", "budget_calculator", {"status": "success"}, 0.01)
+        dumper = MetricsDumper(0.05, str(path)).start()
+        dumper.stop()
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+    finally:
+        metrics.REGISTRY.reset()
+    assert lines  # At least the final snapshot written by stop()
+    assert lines[-1]["metrics"]["mcp_client_requests_total"] == [
+        {"transport": "stdio", "tool": "budget_calculator", "status": "success", "value": 1.0}]
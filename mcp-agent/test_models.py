@@ -0,0 +1,110 @@
+"""
+Tests for the shared model registry (agent/models.py): one load per spec and process,
+background pre-warming, remembered failures and per-model stats, using the stub backend.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent import models
+from agent.backends import create_backend
+from agent.models import ModelLoadError, ModelRegistry, ModelSpec
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Record every backend the registry creates; each load takes a little while."""
+    created = []
+
+    def slow_create(*args, **kwargs):
+        time.sleep(0.05)
+        backend = create_backend(*args, **kwargs)
+        created.append(backend)
+        return backend
+
+    monkeypatch.setattr(models, "create_backend", slow_create)
+    return created
+
+
+def stub(**options):
+    return ModelSpec.create("stub-model", backend="stub", options=options)
+
+
+def test_specs_compare_by_value():
+    assert stub(decode_tps=5, prefill_tps=10) == stub(prefill_tps=10, decode_tps=5)
+    assert stub() != stub(decode_tps=5)
+    assert ModelSpec.create("Qwen/Qwen2.5-7B", device="cpu", quantization="int8").key == "modelscope:Qwen/Qwen2.5-7B/int8@cpu"
+
+
+def test_specs_with_list_and_dict_options_are_registry_keys(loads):
+    spec = stub(stop=["</s>", "<|im_end|>"], sampling={"top_k": 40, "min_p": 0.05})
+    same = stub(sampling={"min_p": 0.05, "top_k": 40}, stop=["</s>", "<|im_end|>"])
+    assert spec == same and hash(spec) == hash(same)
+    assert spec != stub(stop=["</s>"], sampling={"top_k": 40, "min_p": 0.05})
+    assert spec.options == {"stop": ["</s>", "<|im_end|>"], "sampling": {"top_k": 40, "min_p": 0.05}}
+
+    registry = ModelRegistry()
+    assert registry.get(spec) is registry.get(same)
+    assert len(loads) == 1 and loads[0].options["stop"] == ["</s>", "<|im_end|>"]
+
+
+def test_concurrent_callers_share_one_load(loads):
+    registry = ModelRegistry()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get(stub()))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+    assert results[0].backend is loads[0] and results[0].scheduler.backend is loads[0]
+    assert registry.get(stub(decode_tps=100)) is not results[0]
+    assert len(loads) == 2
+
+
+def test_prewarm_loads_in_the_background(loads):
+    registry = ModelRegistry()
+    future = registry.prewarm(stub())
+    assert registry.prewarm(stub()) is future
+    assert registry.stats()["stub:stub-model@auto"] == {"state": "loading"}
+
+    loaded = asyncio.run(registry.aget(stub()))
+    assert future.result() is loaded and registry.is_loaded(stub())
+    stats = registry.stats()["stub:stub-model@auto"]
+    assert (stats["state"], stats["backend"], stats["model"]) == ("loaded", "stub", "stub-model")
+    assert stats["load_seconds"] >= 0.05 and "batching" in stats
+    assert len(loads) == 1
+
+
+def test_failed_load_is_remembered_until_unload(loads):
+    registry = ModelRegistry()
+    spec = ModelSpec.create("any", backend="no-such-backend")
+    with pytest.raises(ModelLoadError, match="Unknown inference backend"):
+        registry.get(spec)
+    with pytest.raises(ModelLoadError):
+        asyncio.run(registry.aget(spec))
+    assert not registry.is_loaded(spec)
+    assert registry.stats()["no-such-backend:any@auto"]["state"] == "failed"
+
+    registry.unload(spec)
+    assert registry.stats() == {}
+    with pytest.raises(ModelLoadError):
+        registry.get(spec)
+
+
+def test_unload_then_get_loads_again(loads):
+    registry = ModelRegistry()
+    first = registry.get(stub())
+    registry.unload(stub())
+    assert not registry.is_loaded(stub())
+    assert registry.get(stub()) is not first
+    assert len(loads) == 2
+
+
+def test_process_registry_is_shared():
+    assert models.get_model_registry() is models.get_model_registry()
@@ -0,0 +1,92 @@
+"""
+Tests for the vectorized scenario engine (tools/scenario_engine.py): scenario-by-scenario
+parity with budget_calculator_tool and effect_analyzer_tool.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from tools.ad_tools import budget_calculator_tool, effect_analyzer_tool, scenario_sweep_stream, scenario_sweep_tool
+from tools.scenario_engine import ScenarioBatch, round_cents, sweep_scenarios
+
+PLATFORMS = ["tiktok", "facebook", "instagram", "google", "snapchat"]  # snapchat uses the defaults
+
+
+def random_scenarios(n, seed=7):
+    rng = random.Random(seed)
+    budgets = [rng.choice([round(rng.uniform(100, 100000), 2), float(rng.randrange(1000, 50000, 1000))])
+               for _ in range(n)]
+    # Includes duplicated platforms, which the scalar tool counts twice in its weight sum
+    platform_sets = [[rng.choice(PLATFORMS) for _ in range(rng.randint(1, 4))] for _ in range(n)]
+    durations = [rng.randint(1, 60) for _ in range(n)]
+    return budgets, platform_sets, durations
+
+
+def test_sweep_matches_scalar_tools():
+    budgets, platform_sets, durations = random_scenarios(300)
+    sweep = scenario_sweep_tool(budgets, platform_sets, ["europe"] * len(budgets), durations)
+    columns = {name: i for i, name in enumerate(sweep.platforms)}
+
+    for row, (budget, platforms, days) in enumerate(zip(budgets, platform_sets, durations)):
+        expected = budget_calculator_tool(budget, platforms, "europe", days)
+        allocation = {p: sweep.platform_allocation[row][columns[p]] for p in expected.platform_allocation}
+        assert allocation == expected.platform_allocation
+        assert {p: sweep.daily_spend[row][columns[p]] for p in expected.daily_spend} == expected.daily_spend
+        assert sweep.total_estimated_reach[row] == expected.total_estimated_reach
+
+        total_conversions = 0
+        for platform, spend in expected.platform_allocation.items():
+            if spend <= 0:
+                continue
+            effect = effect_analyzer_tool(platform, spend, "adults", "conversion")
+            col = columns[platform]
+            assert sweep.estimated_clicks[row][col] == effect.estimated_clicks
+            assert sweep.estimated_impressions[row][col] == effect.estimated_impressions
+            assert sweep.estimated_conversions[row][col] == effect.estimated_conversions
+            assert sweep.roi_estimate[row][col] == effect.roi_estimate
+            total_conversions += effect.estimated_conversions
+        assert sweep.total_estimated_conversions[row] == total_conversions
+        assert sweep.total_roi_estimate[row] == round(total_conversions * 50 / budget, 2)
+
+
+def test_unselected_platforms_are_zero():
+    batch = ScenarioBatch.from_platform_sets([["tiktok"], ["google", "tiktok"]])
+    results = sweep_scenarios([1000.0, 2000.0], [10, 10], batch)
+    assert batch.platforms == ["tiktok", "google"]
+    assert results["platform_allocation"][0].tolist() == [1000.0, 0.0]
+    assert results["estimated_clicks"][0, 1] == 0
+
+
+def test_mask_batch_matches_platform_sets():
+    mask = np.array([[True, False, True], [False, True, True]])
+    platforms = ["tiktok", "facebook", "google"]
+    from_mask = sweep_scenarios([5000.0, 7000.0], [7, 14], ScenarioBatch.from_mask(platforms, mask))
+    from_sets = sweep_scenarios([5000.0, 7000.0], [7, 14],
+                                ScenarioBatch.from_platform_sets([["tiktok", "google"], ["facebook", "google"]], platforms))
+    for name, values in from_sets.items():
+        np.testing.assert_array_equal(from_mask[name], values)
+
+
+def test_round_cents_matches_builtin_round():
+    values = np.array([0.125, 1.005, 2.675, 1234.5650000000001, -0.015, 10.0 / 3])
+    assert round_cents(values).tolist() == [round(v, 2) for v in values.tolist()]
+
+
+def test_stream_chunks_reassemble_to_full_sweep():
+    budgets, platform_sets, durations = random_scenarios(25, seed=3)
+    regions = ["europe"] * len(budgets)
+    full = scenario_sweep_tool(budgets, platform_sets, regions, durations)
+    events = list(scenario_sweep_stream(budgets, platform_sets, regions, durations, chunk_size=10))
+
+    partials = [e["data"] for e in events if e["type"] == "partial"]
+    assert [p["offset"] for p in partials] == [0, 10, 20]
+    assert sum((p["platform_allocation"] for p in partials), []) == full.platform_allocation
+    assert sum((p["total_estimated_reach"] for p in partials), []) == full.total_estimated_reach
+    assert events[-1] == {"type": "result", "result": {"platforms": full.platforms, "scenarios": 25}}
+
+
+def test_mismatched_lengths_are_rejected():
+    with pytest.raises(ValueError):
+        scenario_sweep_tool([1000.0, 2000.0], [["tiktok"]], ["europe"], [7])
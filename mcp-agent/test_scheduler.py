@@ -0,0 +1,120 @@
+"""
+Tests for the tool call scheduler (agent/scheduler.py): ``${N.result...}`` references,
+dependency ordering, concurrency limits and timeouts.
+"""
+
+import asyncio
+
+from agent.scheduler import ToolCallScheduler, find_references, resolve_references
+
+
+class FakeTools:
+    """Records call order and concurrency; each call sleeps ``delay`` seconds."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, tool_name, args):
+        self.started.append(tool_name)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(args.get("sleep", self.delay))
+            if tool_name == "fail":
+                raise RuntimeError("boom")
+            return {"tool": tool_name, "result": {"echo": args, "allocation": {"tiktok": 600.0}, "items": [1, 2]}}
+        finally:
+            self.running -= 1
+
+
+def test_find_references():
+    args = {"budget": "${2.result.allocation.tiktok}", "note": ["spend ${1.result.items.0} then ${3.result}"]}
+    assert find_references(args) == {0, 1, 2}
+    assert find_references({"budget": 100, "text": "$5 and {1}"}) == set()
+
+
+def test_resolve_references_keeps_types():
+    results = [{"result": {"allocation": {"tiktok": 600.0}, "items": [1, 2]}}]
+    assert resolve_references("${1.result.allocation.tiktok}", results) == 600.0
+    assert resolve_references("${1.result.items}", results) == [1, 2]
+    assert resolve_references({"x": ["item ${1.result.items.1}"]}, results) == {"x": ["item 2"]}
+
+
+def test_independent_calls_run_concurrently():
+    tools = FakeTools()
+    calls = [{"tool": f"t{i}", "args": {}} for i in range(4)]
+    responses = asyncio.run(ToolCallScheduler(tools, max_concurrency=4).run(calls))
+    assert [r["tool"] for r in responses] == ["t0", "t1", "t2", "t3"]
+    assert tools.max_running == 4
+
+
+def test_concurrency_is_bounded():
+    tools = FakeTools()
+    asyncio.run(ToolCallScheduler(tools, max_concurrency=2).run([{"tool": "t", "args": {}}] * 5))
+    assert tools.max_running == 2
+
+
+def test_dependent_call_waits_and_receives_value():
+    tools = FakeTools()
+    calls = [
+        {"tool": "budget", "args": {"sleep": 0.1}},
+        {"tool": "effect", "args": {"budget": "${1.result.allocation.tiktok}"}},
+        {"tool": "other", "args": {}},
+    ]
+    responses = asyncio.run(ToolCallScheduler(tools).run(calls))
+    assert responses[1]["result"]["echo"] == {"budget": 600.0}
+    # The independent call did not wait for the first one
+    assert tools.started.index("other") < tools.started.index("effect")
+
+
+def test_invalid_and_failed_dependencies_are_reported():
+    calls = [
+        {"tool": "fail", "args": {}},
+        {"tool": "after_fail", "args": {"x": "${1.result}"}},
+        {"tool": "forward", "args": {"x": "${4.result}"}},
+        {"tool": "missing_key", "args": {"x": "${1.result}", "y": "${5.result.nope}"}},
+        {"tool": "ok", "args": {}},
+    ]
+    responses = asyncio.run(ToolCallScheduler(FakeTools(0)).run(calls))
+    assert responses[0]["error"] == "boom"
+    assert responses[1]["error"] == "Dependency failed: tool call(s) [1]"
+    assert responses[2]["error"] == "Invalid reference to tool call(s) [4]"
+    assert responses[3]["error"] == "Invalid reference to tool call(s) [5]"
+    assert responses[4]["tool"] == "ok"
+
+
+def test_unresolvable_path_is_an_error():
+    calls = [{"tool": "a", "args": {}}, {"tool": "b", "args": {"x": "${1.result.nope}"}}]
+    responses = asyncio.run(ToolCallScheduler(FakeTools(0)).run(calls))
+    assert responses[1]["error"].startswith("Could not resolve reference")
+
+
+def test_per_tool_timeouts():
+    calls = [{"tool": "slow", "args": {"sleep": 0.3}}, {"tool": "quick", "args": {"sleep": 0.3}}]
+    scheduler = ToolCallScheduler(FakeTools(), timeout=0.1, tool_timeouts={"slow": 1.0})
+    responses = asyncio.run(scheduler.run(calls))
+    assert responses[0]["tool"] == "slow" and "error" not in responses[0]
+    assert responses[1] == {"error": "tool_call_timeout", "tool": "quick"}
+
+
+def test_calls_can_be_started_one_by_one_and_cancelled():
+    tools = FakeTools()
+
+    async def main():
+        scheduler = ToolCallScheduler(tools)
+        first = scheduler.start({"tool": "a", "args": {"sleep": 0.05}})
+        second = scheduler.start({"tool": "b", "args": {"x": "${1.result.items.0}"}})
+        done = await second
+        hanging = scheduler.start({"tool": "c", "args": {"sleep": 10}})
+        await asyncio.sleep(0.01)
+        scheduler.cancel()
+        await asyncio.gather(hanging, return_exceptions=True)
+        return first.result(), done, hanging.cancelled()
+
+    first, second, cancelled = asyncio.run(main())
+    assert first["tool"] == "a"
+    assert second["result"]["echo"] == {"x": 1}
+    assert cancelled
@@ -0,0 +1,69 @@
+"""
+Tests for MCP message serialization (mcp_impl/serialization.py): encoders, negotiation
+and stdio framing.
+"""
+
+import io
+
+import pytest
+
+from mcp_impl.serialization import (
+    SERIALIZERS, FrameBuffer, encode_frame, for_content_type, get_serializer,
+    negotiate, preference_list, read_frame, text_serializer
+)
+
+MESSAGE = {"tool": "budget_calculator", "args": {"budget": 1000.5, "platforms": ["tiktok", "facebook"]},
+           "id": 7, "text": "line\nbreak, ünïcode"}
+
+
+@pytest.mark.parametrize("name", sorted(SERIALIZERS))
+def test_round_trip(name):
+    serializer = get_serializer(name)
+    assert serializer.loads(serializer.dumps(MESSAGE)) == MESSAGE
+
+
+def test_unknown_serializer_falls_back_to_json():
+    assert get_serializer("nope").name == "json"
+    assert get_serializer(None).name == "json"
+    assert not text_serializer().binary
+    assert not for_content_type("application/json").binary
+
+
+def test_negotiation_picks_first_supported_serializer():
+    assert negotiate(["nope", "json"], ["line"]) == {"serializer": "json", "framing": "line"}
+    assert negotiate(["nope"], ["nope"]) == {"serializer": "json", "framing": "line"}
+    assert negotiate(preference_list("auto"), ["length", "line"])["serializer"] == preference_list("auto")[0]
+    assert list(preference_list("orjson")) == ["orjson", "json"]
+
+
+@pytest.mark.skipif("msgpack" not in SERIALIZERS, reason="msgspec or msgpack not installed")
+def test_binary_serializer_needs_length_framing():
+    assert negotiate(["msgpack", "json"], ["line"])["serializer"] == "json"
+    assert negotiate(["msgpack", "json"], ["length", "line"]) == {"serializer": "msgpack", "framing": "length"}
+    assert for_content_type("application/msgpack").name == "msgpack"
+    with pytest.raises(TypeError):
+        get_serializer("msgpack").dumps_text(MESSAGE)
+
+
+@pytest.mark.parametrize("framing", ["line", "length"])
+def test_frames_survive_arbitrary_chunking(framing):
+    payloads = [b'{"a":1}', b'{"b":"' + b"x" * 300 + b'"}', b"{}"]
+    stream = b"".join(encode_frame(p, framing) for p in payloads)
+
+    buffer, frames = FrameBuffer(framing), []
+    for i in range(0, len(stream), 7):
+        frames.extend(buffer.feed(stream[i:i + 7]))
+    if framing == "line":
+        frames = [frame + b"\n" for frame in frames]
+        payloads = [p + b"\n" for p in payloads]
+    assert frames == payloads
+
+    reader = io.BytesIO(stream)
+    read = [read_frame(reader, framing) for _ in payloads]
+    assert read == payloads
+    assert read_frame(reader, framing) is None
+
+
+def test_length_frames_may_contain_newlines():
+    payload = b"binary\nwith\nnewlines"
+    assert FrameBuffer("length").feed(encode_frame(payload, "length")) == [payload]
@@ -0,0 +1,127 @@
+"""
+Tests for the server's request handling (mcp_impl/server.py): batch requests run
+concurrently, in request or completion order, with one failing call not failing the rest;
+streamed tool calls yield their frames in order and end with the regular response.
+"""
+
+import asyncio
+import time
+
+from mcp_impl.server import execute_batch_request, stream_tool_request
+from tools.ad_tools import TOOL_EXECUTORS, TOOL_STREAMERS
+
+
+def slow_tool(name):
+    time.sleep(0.3)
+    return {"name": name}
+
+
+def fast_tool(name):
+    return {"name": name}
+
+
+def broken_tool(name):
+    raise ValueError(f"{name} is broken")
+
+
+EXECUTORS = {"slow": slow_tool, "fast": fast_tool, "broken": broken_tool}
+
+
+def batch(*tools, ordered=True):
+    return {"batch": [{"tool": tool, "args": {"name": f"{tool}-{i}"}} for i, tool in enumerate(tools)],
+            "ordered": ordered}
+
+
+def test_ordered_batch_follows_request_order():
+    started = time.perf_counter()
+    response = asyncio.run(execute_batch_request(EXECUTORS, batch("slow", "fast", "slow")))
+    assert response["status"] == "success"
+    assert [(r["index"], r["result"]["name"]) for r in response["batch"]] == [(0, "slow-0"), (1, "fast-1"), (2, "slow-2")]
+    # The calls ran concurrently
+    assert time.perf_counter() - started < 0.55
+
+
+def test_unordered_batch_lists_results_as_they_complete():
+    response = asyncio.run(execute_batch_request(EXECUTORS, batch("slow", "fast", ordered=False)))
+    assert [r["index"] for r in response["batch"]] == [1, 0]
+    assert [r["result"]["name"] for r in response["batch"]] == ["fast-1", "slow-0"]
+
+
+def test_failing_call_does_not_fail_the_batch():
+    for ordered in (True, False):
+        response = asyncio.run(execute_batch_request(EXECUTORS, batch("fast", "broken", "missing", ordered=ordered)))
+        by_index = {r["index"]: r for r in response["batch"]}
+        assert response["status"] == "success"
+        assert by_index[0]["status"] == "success"
+        assert by_index[1] == {"error": "broken-1 is broken", "status": "error", "index": 1}
+        assert by_index[2]["error"] == "Tool 'missing' not found"
+
+
+def test_malformed_batch_is_an_error():
+    assert asyncio.run(execute_batch_request(EXECUTORS, {"batch": {"tool": "fast"}}))["status"] == "error"
+
+
+
+def counting_stream(count, delay=0.0, fail_at=None):
+    for i in range(count):
+        if i == fail_at:
+            raise ValueError(f"failed at {i}")
+        time.sleep(delay)
+        yield {"type": "partial", "data": {"i": i}}
+        yield {"type": "progress", "done": i + 1, "total": count}
+    yield {"type": "result", "result": {"count": count}}
+
+
+STREAMERS = {"count": counting_stream}
+
+
+def collect(request, executors=EXECUTORS, streamers=STREAMERS):
+    async def main():
+        return [frame async for frame in stream_tool_request(executors, streamers, request)]
+    return asyncio.run(main())
+
+
+def test_stream_frames_arrive_in_order_and_end_with_the_result():
+    frames = collect({"tool": "count", "args": {"count": 3}})
+    assert frames[:-1] == [
+        frame
+        for i in range(3)
+        for frame in ({"tool": "count", "event": "partial", "data": {"i": i}},
+                      {"tool": "count", "event": "progress", "done": i + 1, "total": 3})
+    ]
+    assert frames[-1] == {"tool": "count", "result": {"count": 3}, "status": "success"}
+
+
+def test_stream_error_is_the_final_frame():
+    frames = collect({"tool": "count", "args": {"count": 3, "fail_at": 1}})
+    assert [frame.get("event") for frame in frames] == ["partial", "progress", None]
+    assert frames[-1] == {"tool": "count", "error": "failed at 1", "status": "error"}
+
+
+def test_tool_without_streamer_yields_one_final_frame():
+    frames = collect({"tool": "fast", "args": {"name": "x"}})
+    assert frames == [{"tool": "fast", "result": {"name": "x"}, "status": "success"}]
+
+
+def test_closing_the_stream_mid_way_stops_waiting_for_the_tool():
+    async def main():
+        stream = stream_tool_request(EXECUTORS, STREAMERS, {"tool": "count", "args": {"count": 20, "delay": 0.05}})
+        first = await stream.__anext__()
+        started = time.perf_counter()
+        await stream.aclose()
+        return first, time.perf_counter() - started
+
+    first, closing = asyncio.run(main())
+    assert first["event"] == "partial" and first["data"] == {"i": 0}
+    # The remaining ~1s of the tool is not waited for
+    assert closing < 0.5
+
+
+def test_registered_sweep_streams_row_chunks():
+    scenarios = 2500
+    args = {"budget": [1000.0] * scenarios, "platforms": [["tiktok", "google"]] * scenarios,
+            "region": ["europe"] * scenarios, "duration_days": [10] * scenarios}
+    frames = collect({"tool": "scenario_sweep", "args": args}, TOOL_EXECUTORS, TOOL_STREAMERS)
+    assert [frame["data"]["offset"] for frame in frames if frame.get("event") == "partial"] == [0, 1000, 2000]
+    assert [frame["done"] for frame in frames if frame.get("event") == "progress"] == [1000, 2000, 2500]
+    assert frames[-1]["status"] == "success" and frames[-1]["result"]["scenarios"] == scenarios
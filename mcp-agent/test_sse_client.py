@@ -0,0 +1,115 @@
+"""
+Tests for the SSE session client (mcp_impl/client.py, SSEMCPClient with ``use_session``):
+connecting, per-tool timeouts and retries, against an in-process fake of the session
+endpoints.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from mcp_impl.client import SSEMCPClient
+from mcp_impl.http_pool import HTTPClientSettings
+
+REQUEST = {"tool": "budget_calculator", "args": {"budget": 1000, "platforms": ["google"]}}
+
+
+class FakeSessionServer:
+    """``GET /sse``, ``POST /jobs`` and ``DELETE /jobs/{id}`` over an httpx mock transport.
+
+    ``job_statuses`` scripts the status of successive job submissions (the last one
+    repeats); accepted jobs are answered on the stream unless ``answer`` is False.
+    """
+
+    def __init__(self, send_session=True, job_statuses=(200,), answer=True):
+        self.send_session = send_session
+        self.job_statuses = list(job_statuses)
+        self.answer = answer
+        self.streams = 0
+        self.jobs = []
+        self.cancelled = []
+        self.events = asyncio.Queue()
+
+    async def _stream(self):
+        if not self.send_session:
+            return
+        yield b'event: session\ndata: {"session_id": "s1"}\n\n'
+        while True:
+            yield await self.events.get()
+
+    async def __call__(self, request):
+        if request.url.path == "/sse":
+            self.streams += 1
+            return httpx.Response(200, content=self._stream(), headers={"Content-Type": "text/event-stream"})
+        if request.method == "DELETE":
+            self.cancelled.append(request.url.path.rsplit("/", 1)[1])
+            return httpx.Response(200, json={"status": "cancelling"})
+        body = json.loads(request.content)
+        self.jobs.append(body)
+        status = self.job_statuses.pop(0) if len(self.job_statuses) > 1 else self.job_statuses[0]
+        if status == 200 and self.answer:
+            result = {"job_id": body["job_id"], "tool": body["tool"], "result": "ok", "status": "success"}
+            self.events.put_nowait(f"event: result\ndata: {json.dumps(result)}\n\n".encode())
+        return httpx.Response(status, json={"job_id": body["job_id"], "status": "accepted"})
+
+
+def run_with_client(server, test, **kwargs):
+    async def main():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(server))
+        settings = HTTPClientSettings(retry_attempts=2, backoff_base=0.001, backoff_max=0.01)
+        client = SSEMCPClient("http://fake", use_session=True, client=http, settings=settings, **kwargs)
+        try:
+            return await asyncio.wait_for(test(client), timeout=10)
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
+
+
+def test_session_job_returns_the_final_event():
+    server = FakeSessionServer()
+
+    async def test(client):
+        return await client.send_request(REQUEST), await client.send_request(REQUEST)
+
+    first, second = run_with_client(server, test)
+    assert first == second == {"tool": "budget_calculator", "result": "ok", "status": "success"}
+    assert server.streams == 1 and len(server.jobs) == 2
+
+
+def test_connect_fails_when_the_stream_closes_before_the_session():
+    server = FakeSessionServer(send_session=False)
+
+    async def test(client):
+        with pytest.raises(httpx.RemoteProtocolError, match="before the session started"):
+            await client.connect()
+        # Each retry reopens the stream instead of waiting on the dead one
+        with pytest.raises(httpx.RemoteProtocolError):
+            await client.send_request(REQUEST)
+
+    run_with_client(server, test)
+    assert server.streams == 4
+
+
+def test_session_job_times_out_and_is_cancelled():
+    server = FakeSessionServer(answer=False)
+
+    async def test(client):
+        with pytest.raises(asyncio.TimeoutError):
+            await client.send_request(REQUEST)
+        await asyncio.sleep(0.05)  # Let the cancel request go out
+
+    run_with_client(server, test, timeout=30, tool_timeouts={"budget_calculator": 0.2})
+    assert server.cancelled == [server.jobs[0]["job_id"]]
+
+
+def test_busy_job_submission_is_retried():
+    server = FakeSessionServer(job_statuses=(503, 200))
+
+    async def test(client):
+        return await client.send_request(REQUEST)
+
+    assert run_with_client(server, test)["status"] == "success"
+    assert len(server.jobs) == 2 and server.streams == 1
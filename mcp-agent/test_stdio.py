@@ -0,0 +1,223 @@
+"""
+Tests for the stdio transport against a real server process: pipelined requests,
+cancellation, serializer/framing negotiation, rejection of malformed frames, and the
+warm process pool and its batches.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from mcp_impl.client import StdioMCPClient, StdioMCPClientPool
+from mcp_impl.serialization import preference_list
+
+SERVER_COMMAND = [sys.executable, "-m", "mcp_impl.server"]
+
+# The legacy server with an extra ``slow`` tool that sleeps for the requested time
+SLOW_SERVER = """
+import asyncio, time
+from mcp_impl import server
+
+def slow_tool(seconds):
+    time.sleep(seconds)
+    return {"slept": seconds}
+
+server.TOOL_EXECUTORS["slow"] = slow_tool
+asyncio.run(server.StdioMCPServer().run())
+"""
+SLOW_SERVER_COMMAND = [sys.executable, "-c", SLOW_SERVER]
+
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    # The server is started as ``python -m mcp_impl.server``
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+
+def budget_request(budget):
+    return {"tool": "budget_calculator",
+            "args": {"budget": budget, "platforms": ["tiktok"], "region": "europe", "duration_days": 10}}
+
+
+def slow_request(seconds):
+    return {"tool": "slow", "args": {"seconds": seconds}}
+
+
+def run_with_client(test, command=SERVER_COMMAND, **kwargs):
+    async def main():
+        client = StdioMCPClient(command, **kwargs)
+        try:
+            return await test(client)
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_are_routed_by_id():
+    async def test(client):
+        return await asyncio.gather(*(client.send_request(budget_request(1000 * i)) for i in range(1, 11)))
+
+    responses = run_with_client(test)
+    assert [r["result"]["platform_allocation"]["tiktok"] for r in responses] == [1000.0 * i for i in range(1, 11)]
+    assert all("id" not in r for r in responses)
+
+
+def test_fast_request_overtakes_slow_one():
+    async def test(client):
+        await client.start_server()
+        slow = asyncio.ensure_future(client.send_request(slow_request(2)))
+        await asyncio.sleep(0)
+        fast = await client.send_request(budget_request(1000))
+        overtaken = not slow.done()
+        return fast, overtaken, await slow
+
+    fast, overtaken, slow = run_with_client(test, SLOW_SERVER_COMMAND)
+    assert fast["status"] == "success" and slow["status"] == "success"
+    assert overtaken
+
+
+def test_cancelled_request_leaves_connection_usable():
+    async def test(client):
+        slow = asyncio.ensure_future(client.send_request(slow_request(2)))
+        await asyncio.sleep(0.5)
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+        response = await client.send_request(budget_request(2000))
+        return response, client.outstanding
+
+    response, outstanding = run_with_client(test, SLOW_SERVER_COMMAND)
+    assert response["result"]["platform_allocation"]["tiktok"] == 2000.0
+    assert outstanding == 0
+
+
+@pytest.mark.parametrize("serializer,framing", [("auto", "length"), ("auto", "line"), ("json", "length")])
+def test_negotiated_encoding(serializer, framing):
+    async def test(client):
+        response = await client.send_request(budget_request(3000))
+        return response, client.serializer.name, client.framing
+
+    response, chosen, chosen_framing = run_with_client(test, serializer=serializer, framing=framing)
+    assert response["status"] == "success"
+    assert chosen == preference_list(serializer)[0] or (chosen == "json" and framing == "line")
+    assert chosen_framing == framing
+
+
+# Stand-in server: holds requests until it has ``argv[1]`` of them, then answers in reverse order
+HOLDING_SERVER = """
+import json, os, sys
+held = []
+for line in sys.stdin:
+    held.append(json.loads(line))
+    if len(held) == int(sys.argv[1]):
+        for request in reversed(held):
+            print(json.dumps({"id": request["id"], "args": request["args"], "pid": os.getpid()}), flush=True)
+        held = []
+"""
+
+
+def holding_server(count):
+    return [sys.executable, "-c", HOLDING_SERVER, str(count)]
+
+
+def test_out_of_order_responses_reach_their_callers():
+    async def test(client):
+        requests = [{"tool": "echo", "args": {"n": n}} for n in range(3)]
+        return await asyncio.wait_for(asyncio.gather(*map(client.send_request, requests)), timeout=10)
+
+    responses = run_with_client(test, command=holding_server(3))
+    assert [r["args"]["n"] for r in responses] == [0, 1, 2]
+
+
+def test_pool_spreads_concurrent_requests_across_processes():
+    async def main():
+        pool = StdioMCPClientPool(holding_server(2), size=2)
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(pool.send_request({"tool": "echo", "args": {"n": n}}) for n in range(4))), timeout=10)
+        finally:
+            await pool.close()
+
+    responses = asyncio.run(main())
+    assert [r["args"]["n"] for r in responses] == [0, 1, 2, 3]
+    pids = [r["pid"] for r in responses]
+    assert len(set(pids)) == 2 and all(pids.count(pid) == 2 for pid in pids)
+
+
+def test_server_exit_fails_pending_requests():
+    # Reads one request and exits without answering
+    server = [sys.executable, "-c", "import sys; sys.stdin.readline()"]
+
+    async def test(client):
+        with pytest.raises(ConnectionError, match="closed its output"):
+            await asyncio.wait_for(client.send_request(budget_request(1000)), timeout=10)
+        return client.outstanding
+
+    assert run_with_client(test, command=server) == 0
+
+
+def test_pool_splits_batches_and_keeps_order():
+    async def main():
+        pool = StdioMCPClientPool(SERVER_COMMAND, size=2)
+        try:
+            await pool.start_server()
+            responses = await pool.send_batch([budget_request(1000 * i) for i in range(1, 6)])
+            busy = [client.outstanding for client in pool.clients]
+            return responses, busy
+        finally:
+            await pool.close()
+
+    responses, busy = asyncio.run(main())
+    assert [r["index"] for r in responses] == list(range(5))
+    assert [r["result"]["platform_allocation"]["tiktok"] for r in responses] == [1000.0 * i for i in range(1, 6)]
+    assert busy == [0, 0]
+
+
+def exchange(lines, replies, command=SERVER_COMMAND):
+    """Write raw ``lines`` to a fresh server and read ``replies`` response lines."""
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    try:
+        for line in lines:
+            process.stdin.write(line.encode("utf-8") + b"\n")
+        process.stdin.flush()
+        responses = [json.loads(process.stdout.readline()) for _ in range(replies)]
+        process.stdin.close()
+        assert process.wait(timeout=30) == 0
+        return responses
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+
+def test_malformed_frames_are_rejected_without_stopping_the_server():
+    responses = exchange(['5', '{"id": 7, "tool": ', '{"id": [1], "tool": "x"}', json.dumps(budget_request(1000))], 4)
+    assert [r["status"] for r in responses] == ["error", "error", "error", "success"]
+    assert "expected an object" in responses[0]["error"] and "id" not in responses[0]
+    assert responses[1]["id"] == 7  # Recovered from the undecodable frame
+    assert "Invalid request id" in responses[2]["error"]
+
+
+def test_duplicate_in_flight_id_is_rejected():
+    slow = {**slow_request(1), "id": "a"}
+    duplicate = {**budget_request(1000), "id": "a"}
+    rejected, answered = exchange([json.dumps(slow), json.dumps(duplicate)], 2, SLOW_SERVER_COMMAND)
+    assert rejected == {"error": "Duplicate request id: 'a' is still in flight", "status": "error", "id": "a"}
+    assert answered["id"] == "a" and answered["tool"] == "slow" and answered["status"] == "success"
+
+
+def test_reply_without_id_fails_pending_requests():
+    # A server answering every request with an error it cannot attribute
+    server = [sys.executable, "-c", "import sys\nfor line in sys.stdin:\n"
+              "    print('{\"error\": \"Invalid json request\", \"status\": \"error\"}', flush=True)"]
+
+    async def test(client):
+        with pytest.raises(RuntimeError, match="without an id: Invalid json request"):
+            await asyncio.wait_for(client.send_request(budget_request(1000)), timeout=10)
+        return client.outstanding
+
+    assert run_with_client(test, server) == 0
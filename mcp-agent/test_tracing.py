@@ -0,0 +1,124 @@
+"""
+Tests for request tracing (mcp_impl/tracing.py): traceparent parsing, span nesting and
+sampling, OTLP/JSON export, and trace context crossing the client/server envelope.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from mcp_impl.server import server_span
+from mcp_impl.tracing import FileSpanExporter, SpanContext, Tracer, configure_tracing, current_span, get_tracer
+from tools.ad_tools import TOOL_EXECUTORS
+
+
+@pytest.fixture
+def exported(tmp_path):
+    """Tracer writing to a temporary file, and a function returning the spans written so far."""
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(FileSpanExporter(str(path), "test-service"))
+
+    def spans():
+        tracer.exporter.flush()
+        lines = [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+        return [span for line in lines for span in line["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+
+    yield tracer, spans
+    tracer.exporter.shutdown()
+
+
+def test_traceparent_round_trip():
+    context = SpanContext("a" * 32, "b" * 16, True)
+    assert context.traceparent == f"00-{'a' * 32}-{'b' * 16}-01"
+    assert SpanContext.from_traceparent(context.traceparent) == context
+    assert SpanContext.from_traceparent(f"00-{'a' * 32}-{'b' * 16}-00").sampled is False
+
+
+@pytest.mark.parametrize("value", [None, 42, "", "00-abc-def-01", f"00-{'z' * 32}-{'b' * 16}-01",
+                                   f"00-{'a' * 32}-{'b' * 16}"])
+def test_malformed_traceparent_is_ignored(value):
+    assert SpanContext.from_traceparent(value) is None
+    assert Tracer.extract({"trace": {"traceparent": value}}) is None
+
+
+def test_nested_spans_share_the_trace(exported):
+    tracer, spans = exported
+    with tracer.span("parent", attributes={"count": 2, "ok": True, "ratio": 0.5, "name": "x"}) as parent:
+        with tracer.span("child", "client") as child:
+            assert current_span() is child
+        assert current_span() is parent
+    assert current_span() is None
+
+    child_otlp, parent_otlp = spans()
+    assert child_otlp["traceId"] == parent_otlp["traceId"] == parent.context.trace_id
+    assert child_otlp["parentSpanId"] == parent_otlp["spanId"] and "parentSpanId" not in parent_otlp
+    assert (child_otlp["kind"], parent_otlp["kind"]) == (3, 1)
+    assert parent_otlp["attributes"] == [
+        {"key": "count", "value": {"intValue": "2"}}, {"key": "ok", "value": {"boolValue": True}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}}, {"key": "name", "value": {"stringValue": "x"}}]
+    assert int(parent_otlp["endTimeUnixNano"]) >= int(parent_otlp["startTimeUnixNano"])
+
+
+def test_errors_mark_the_span(exported):
+    tracer, spans = exported
+    with pytest.raises(ValueError):
+        with tracer.span("fails"):
+            raise ValueError("bad input")
+    with tracer.span("tool error") as span:
+        span.record_response({"error": "tool_execution_timeout", "status": "error"})
+    with tracer.span("tool success") as span:
+        span.record_response({"status": "success"})
+    assert [s["status"] for s in spans()] == [
+        {"code": 2, "message": "bad input"}, {"code": 2, "message": "tool_execution_timeout"}, {"code": 1}]
+
+
+def test_unsampled_traces_are_not_exported(exported):
+    tracer, spans = exported
+    tracer.sample_rate = 0.0
+    with tracer.span("root") as root:
+        with tracer.span("child") as child:
+            pass
+    assert not root.context.sampled and not child.context.sampled
+    assert spans() == []
+
+
+def test_tasks_inherit_the_current_span(exported):
+    tracer, spans = exported
+
+    async def work(name):
+        with tracer.span(name):
+            await asyncio.sleep(0)
+
+    async def main():
+        with tracer.span("query"):
+            await asyncio.gather(work("a"), work("b"))
+
+    asyncio.run(main())
+    by_name = {span["name"]: span for span in spans()}
+    assert by_name["a"]["parentSpanId"] == by_name["b"]["parentSpanId"] == by_name["query"]["spanId"]
+
+
+def test_server_span_continues_the_client_trace(tmp_path):
+    tracer = configure_tracing({"enabled": True, "path": str(tmp_path / "traces.jsonl")})
+    try:
+        assert get_tracer() is tracer
+        with tracer.span("mcp.client.call_tool", "client") as client:
+            envelope = tracer.inject({"tool": "budget_calculator", "args": {}})
+        assert envelope["trace"]["traceparent"] == client.context.traceparent
+
+        with server_span("stdio", envelope, TOOL_EXECUTORS) as server:
+            assert server.context.trace_id == client.context.trace_id
+            assert server.parent_id == client.context.span_id
+            assert server.attributes == {"mcp.transport": "stdio", "mcp.tool": "budget_calculator"}
+    finally:
+        configure_tracing()
+
+
+def test_disabled_tracer_is_a_no_op():
+    tracer = configure_tracing({"enabled": False})
+    assert not tracer.enabled
+    with tracer.span("anything") as span:
+        assert span is None
+    envelope = {"tool": "budget_calculator"}
+    assert tracer.inject(envelope) is envelope
@@ -0,0 +1,45 @@
+"""
+Smoke tests for the transport benchmark (benchmarks/transports.py): every mode of both
+stacks starts its server through main.py and completes a short closed-loop run.
+"""
+
+import argparse
+import asyncio
+import os
+
+import pytest
+
+from benchmarks.transports import MODES, ROOT, bench_mode, drive, parse_mix, percentile
+
+CONFIG = os.path.join(ROOT, "config", "config.yaml")
+
+
+@pytest.mark.parametrize("stack", ["mcp", "legacy"])
+@pytest.mark.parametrize("mode", MODES)
+def test_each_mode_serves_a_short_run(mode, stack, monkeypatch):
+    args = argparse.Namespace(stack=stack, workers=1, config=CONFIG, tracing=False,
+                              concurrency=[2], duration=0.5, warmup=0.2)
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setenv("MCP_AGENT_CONFIG", CONFIG)  # The legacy stdio client points it at its config copy
+    rows = asyncio.run(bench_mode(mode, args, parse_mix("budget_calculator=2,compliance_checker=1")))
+    assert [(row["mode"], row["concurrency"]) for row in rows] == [(mode, 2)]
+    assert rows[0]["requests"] > 0 and rows[0]["errors"] == 0
+
+
+def test_drive_counts_failures_as_errors():
+    async def flaky(tool, args):
+        if tool == "compliance_checker":
+            raise RuntimeError("boom")
+        return True
+
+    result = asyncio.run(drive(flaky, parse_mix("budget_calculator,compliance_checker"), 2, 0.3, 0.0))
+    assert result["requests"] > 0 and 0 < result["errors"] < result["requests"]
+
+
+def test_mix_and_percentiles():
+    assert parse_mix("budget_calculator=2, effect_analyzer") == [("budget_calculator", 2.0), ("effect_analyzer", 1.0)]
+    with pytest.raises(ValueError):
+        parse_mix("no_such_tool=1")
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 99) == 4.0
+    assert percentile([], 99) is None
@@ -0,0 +1,123 @@
+"""
+Tests for pre-forked server workers (mcp_impl/workers.py): one shared socket, a result
+cache and stats shared across workers, worker respawn and graceful shutdown.
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(ROOT, "config", "config.yaml")
+REQUEST = {"tool": "budget_calculator",
+           "args": {"budget": 4321, "platforms": ["tiktok", "google"], "region": "europe", "duration_days": 9}}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert process.poll() is None, f"server exited with code {process.returncode}"
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"server did not listen on port {port}")
+
+
+def main_py(*args, **kwargs):
+    return subprocess.Popen([sys.executable, "main.py", "server", *args], cwd=ROOT, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    with open(CONFIG, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    port = free_port()
+    config["server"]["port"] = port
+    config["metrics"]["dump_interval"] = 0
+    config["tracing"]["enabled"] = False
+    path = tmp_path_factory.mktemp("workers") / "config.yaml"
+    path.write_text(yaml.safe_dump(config), encoding="utf-8")
+
+    process = main_py("--mode", "sse", "--app", "legacy", "--workers", "2", "--config", str(path),
+                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, process)
+        yield process, f"http://127.0.0.1:{port}"
+    finally:
+        if process.poll() is None:
+            process.terminate()
+        process.wait(timeout=30)
+
+
+def cluster(base_url, workers=2, timeout=15.0):
+    """/stats cluster section once ``workers`` workers have published a snapshot."""
+    deadline = time.monotonic() + timeout
+    while True:
+        stats = httpx.get(f"{base_url}/stats", timeout=10).json()["cluster"]
+        if len(stats["workers"]) >= workers or time.monotonic() > deadline:
+            return stats
+        time.sleep(0.5)
+
+
+def test_requests_share_one_result_cache(server):
+    _, base_url = server
+    for _ in range(8):
+        # A fresh connection each time so requests spread over the workers
+        response = httpx.post(f"{base_url}/execute", json=REQUEST, timeout=30).json()
+        assert response["status"] == "success"
+    time.sleep(1.5)  # Let every worker publish its counters
+
+    stats = cluster(base_url)
+    assert len(stats["workers"]) == 2
+    # Only the first request ran the tool, whichever worker got the others
+    assert (stats["totals"]["cache"]["misses"], stats["totals"]["cache"]["hits"]) == (1, 7)
+    assert stats["totals"]["tools"]["budget_calculator"]["calls"] == 1
+
+
+def test_dead_worker_is_replaced(server):
+    _, base_url = server
+    before = cluster(base_url)
+    victim = next(iter(before["workers"].values()))["pid"]
+    os.kill(victim, signal.SIGKILL)
+
+    deadline = time.monotonic() + 20
+    pids = set()
+    while time.monotonic() < deadline:
+        try:
+            pids = {w["pid"] for w in cluster(base_url)["workers"].values()}
+        except httpx.HTTPError:
+            pids = set()
+        if victim not in pids and len(pids) == 2:
+            break
+        time.sleep(0.5)
+    assert victim not in pids and len(pids) == 2
+    assert httpx.post(f"{base_url}/execute", json=REQUEST, timeout=30).json()["status"] == "success"
+
+
+def test_graceful_shutdown(server):
+    process, base_url = server
+    assert httpx.get(f"{base_url}/stats", timeout=10).status_code == 200
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=45) == 0
+
+
+def test_workers_need_the_legacy_app():
+    # FastMCP sessions live in one process, so main.py refuses to pre-fork it
+    process = main_py("--mode", "sse", "--workers", "2", "--config", CONFIG, stderr=subprocess.PIPE, text=True)
+    _, stderr = process.communicate(timeout=60)
+    assert process.returncode == 2 and "--app legacy" in stderr
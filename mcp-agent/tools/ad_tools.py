@@ -1,12 +1,28 @@
 """
 Advertising Tools for MCP Server
-Implements budget calculator, effect analyzer, and compliance checker tools.
+Implements budget calculator, effect analyzer, compliance checker, scenario sweep, and budget optimizer tools.
 """
 
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Iterator, Callable
+from xml.sax.saxutils import escape as xml_escape
+
 from pydantic import BaseModel, Field
 from mcp import Tool
 
+from tools.platform_metrics import (
+    PLATFORM_MULTIPLIERS, DEFAULT_PLATFORM_MULTIPLIER,
+    REACH_MULTIPLIERS, DEFAULT_REACH_MULTIPLIER,
+    PLATFORM_METRICS, DEFAULT_PLATFORM_METRICS,
+    AVG_CONVERSION_VALUE,
+    DAILY_SATURATION_SPEND, DEFAULT_DAILY_SATURATION_SPEND
+)
+from tools.scenario_engine import ScenarioBatch, sweep_scenarios
+from tools.budget_optimizer import optimize_budget
+from tools.compliance_rules import configure_rule_set, get_rule_set
+from tools.artifact_store import artifact_key, configure_artifact_store, get_artifact_store
+from tools.cancellation import check_cancelled
+
 
 class BudgetCalculatorInput(BaseModel):
     """Input model for budget calculator tool."""
@@ -37,20 +53,12 @@ def budget_calculator_tool(
     region_param = region
     duration = duration_days
 
-    # Platform-specific multipliers (simplified)
-    platform_multipliers = {
-        "tiktok": 1.2,
-        "facebook": 1.0,
-        "instagram": 1.1,
-        "google": 0.9
-    }
-
     # Calculate allocations
     allocations = {}
-    total_weight = sum(platform_multipliers.get(p, 1.0) for p in platforms_list)
+    total_weight = sum(PLATFORM_MULTIPLIERS.get(p, DEFAULT_PLATFORM_MULTIPLIER) for p in platforms_list)
 
     for platform in platforms_list:
-        weight = platform_multipliers.get(platform, 1.0)
+        weight = PLATFORM_MULTIPLIERS.get(platform, DEFAULT_PLATFORM_MULTIPLIER)
         allocation = (weight / total_weight) * total_budget
         allocations[platform] = round(allocation, 2)
 
@@ -58,13 +66,7 @@ def budget_calculator_tool(
     daily_spend = {p: round(alloc / duration, 2) for p, alloc in allocations.items()}
 
     # Estimated reach (simplified calculation)
-    reach_multipliers = {
-        "tiktok": 5000,
-        "facebook": 3000,
-        "instagram": 4000,
-        "google": 2000
-    }
-    total_reach = sum(reach_multipliers.get(p, 1000) * alloc for p, alloc in allocations.items())
+    total_reach = sum(REACH_MULTIPLIERS.get(p, DEFAULT_REACH_MULTIPLIER) * alloc for p, alloc in allocations.items())
 
     # Recommendations
     recommendations = []
@@ -112,15 +114,7 @@ def effect_analyzer_tool(
     audience = target_audience
     campaign_type_param = campaign_type
 
-    # Platform-specific performance metrics (simplified)
-    platform_metrics = {
-        "tiktok": {"ctr": 0.025, "cpc": 0.5, "conversion_rate": 0.03},
-        "facebook": {"ctr": 0.015, "cpc": 0.8, "conversion_rate": 0.025},
-        "instagram": {"ctr": 0.02, "cpc": 0.6, "conversion_rate": 0.028},
-        "google": {"ctr": 0.03, "cpc": 0.4, "conversion_rate": 0.035}
-    }
-
-    metrics = platform_metrics.get(platform_param, {"ctr": 0.02, "cpc": 0.5, "conversion_rate": 0.03})
+    metrics = PLATFORM_METRICS.get(platform_param, DEFAULT_PLATFORM_METRICS)
 
     # Calculate predictions
     estimated_clicks = int(budget_param / metrics["cpc"])
@@ -128,8 +122,7 @@ def effect_analyzer_tool(
     estimated_conversions = int(estimated_clicks * metrics["conversion_rate"])
 
     # ROI estimate (simplified)
-    avg_conversion_value = 50  # Assume $50 average order value
-    roi = (estimated_conversions * avg_conversion_value) / budget_param
+    roi = (estimated_conversions * AVG_CONVERSION_VALUE) / budget_param
 
     # Insights
     insights = []
@@ -174,37 +167,10 @@ def compliance_checker_tool(
     target_audience: str
 ) -> ComplianceCheckerOutput:
     """Check advertising content compliance with regional regulations."""
-    platform_param = platform
-    region_param = region
-    content = ad_content.lower()
-    audience = target_audience.lower()
-
-    issues = []
-    recommendations = []
-
-    # Regional compliance checks (simplified)
-    if region_param == "europe":
-        if "free" in content and "shipping" in content:
-            issues.append("EU regulations require clear terms for 'free' offers")
-            recommendations.append("Add clear terms and conditions for free shipping")
-        if "children" in audience:
-            issues.append("Stricter regulations for ads targeting children in EU")
-            recommendations.append("Consult local regulations for child-targeted advertising")
-
-    elif region_param == "asia":
-        if "alcohol" in content:
-            issues.append("Alcohol advertising restrictions vary by Asian country")
-            recommendations.append("Check specific country regulations for alcohol ads")
-
-    # Platform-specific checks
-    if platform_param == "tiktok":
-        if len(content) > 2200:
-            issues.append("TikTok caption limit is 2200 characters")
-            recommendations.append("Shorten caption to fit platform limits")
-
-    # General checks
-    if "guarantee" in content and "money back" in content:
-        recommendations.append("Ensure money-back guarantee terms are clearly stated")
+    # Declarative rules (config/compliance_rules.yaml) compiled into one scan per field
+    result = get_rule_set().check(platform, region, ad_content, target_audience)
+    issues = result["issues"]
+    recommendations = result["recommendations"]
 
     compliant = len(issues) == 0
     risk_level = "low" if compliant else ("medium" if len(issues) <= 2 else "high")
@@ -217,6 +183,212 @@ def compliance_checker_tool(
     )
 
 
+class ComplianceBatchCheckerInput(BaseModel):
+    """Input model for batch compliance checker tool."""
+    platform: str = Field(..., description="Platform for compliance check")
+    region: str = Field(..., description="Target region")
+    ad_contents: List[str] = Field(..., description="Ad content variants to check")
+    target_audience: str = Field(..., description="Target audience description")
+
+
+class ComplianceBatchCheckerOutput(BaseModel):
+    """Output model for batch compliance checker tool (one entry per ad variant)."""
+    results: List[ComplianceCheckerOutput]
+    compliant_count: int
+
+
+def compliance_batch_checker_tool(
+    platform: str,
+    region: str,
+    ad_contents: List[str],
+    target_audience: str
+) -> ComplianceBatchCheckerOutput:
+    """Check many ad content variants against regional regulations in one call."""
+    results = []
+    for result in get_rule_set().iter_check_batch(platform, region, ad_contents, target_audience):
+        check_cancelled()
+        issues = result["issues"]
+        compliant = len(issues) == 0
+        results.append(ComplianceCheckerOutput(
+            compliant=compliant,
+            issues=issues,
+            recommendations=result["recommendations"],
+            risk_level="low" if compliant else ("medium" if len(issues) <= 2 else "high")
+        ))
+
+    return ComplianceBatchCheckerOutput(
+        results=results,
+        compliant_count=sum(1 for r in results if r.compliant)
+    )
+
+
+def compliance_batch_checker_stream(
+    platform: str,
+    region: str,
+    ad_contents: List[str],
+    target_audience: str,
+    progress_every: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """Streaming variant: yields each variant with issues or recommendations as soon as it is checked."""
+    total = len(ad_contents)
+    compliant_count = 0
+    results = get_rule_set().iter_check_batch(platform, region, ad_contents, target_audience)
+    for index, result in enumerate(results):
+        check_cancelled()
+        compliant = not result["issues"]
+        compliant_count += compliant
+        if result["issues"] or result["recommendations"]:
+            yield {"type": "partial", "data": {"index": index, "compliant": compliant, **result}}
+        if (index + 1) % progress_every == 0:
+            yield {"type": "progress", "done": index + 1, "total": total}
+
+    yield {"type": "result", "result": {"checked": total, "compliant_count": compliant_count}}
+
+
+class ScenarioSweepInput(BaseModel):
+    """Input model for scenario sweep tool (one entry per scenario in every column)."""
+    budget: List[float] = Field(..., description="Total advertising budget in USD, per scenario")
+    platforms: List[List[str]] = Field(..., description="Platforms to advertise on, per scenario")
+    region: List[str] = Field(..., description="Target region, per scenario")
+    duration_days: List[int] = Field(..., description="Campaign duration in days, per scenario")
+
+
+class ScenarioSweepOutput(BaseModel):
+    """Output model for scenario sweep tool.
+
+    Per-platform fields are N x P matrices whose columns follow ``platforms``
+    (zero where a scenario does not use the platform).
+    """
+    platforms: List[str]
+    platform_allocation: List[List[float]]
+    daily_spend: List[List[float]]
+    estimated_impressions: List[List[int]]
+    estimated_clicks: List[List[int]]
+    estimated_conversions: List[List[int]]
+    roi_estimate: List[List[float]]
+    total_estimated_reach: List[int]
+    total_estimated_conversions: List[int]
+    total_roi_estimate: List[float]
+
+
+def scenario_sweep_tool(
+    budget: List[float],
+    platforms: List[List[str]],
+    region: List[str],
+    duration_days: List[int]
+) -> ScenarioSweepOutput:
+    """Evaluate many budget/effect scenarios at once with the vectorized scenario engine.
+
+    Numbers match budget_calculator_tool (allocation, daily spend, reach) and
+    effect_analyzer_tool run on each platform's allocation.
+    """
+    n = len(budget)
+    if not (len(platforms) == len(region) == len(duration_days) == n):
+        raise ValueError("budget, platforms, region and duration_days must have the same length")
+
+    batch = ScenarioBatch.from_platform_sets(platforms)
+    results = sweep_scenarios(budget, duration_days, batch)
+
+    return ScenarioSweepOutput(
+        platforms=batch.platforms,
+        **{name: values.tolist() for name, values in results.items()}
+    )
+
+
+def scenario_sweep_stream(
+    budget: List[float],
+    platforms: List[List[str]],
+    region: List[str],
+    duration_days: List[int],
+    chunk_size: int = 1000
+) -> Iterator[Dict[str, Any]]:
+    """Streaming variant: yields the sweep in row chunks (``offset`` + columns) as they are computed."""
+    n = len(budget)
+    if not (len(platforms) == len(region) == len(duration_days) == n):
+        raise ValueError("budget, platforms, region and duration_days must have the same length")
+
+    batch = ScenarioBatch.from_platform_sets(platforms)
+    for start in range(0, n, chunk_size):
+        check_cancelled()
+        stop = min(start + chunk_size, n)
+        results = sweep_scenarios(budget[start:stop], duration_days[start:stop], batch.slice(start, stop))
+        yield {"type": "partial", "data": {
+            "offset": start,
+            "platforms": batch.platforms,
+            **{name: values.tolist() for name, values in results.items()}
+        }}
+        yield {"type": "progress", "done": stop, "total": n}
+
+    yield {"type": "result", "result": {"platforms": batch.platforms, "scenarios": n}}
+
+
+class BudgetOptimizerInput(BaseModel):
+    """Input model for budget optimizer tool."""
+    budget: float = Field(..., description="Total advertising budget in USD")
+    platforms: List[str] = Field(..., description="Candidate platforms")
+    duration_days: int = Field(..., description="Campaign duration in days")
+    objective: str = Field("conversions", description="What to maximize: 'conversions' or 'reach'")
+    min_spend: Optional[Dict[str, float]] = Field(None, description="Minimum total spend per platform")
+    max_spend: Optional[Dict[str, float]] = Field(None, description="Maximum total spend per platform")
+    max_daily_spend: Optional[Dict[str, float]] = Field(None, description="Maximum daily spend per platform")
+
+
+class BudgetOptimizerOutput(BaseModel):
+    """Output model for budget optimizer tool."""
+    platform_allocation: Dict[str, float]
+    daily_spend: Dict[str, float]
+    expected_conversions: Dict[str, float]
+    expected_reach: Dict[str, int]
+    total_expected_conversions: float
+    total_expected_reach: int
+    unallocated_budget: float
+    marginal_value: float
+    recommendations: List[str]
+
+
+def budget_optimizer_tool(
+    budget: float,
+    platforms: List[str],
+    duration_days: int,
+    objective: str = "conversions",
+    min_spend: Optional[Dict[str, float]] = None,
+    max_spend: Optional[Dict[str, float]] = None,
+    max_daily_spend: Optional[Dict[str, float]] = None
+) -> BudgetOptimizerOutput:
+    """Allocate budget to maximize expected conversions or reach under diminishing returns."""
+    result = optimize_budget(
+        budget, platforms, duration_days, objective,
+        min_spend=min_spend, max_spend=max_spend, max_daily_spend=max_daily_spend
+    )
+    names = list(dict.fromkeys(platforms))
+    allocation = result["allocation"]
+
+    allocations = {p: round(float(a), 2) for p, a in zip(names, allocation)}
+    daily_spend = {p: round(a / duration_days, 2) for p, a in allocations.items()}
+    conversions = {p: round(float(c), 2) for p, c in zip(names, result["conversions"])}
+    reach = {p: int(r) for p, r in zip(names, result["reach"])}
+    unallocated = round(max(budget - float(allocation.sum()), 0.0), 2)
+
+    recommendations = []
+    if unallocated > 0.01:
+        recommendations.append("Spend caps leave part of the budget unallocated - relax max/daily limits or add platforms")
+    saturated = [p for p, a in allocations.items() if a > DAILY_SATURATION_SPEND.get(p, DEFAULT_DAILY_SATURATION_SPEND) * duration_days]
+    if saturated:
+        recommendations.append(f"Spend on {', '.join(saturated)} is past saturation - consider a longer campaign")
+
+    return BudgetOptimizerOutput(
+        platform_allocation=allocations,
+        daily_spend=daily_spend,
+        expected_conversions=conversions,
+        expected_reach=reach,
+        total_expected_conversions=round(sum(conversions.values()), 2),
+        total_expected_reach=sum(reach.values()),
+        unallocated_budget=unallocated,
+        marginal_value=float(result["marginal_value"]),
+        recommendations=recommendations
+    )
+
+
 # --------------------------
 # Visual Autoregressive Modeling (VAR) tool (stub)
 # --------------------------
@@ -226,26 +398,49 @@ class VARImageInput(BaseModel):
     width: int = Field(1024, description="Image width in pixels")
     height: int = Field(1024, description="Image height in pixels")
     style: Optional[str] = Field(None, description="Optional visual style (e.g., 'photorealistic', 'illustration')")
+    inline: bool = Field(False, description="Also return the image inline as a data URL")
 
 
 class VARImageOutput(BaseModel):
-    """Output model for VAR image generator."""
-    image_data_url: str
+    """Output model for VAR image generator.
+
+    The image bytes live in the artifact store; ``artifact_uri`` is served by the
+    streamable HTTP server and ``artifact_path`` is the local file.
+    """
+    artifact_id: str
+    artifact_uri: str
+    artifact_path: str
     mime_type: str
+    size_bytes: int
+    cached: bool
     metadata: Dict[str, Any]
+    image_data_url: Optional[str] = None
 
 
-def var_image_tool(prompt: str, width: int = 1024, height: int = 1024, style: Optional[str] = None) -> VARImageOutput:
+def _render_placeholder_svg(prompt: str, width: int, height: int) -> Iterator[bytes]:
+    """Render the placeholder SVG as a stream of chunks (a real generator would stream tiles)."""
+    check_cancelled()
+    yield f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'.encode("utf-8")
+    yield b'  <rect width="100%" height="100%" fill="#f3f4f6"/>'
+    yield b'  <text x="50%" y="45%" dominant-baseline="middle" text-anchor="middle" font-size="36" fill="#111">Ad Image Placeholder</text>'
+    yield (f'  <text x="50%" y="60%" dominant-baseline="middle" text-anchor="middle" font-size="20" fill="#444">'
+           f'{xml_escape(prompt)}</text>').encode("utf-8")
+    yield b'</svg>'
+
+
+def var_image_tool(prompt: str, width: int = 1024, height: int = 1024, style: Optional[str] = None,
+                   inline: bool = False) -> VARImageOutput:
     """Generate an advertising image from a prompt.
 
-    NOTE: This is a minimal stub implementation that returns a simple SVG data URL as a placeholder so
+    Images are written to the content-addressed artifact store keyed by
+    (prompt, width, height, style), so repeated prompts are served from disk without
+    regenerating. The tool returns a handle; pass ``inline=True`` to also get a data URL.
+
+    NOTE: This is a minimal stub implementation that renders a simple SVG placeholder so
     the tool can be used end-to-end without additional heavy image-generation dependencies. Replace
-    this with a real VAR/modelscope/StableDiffusion implementation when ready.
+    ``_render_placeholder_svg`` with a real VAR/modelscope/StableDiffusion implementation when ready.
     """
-    # Create a simple SVG placeholder (no external deps)
-    svg = f'''<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">\n  <rect width="100%" height="100%" fill="#f3f4f6"/>\n  <text x="50%" y="45%" dominant-baseline="middle" text-anchor="middle" font-size="36" fill="#111">Ad Image Placeholder</text>\n  <text x="50%" y="60%" dominant-baseline="middle" text-anchor="middle" font-size="20" fill="#444">{prompt}</text>\n</svg>'''
-    data_url = "data:image/svg+xml;utf8," + svg.replace('\n', '')
-
+    mime_type = "image/svg+xml"
     metadata = {
         "width": width,
         "height": height,
@@ -253,7 +448,27 @@ def var_image_tool(prompt: str, width: int = 1024, height: int = 1024, style: Op
         "generator": "var_stub"
     }
 
-    return VARImageOutput(image_data_url=data_url, mime_type="image/svg+xml", metadata=metadata)
+    store = get_artifact_store()
+    artifact_id = artifact_key(prompt=prompt, width=width, height=height, style=style, generator="var_stub")
+    info = store.info(artifact_id)
+    cached = info is not None
+    if not cached:
+        info = store.put(artifact_id, _render_placeholder_svg(prompt, width, height), mime_type, metadata)
+
+    image_data_url = None
+    if inline:
+        image_data_url = "data:image/svg+xml;utf8," + b"".join(store.iter_chunks(artifact_id)).decode("utf-8")
+
+    return VARImageOutput(
+        artifact_id=artifact_id,
+        artifact_uri=f"/artifacts/{artifact_id}",
+        artifact_path=str(store.path_for(artifact_id)),
+        mime_type=info["mime_type"],
+        size_bytes=info["size_bytes"],
+        cached=cached,
+        metadata=metadata,
+        image_data_url=image_data_url
+    )
 
 
 # Tool definitions for MCP
@@ -302,11 +517,62 @@ COMPLIANCE_CHECKER_TOOL = Tool(
     }
 )
 
+COMPLIANCE_BATCH_CHECKER_TOOL = Tool(
+    name="compliance_batch_checker",
+    description="Check many ad content variants for compliance with regional regulations in one call",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "platform": {"type": "string", "description": "Platform for compliance check"},
+            "region": {"type": "string", "description": "Target region"},
+            "ad_contents": {"type": "array", "items": {"type": "string"}, "description": "Ad content variants to check"},
+            "target_audience": {"type": "string", "description": "Target audience description"}
+        },
+        "required": ["platform", "region", "ad_contents", "target_audience"]
+    }
+)
+
+SCENARIO_SWEEP_TOOL = Tool(
+    name="scenario_sweep",
+    description="Evaluate many budget allocation and performance scenarios at once (columnar inputs, one entry per scenario)",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "budget": {"type": "array", "items": {"type": "number"}, "description": "Total advertising budget in USD, per scenario"},
+            "platforms": {"type": "array", "items": {"type": "array", "items": {"type": "string"}}, "description": "Platforms to advertise on, per scenario"},
+            "region": {"type": "array", "items": {"type": "string"}, "description": "Target region, per scenario"},
+            "duration_days": {"type": "array", "items": {"type": "integer"}, "description": "Campaign duration in days, per scenario"}
+        },
+        "required": ["budget", "platforms", "region", "duration_days"]
+    }
+)
+
+BUDGET_OPTIMIZER_TOOL = Tool(
+    name="budget_optimizer",
+    description="Optimize budget allocation to maximize expected conversions or reach under per-platform and daily-spend constraints",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "budget": {"type": "number", "description": "Total advertising budget in USD"},
+            "platforms": {"type": "array", "items": {"type": "string"}, "description": "Candidate platforms"},
+            "duration_days": {"type": "integer", "description": "Campaign duration in days"},
+            "objective": {"type": "string", "enum": ["conversions", "reach"], "description": "What to maximize"},
+            "min_spend": {"type": "object", "additionalProperties": {"type": "number"}, "description": "Minimum total spend per platform"},
+            "max_spend": {"type": "object", "additionalProperties": {"type": "number"}, "description": "Maximum total spend per platform"},
+            "max_daily_spend": {"type": "object", "additionalProperties": {"type": "number"}, "description": "Maximum daily spend per platform"}
+        },
+        "required": ["budget", "platforms", "duration_days"]
+    }
+)
+
 # Canonical tool registry and executor mapping
 AD_TOOLS = [
     BUDGET_CALCULATOR_TOOL,
     EFFECT_ANALYZER_TOOL,
     COMPLIANCE_CHECKER_TOOL,
+    COMPLIANCE_BATCH_CHECKER_TOOL,
+    SCENARIO_SWEEP_TOOL,
+    BUDGET_OPTIMIZER_TOOL,
     Tool(
         name="var_image_generator",
         description="Generate advertising images from text prompts (Visual Autoregressive Modeling)",
@@ -316,7 +582,8 @@ AD_TOOLS = [
                 "prompt": {"type": "string", "description": "Text prompt describing the desired ad image"},
                 "width": {"type": "integer", "description": "Image width in pixels"},
                 "height": {"type": "integer", "description": "Image height in pixels"},
-                "style": {"type": "string", "description": "Optional visual style"}
+                "style": {"type": "string", "description": "Optional visual style"},
+                "inline": {"type": "boolean", "description": "Also return the image inline as a data URL"}
             },
             "required": ["prompt"]
         }
@@ -324,9 +591,59 @@ AD_TOOLS = [
 ]
 
 # Tool execution mapping
+EXECUTION_BACKENDS = ("inline", "thread", "process")
+
+
+@dataclass(frozen=True)
+class ToolExecutor:
+    """A tool function plus the backend the legacy servers run it on.
+
+    ``inline`` runs on the event loop with no executor hop (cheap arithmetic), ``thread``
+    on the shared thread pool (I/O-bound work) and ``process`` on the warm process pool
+    (CPU-bound work that would otherwise hold the GIL). Calling the executor calls ``fn``.
+    """
+    fn: Callable[..., Any]
+    backend: str = "thread"
+
+    def __call__(self, **kwargs) -> Any:
+        return self.fn(**kwargs)
+
+
 TOOL_EXECUTORS = {
-    "budget_calculator": budget_calculator_tool,
-    "effect_analyzer": effect_analyzer_tool,
-    "compliance_checker": compliance_checker_tool,
-    "var_image_generator": var_image_tool
-}
\ No newline at end of file
+    "budget_calculator": ToolExecutor(budget_calculator_tool, "inline"),
+    "effect_analyzer": ToolExecutor(effect_analyzer_tool, "inline"),
+    # Regex scans over ad content of any length: off the event loop
+    "compliance_checker": ToolExecutor(compliance_checker_tool, "thread"),
+    "compliance_batch_checker": ToolExecutor(compliance_batch_checker_tool, "process"),
+    "scenario_sweep": ToolExecutor(scenario_sweep_tool, "process"),
+    "budget_optimizer": ToolExecutor(budget_optimizer_tool, "process"),
+    "var_image_generator": ToolExecutor(var_image_tool, "thread")
+}
+
+# Streaming executors: generators yielding {"type": "progress" | "partial", ...} events and a
+# final {"type": "result", "result": ...} event. Used when a request asks for "stream": true.
+TOOL_STREAMERS = {
+    "compliance_batch_checker": compliance_batch_checker_stream,
+    "scenario_sweep": scenario_sweep_stream
+}
+
+
+def configure_tools(tools_config: Optional[Dict[str, Any]] = None) -> None:
+    """Apply the ``tools`` section of config.yaml (compliance rules file, artifact directory and limits).
+
+    Also used as the process-pool initializer so tool worker processes see the same setup.
+    """
+    tools_config = tools_config or {}
+    rules_file = (tools_config.get('compliance_checker') or {}).get('rules_file')
+    if rules_file:
+        configure_rule_set(rules_file)
+    image_config = tools_config.get('var_image_generator') or {}
+    if any(image_config.get(key) for key in ('artifact_dir', 'max_size_mb', 'max_age_days')):
+        # 0 or a missing value disables a limit
+        max_size_mb = image_config.get('max_size_mb')
+        max_age_days = image_config.get('max_age_days')
+        configure_artifact_store(
+            image_config.get('artifact_dir'),
+            max_bytes=int(max_size_mb * 1024 * 1024) if max_size_mb else None,
+            max_age_seconds=max_age_days * 86400.0 if max_age_days else None
+        )
@@ -0,0 +1,170 @@
+"""
+Artifact Store
+Content-addressed on-disk cache for generated binary artifacts (ad images).
+Artifacts are written once, addressed by a hash of their generation parameters,
+and read back in chunks so large payloads never have to pass through JSON.
+The store can be capped by total size and artifact age; reads refresh an artifact's
+mtime, so eviction (oldest mtime first) is least-recently-used.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable, Iterator, List, Tuple
+
+DEFAULT_ARTIFACT_DIR = Path(os.environ.get("MCP_AGENT_ARTIFACT_DIR", Path.home() / ".cache" / "mcp-agent" / "artifacts"))
+CHUNK_SIZE = 64 * 1024
+
+_ARTIFACT_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+def artifact_key(**params: Any) -> str:
+    """Content address for an artifact: SHA-256 of its canonical generation parameters."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """Write-once artifact files under ``root/<id[:2]>/<id>`` with a JSON sidecar.
+
+    ``max_bytes`` caps the total artifact size and ``max_age_seconds`` the time since an
+    artifact was last written or read (None disables either). Limits are enforced after
+    each ``put``; the artifact just written is never evicted.
+    """
+
+    def __init__(self, root=DEFAULT_ARTIFACT_DIR, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[float] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    def _path(self, artifact_id: str) -> Path:
+        if not _ARTIFACT_ID.match(artifact_id):
+            raise ValueError(f"Invalid artifact id: {artifact_id!r}")
+        return self.root / artifact_id[:2] / artifact_id
+
+    def path_for(self, artifact_id: str) -> Path:
+        return self._path(artifact_id)
+
+    def exists(self, artifact_id: str) -> bool:
+        return self._path(artifact_id).exists()
+
+    def info(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        """Sidecar metadata (mime type, size, ...), or None if the artifact is missing."""
+        path = self._path(artifact_id)
+        try:
+            with open(path.with_suffix(".json"), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            # Mark as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return info
+
+    def put(self, artifact_id: str, chunks: Iterable[bytes], mime_type: str,
+            metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Stream ``chunks`` into the store; concurrent writers of the same id are harmless."""
+        path = self._path(artifact_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            info = {"artifact_id": artifact_id, "mime_type": mime_type, "size_bytes": size, "metadata": metadata or {}}
+            with open(path.with_suffix(".json"), 'w', encoding='utf-8') as f:
+                json.dump(info, f, ensure_ascii=False)
+            # Atomic publish: readers see either no artifact or the complete file
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        if self.max_bytes is not None or self.max_age_seconds is not None:
+            self.evict(keep=artifact_id)
+        return info
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every stored artifact."""
+        entries = []
+        if not self.root.is_dir():
+            return entries
+        for shard in self.root.iterdir():
+            if not shard.is_dir():
+                continue
+            for path in shard.iterdir():
+                if not _ARTIFACT_ID.match(path.name):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:  # Evicted concurrently
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Delete expired artifacts, then least-recently-used ones until under ``max_bytes``.
+
+        Returns the number of artifacts removed; ``keep`` is never removed.
+        """
+        entries = sorted(e for e in self._entries() if e[2].name != keep)
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and self.exists(keep):
+            total += self._path(keep).stat().st_size
+        expire_before = time.time() - self.max_age_seconds if self.max_age_seconds is not None else None
+
+        removed = 0
+        for mtime, size, path in entries:
+            expired = expire_before is not None and mtime < expire_before
+            over = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or over):
+                # Entries are oldest first: nothing later is expired either
+                break
+            for victim in (path, path.with_suffix(".json")):
+                try:
+                    victim.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+    def iter_chunks(self, artifact_id: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Read an artifact back in fixed-size chunks."""
+        with open(self._path(artifact_id), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+_artifact_store: Optional[ArtifactStore] = None
+_artifact_store_lock = threading.Lock()
+
+
+def configure_artifact_store(root=None, max_bytes: Optional[int] = None,
+                             max_age_seconds: Optional[float] = None) -> ArtifactStore:
+    """(Re)create the process-wide artifact store rooted at ``root`` with optional size/age limits."""
+    global _artifact_store
+    with _artifact_store_lock:
+        _artifact_store = ArtifactStore(Path(root).expanduser() if root else DEFAULT_ARTIFACT_DIR,
+                                        max_bytes=max_bytes, max_age_seconds=max_age_seconds)
+        return _artifact_store
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the process-wide artifact store."""
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            _artifact_store = ArtifactStore()
+        return _artifact_store
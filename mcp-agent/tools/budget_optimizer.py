@@ -0,0 +1,170 @@
+"""
+Budget Optimizer
+Allocates budget across platforms to maximize expected conversions or reach under
+diminishing returns, with per-platform min/max and daily-spend constraints.
+
+Each platform's response to total spend ``x`` is modelled as
+``rate * s * ln(1 + x / s)``: the initial rate comes from the effect analyzer metrics
+(conversions or reach per dollar) and ``s`` is the saturation spend over the campaign.
+The curves are concave and separable, so the optimum equalizes marginal returns
+(water-filling); the common marginal value is found by bisection, vectorized over
+scenarios and platforms.
+"""
+
+from typing import Dict, List, Sequence, Optional, Tuple
+
+import numpy as np
+
+from tools.platform_metrics import (
+    REACH_MULTIPLIERS, DEFAULT_REACH_MULTIPLIER,
+    PLATFORM_METRICS, DEFAULT_PLATFORM_METRICS,
+    DAILY_SATURATION_SPEND, DEFAULT_DAILY_SATURATION_SPEND
+)
+from tools.cancellation import check_cancelled
+
+OBJECTIVES = ("conversions", "reach")
+
+
+def initial_rates(platforms: Sequence[str], objective: str) -> np.ndarray:
+    """Conversions or reach per dollar at low spend, per platform."""
+    if objective == "conversions":
+        metrics = [PLATFORM_METRICS.get(p, DEFAULT_PLATFORM_METRICS) for p in platforms]
+        return np.array([m["conversion_rate"] / m["cpc"] for m in metrics], dtype=np.float64)
+    if objective == "reach":
+        return np.array([REACH_MULTIPLIERS.get(p, DEFAULT_REACH_MULTIPLIER) for p in platforms], dtype=np.float64)
+    raise ValueError(f"Unsupported objective: {objective} (expected one of {OBJECTIVES})")
+
+
+def expected_response(spend: np.ndarray, rates: np.ndarray, saturation: np.ndarray) -> np.ndarray:
+    """Expected conversions/reach for ``spend`` on the diminishing-returns curves."""
+    return rates * saturation * np.log1p(spend / saturation)
+
+
+def optimize_allocations(
+    budgets: np.ndarray,
+    rates: np.ndarray,
+    saturation: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    iterations: int = 100
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Solve many allocation problems at once.
+
+    ``budgets`` has shape (N,); the other arrays broadcast to (N, P). Returns the
+    (N, P) allocations and the (N,) marginal value of one more dollar. Scenarios whose
+    upper bounds sum below the budget get their upper bounds (budget left unallocated).
+    """
+    budgets = np.asarray(budgets, dtype=np.float64)
+    shape = (budgets.shape[0], np.broadcast(rates, saturation, lower, upper).shape[-1])
+    if shape[1] == 0:
+        raise ValueError("At least one platform is required")
+    rates, saturation, lower, upper = (np.broadcast_to(np.asarray(a, dtype=np.float64), shape)
+                                       for a in (rates, saturation, lower, upper))
+
+    def allocate(marginal: np.ndarray) -> np.ndarray:
+        # Spend where the curve's slope rate / (1 + x / s) equals the marginal value
+        return np.clip(saturation * (rates / marginal[:, None] - 1.0), lower, upper)
+
+    # Bisect the marginal value in log space: at the high end everything sits at its
+    # lower bound, at the low end everything is at its upper bound
+    high = np.log(rates.max(axis=1))
+    low = high - 60.0
+    for _ in range(iterations):
+        check_cancelled()
+        mid = (low + high) / 2
+        over = allocate(np.exp(mid)).sum(axis=1) > budgets
+        low = np.where(over, mid, low)
+        high = np.where(over, high, mid)
+
+    marginal = np.exp(high)
+    allocation = allocate(marginal)
+    capped = upper.sum(axis=1) <= budgets
+    allocation[capped] = upper[capped]
+    marginal[capped] = (rates / (1.0 + upper / saturation))[capped].min(axis=1)
+    return allocation, marginal
+
+
+def validate_campaign(budget: float, duration_days: int) -> None:
+    """Raises ValueError for a negative (or NaN) budget or a campaign shorter than one day."""
+    if not budget >= 0:
+        raise ValueError(f"Budget must be non-negative, got: {budget}")
+    if not duration_days > 0:
+        raise ValueError(f"duration_days must be positive, got: {duration_days}")
+
+
+def validate_platforms(
+    platforms: Sequence[str],
+    min_spend: Optional[Dict[str, float]] = None,
+    max_spend: Optional[Dict[str, float]] = None,
+    max_daily_spend: Optional[Dict[str, float]] = None
+) -> List[str]:
+    """Distinct platform names, in order; raises ValueError for an empty list or constraints on other platforms."""
+    if not platforms:
+        raise ValueError("At least one platform is required")
+    bad = [p for p in platforms if not isinstance(p, str) or not p.strip()]
+    if bad:
+        raise ValueError(f"Platform names must be non-empty strings, got: {bad}")
+    names = list(dict.fromkeys(platforms))
+    for label, limits in (("min_spend", min_spend), ("max_spend", max_spend), ("max_daily_spend", max_daily_spend)):
+        unknown = sorted(set(limits or {}) - set(names))
+        if unknown:
+            raise ValueError(f"{label} names platforms not in the plan: {unknown}")
+    return names
+
+
+def build_bounds(
+    platforms: Sequence[str],
+    budget: float,
+    duration_days: int,
+    min_spend: Optional[Dict[str, float]] = None,
+    max_spend: Optional[Dict[str, float]] = None,
+    max_daily_spend: Optional[Dict[str, float]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-platform total-spend bounds from min/max totals and daily caps."""
+    min_spend = min_spend or {}
+    max_spend = max_spend or {}
+    max_daily_spend = max_daily_spend or {}
+    lower = np.array([float(min_spend.get(p, 0.0)) for p in platforms])
+    upper = np.array([
+        # Unlimited by default: a platform capped at the whole budget would skew the marginal value
+        min(float(max_spend.get(p, np.inf)), float(max_daily_spend.get(p, np.inf)) * duration_days)
+        for p in platforms
+    ])
+    if np.any(lower > upper):
+        bad = [p for p, lo, hi in zip(platforms, lower, upper) if lo > hi]
+        raise ValueError(f"Minimum spend exceeds maximum spend for: {bad}")
+    if lower.sum() > budget:
+        raise ValueError(f"Minimum spends ({lower.sum():.2f}) exceed the total budget ({budget:.2f})")
+    return lower, upper
+
+
+def saturation_spend(platforms: Sequence[str], duration_days: int) -> np.ndarray:
+    """Saturation spend over the whole campaign, per platform."""
+    return np.array([
+        DAILY_SATURATION_SPEND.get(p, DEFAULT_DAILY_SATURATION_SPEND) * duration_days for p in platforms
+    ], dtype=np.float64)
+
+
+def optimize_budget(
+    budget: float,
+    platforms: List[str],
+    duration_days: int,
+    objective: str = "conversions",
+    min_spend: Optional[Dict[str, float]] = None,
+    max_spend: Optional[Dict[str, float]] = None,
+    max_daily_spend: Optional[Dict[str, float]] = None
+) -> Dict[str, np.ndarray]:
+    """Optimize a single plan; returns allocation, expected conversions/reach and the marginal value."""
+    validate_campaign(budget, duration_days)
+    platforms = validate_platforms(platforms, min_spend, max_spend, max_daily_spend)
+    lower, upper = build_bounds(platforms, budget, duration_days, min_spend, max_spend, max_daily_spend)
+    saturation = saturation_spend(platforms, duration_days)
+    rates = initial_rates(platforms, objective)
+    allocation, marginal = optimize_allocations(np.array([budget]), rates, saturation, lower, upper)
+    allocation = allocation[0]
+    return {
+        "allocation": allocation,
+        "conversions": expected_response(allocation, initial_rates(platforms, "conversions"), saturation),
+        "reach": expected_response(allocation, initial_rates(platforms, "reach"), saturation),
+        "marginal_value": marginal[0],
+    }
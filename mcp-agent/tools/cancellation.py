@@ -0,0 +1,86 @@
+"""
+Cooperative Cancellation
+Cancel tokens that long-running tools poll so they stop early on timeout or cancellation.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Iterator
+
+
+class ToolCancelledError(Exception):
+    """Raised inside a tool that noticed its call was cancelled or ran past its deadline."""
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(f"Tool call {'timed out' if reason == 'timeout' else 'was cancelled'}")
+        self.reason = reason
+
+    def __reduce__(self):
+        # Keep ``reason`` when the error crosses the process-pool boundary
+        return type(self), (self.reason,)
+
+
+class CancelToken:
+    """Cancellation flag plus an optional deadline for one tool call.
+
+    The deadline is wall-clock (``time.time()``) so a token can be rebuilt in a tool
+    worker process. Tools call ``check()`` between units of work.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self.deadline is not None and time.time() >= self.deadline)
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self._event.is_set():
+            return self._reason
+        return "timeout" if self.cancelled else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline (never negative), or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def check(self) -> None:
+        """Raise ToolCancelledError if the call was cancelled or its deadline has passed."""
+        if self.cancelled:
+            raise ToolCancelledError(self.reason)
+
+
+# Never cancelled; returned when a tool runs outside the executor pool
+_NO_TOKEN = CancelToken()
+_local = threading.local()
+
+
+def current_token() -> CancelToken:
+    """The token of the tool call running on this thread."""
+    return getattr(_local, "token", None) or _NO_TOKEN
+
+
+@contextmanager
+def use_token(token: CancelToken) -> Iterator[CancelToken]:
+    """Make ``token`` the current token for this thread while the block runs."""
+    previous = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def check_cancelled() -> None:
+    """Poll point for tools: raise ToolCancelledError if the current call should stop."""
+    current_token().check()
@@ -0,0 +1,202 @@
+"""
+Compliance Rule Engine
+Declarative region x platform compliance rules compiled once into a single
+multi-pattern scanner per ad field, so each ad is scanned in one pass no matter
+how many rules exist.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field as dataclass_field
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set, Tuple, Iterator
+
+import yaml
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "config" / "compliance_rules.yaml"
+FIELDS = ("content", "audience")
+
+
+@dataclass
+class ComplianceRule:
+    """One declarative compliance rule."""
+    id: str
+    field: str = "content"
+    regions: Optional[Set[str]] = None  # None = every region
+    platforms: Optional[Set[str]] = None  # None = every platform
+    keywords: List[str] = dataclass_field(default_factory=list)
+    match: str = "all"  # all / any (keywords only)
+    regex: Optional[str] = None
+    max_length: Optional[int] = None
+    severity: str = "issue"  # issue / recommendation
+    message: str = ""
+    recommendation: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ComplianceRule":
+        rule = cls(
+            id=data["id"],
+            field=data.get("field", "content"),
+            regions=set(data["regions"]) if data.get("regions") else None,
+            platforms=set(data["platforms"]) if data.get("platforms") else None,
+            keywords=[k.lower() for k in data.get("keywords", [])],
+            match=data.get("match", "all"),
+            regex=data.get("regex"),
+            max_length=data.get("max_length"),
+            severity=data.get("severity", "issue"),
+            message=data.get("message", ""),
+            recommendation=data.get("recommendation", ""),
+        )
+        conditions = [bool(rule.keywords), rule.regex is not None, rule.max_length is not None]
+        if sum(conditions) != 1:
+            raise ValueError(f"Compliance rule '{rule.id}' needs exactly one of keywords, regex or max_length")
+        if rule.field not in FIELDS:
+            raise ValueError(f"Compliance rule '{rule.id}' has unknown field '{rule.field}'")
+        if rule.match not in ("all", "any"):
+            raise ValueError(f"Compliance rule '{rule.id}' has unknown match mode '{rule.match}'")
+        if rule.severity not in ("issue", "recommendation"):
+            raise ValueError(f"Compliance rule '{rule.id}' has unknown severity '{rule.severity}'")
+        return rule
+
+    def applies_to(self, region: str, platform: str) -> bool:
+        return (self.regions is None or region in self.regions) and \
+               (self.platforms is None or platform in self.platforms)
+
+
+class FieldScanner:
+    """Single-pass scanner for every keyword and regex used on one field.
+
+    All keywords (longest first) and regexes are combined into one zero-width lookahead
+    alternation, so one ``finditer`` pass over the text visits every position where any
+    pattern starts. When two keywords start at the same position the shorter one is a
+    prefix of the longer, so crediting the longest match plus its keyword prefixes finds
+    every keyword occurrence. Regexes are confirmed only at those candidate positions.
+    """
+
+    def __init__(self, keywords: Set[str], regexes: List[str]):
+        self.keywords = sorted(keywords, key=lambda k: (-len(k), k))
+        self.regexes = list(dict.fromkeys(regexes))
+        self._compiled_regexes = [re.compile(pattern) for pattern in self.regexes]
+        self._prefixes = {
+            keyword: {k for k in self.keywords if keyword.startswith(k)} for keyword in self.keywords
+        }
+
+        alternatives = []
+        if self.keywords:
+            alternatives.append("(?P<kw>" + "|".join(re.escape(k) for k in self.keywords) + ")")
+        alternatives.extend(f"(?:{pattern})" for pattern in self.regexes)
+        self._pattern = re.compile("(?=" + "|".join(alternatives) + ")") if alternatives else None
+
+    def scan(self, text: str) -> Tuple[Set[str], Set[str]]:
+        """Return (keywords found, regex patterns found) in ``text``."""
+        found_keywords: Set[str] = set()
+        found_regexes: Set[str] = set()
+        if self._pattern is None:
+            return found_keywords, found_regexes
+
+        pending = list(zip(self.regexes, self._compiled_regexes))
+        for match in self._pattern.finditer(text):
+            keyword = match.group("kw") if self.keywords else None
+            if keyword is not None:
+                found_keywords |= self._prefixes[keyword]
+            if pending:
+                position = match.start()
+                still_pending = []
+                for pattern, compiled in pending:
+                    if compiled.match(text, position):
+                        found_regexes.add(pattern)
+                    else:
+                        still_pending.append((pattern, compiled))
+                pending = still_pending
+        return found_keywords, found_regexes
+
+
+class ComplianceRuleSet:
+    """Compiled set of compliance rules."""
+
+    def __init__(self, rules: List[ComplianceRule]):
+        self.rules = rules
+        self.scanners = {
+            name: FieldScanner(
+                keywords={k for rule in rules if rule.field == name for k in rule.keywords},
+                regexes=[rule.regex for rule in rules if rule.field == name and rule.regex is not None],
+            )
+            for name in FIELDS
+        }
+
+    @classmethod
+    def from_file(cls, path) -> "ComplianceRuleSet":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        return cls([ComplianceRule.from_dict(rule) for rule in data.get("rules", [])])
+
+    def _rule_matches(self, rule: ComplianceRule, texts: Dict[str, str],
+                      hits: Dict[str, Tuple[Set[str], Set[str]]]) -> bool:
+        if rule.max_length is not None:
+            return len(texts[rule.field]) > rule.max_length
+        keywords_found, regexes_found = hits[rule.field]
+        if rule.regex is not None:
+            return rule.regex in regexes_found
+        if rule.match == "any":
+            return any(k in keywords_found for k in rule.keywords)
+        return all(k in keywords_found for k in rule.keywords)
+
+    def _evaluate(self, rules: List[ComplianceRule], texts: Dict[str, str],
+                  hits: Dict[str, Tuple[Set[str], Set[str]]]) -> Dict[str, List[str]]:
+        issues, recommendations, matched = [], [], []
+        for rule in rules:
+            if not self._rule_matches(rule, texts, hits):
+                continue
+            matched.append(rule.id)
+            if rule.severity == "issue" and rule.message:
+                issues.append(rule.message)
+            if rule.recommendation:
+                recommendations.append(rule.recommendation)
+        return {"issues": issues, "recommendations": recommendations, "matched_rules": matched}
+
+    def check(self, platform: str, region: str, ad_content: str, target_audience: str) -> Dict[str, List[str]]:
+        """Evaluate every applicable rule; returns issues, recommendations and matched rule ids."""
+        return self.check_batch(platform, region, [ad_content], target_audience)[0]
+
+    def iter_check_batch(self, platform: str, region: str, ad_contents: List[str],
+                         target_audience: str) -> Iterator[Dict[str, List[str]]]:
+        """Check many ad variants that share platform, region and audience, yielding each result.
+
+        Rule applicability and the audience scan are resolved once for the whole batch.
+        """
+        rules = [rule for rule in self.rules if rule.applies_to(region, platform)]
+        audience_text = target_audience.lower()
+        audience_hits = self.scanners["audience"].scan(audience_text)
+
+        for ad_content in ad_contents:
+            content_text = ad_content.lower()
+            texts = {"content": content_text, "audience": audience_text}
+            hits = {"content": self.scanners["content"].scan(content_text), "audience": audience_hits}
+            yield self._evaluate(rules, texts, hits)
+
+    def check_batch(self, platform: str, region: str, ad_contents: List[str],
+                    target_audience: str) -> List[Dict[str, List[str]]]:
+        """Check many ad variants that share platform, region and audience."""
+        return list(self.iter_check_batch(platform, region, ad_contents, target_audience))
+
+
+_rule_set: Optional[ComplianceRuleSet] = None
+_rule_set_lock = threading.Lock()
+
+
+def configure_rule_set(path=None) -> ComplianceRuleSet:
+    """Load and compile the rule set from ``path`` (default: config/compliance_rules.yaml)."""
+    global _rule_set
+    rule_set = ComplianceRuleSet.from_file(path or DEFAULT_RULES_PATH)
+    with _rule_set_lock:
+        _rule_set = rule_set
+    return rule_set
+
+
+def get_rule_set() -> ComplianceRuleSet:
+    """Return the compiled process-wide rule set, loading the default file on first use."""
+    global _rule_set
+    with _rule_set_lock:
+        if _rule_set is None:
+            _rule_set = ComplianceRuleSet.from_file(DEFAULT_RULES_PATH)
+        return _rule_set
@@ -0,0 +1,43 @@
+"""
+Platform Metrics
+Static per-platform tables shared by the scalar ad tools and the vectorized scenario engine.
+"""
+
+# Budget weight per platform (simplified); unknown platforms weigh 1.0
+PLATFORM_MULTIPLIERS = {
+    "tiktok": 1.2,
+    "facebook": 1.0,
+    "instagram": 1.1,
+    "google": 0.9
+}
+DEFAULT_PLATFORM_MULTIPLIER = 1.0
+
+# Estimated reach per dollar (simplified); unknown platforms reach 1000
+REACH_MULTIPLIERS = {
+    "tiktok": 5000,
+    "facebook": 3000,
+    "instagram": 4000,
+    "google": 2000
+}
+DEFAULT_REACH_MULTIPLIER = 1000
+
+# Platform-specific performance metrics (simplified)
+PLATFORM_METRICS = {
+    "tiktok": {"ctr": 0.025, "cpc": 0.5, "conversion_rate": 0.03},
+    "facebook": {"ctr": 0.015, "cpc": 0.8, "conversion_rate": 0.025},
+    "instagram": {"ctr": 0.02, "cpc": 0.6, "conversion_rate": 0.028},
+    "google": {"ctr": 0.03, "cpc": 0.4, "conversion_rate": 0.035}
+}
+DEFAULT_PLATFORM_METRICS = {"ctr": 0.02, "cpc": 0.5, "conversion_rate": 0.03}
+
+AVG_CONVERSION_VALUE = 50  # Assume $50 average order value
+
+# Daily spend at which a platform's returns have dropped to half their initial rate
+# (diminishing-returns curve used by the budget optimizer)
+DAILY_SATURATION_SPEND = {
+    "tiktok": 3000.0,
+    "facebook": 5000.0,
+    "instagram": 3500.0,
+    "google": 6000.0
+}
+DEFAULT_DAILY_SATURATION_SPEND = 2000.0
@@ -0,0 +1,159 @@
+"""
+Scenario Engine
+NumPy-backed bulk evaluation of (budget, platform set, region, duration) scenarios.
+Results match budget_calculator_tool and effect_analyzer_tool scenario by scenario.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Optional
+
+import numpy as np
+
+from tools.platform_metrics import (
+    PLATFORM_MULTIPLIERS, DEFAULT_PLATFORM_MULTIPLIER,
+    REACH_MULTIPLIERS, DEFAULT_REACH_MULTIPLIER,
+    PLATFORM_METRICS, DEFAULT_PLATFORM_METRICS,
+    AVG_CONVERSION_VALUE
+)
+
+
+@dataclass
+class ScenarioBatch:
+    """Columnar encoding of per-scenario platform lists.
+
+    ``sequence`` holds each scenario's platform list as column indices into ``platforms``
+    (padded with -1) in the original order; ``first_seen`` holds the distinct platforms
+    in first-occurrence order. Keeping the original order lets the engine reproduce the
+    scalar tools' left-to-right float sums exactly.
+    """
+    platforms: List[str]
+    sequence: np.ndarray
+    first_seen: np.ndarray
+
+    @classmethod
+    def from_platform_sets(cls, platform_sets: Sequence[Sequence[str]],
+                           platforms: Optional[Sequence[str]] = None) -> "ScenarioBatch":
+        vocabulary = list(platforms) if platforms is not None else []
+        columns = {name: i for i, name in enumerate(vocabulary)}
+        if platforms is None:
+            for platform_set in platform_sets:
+                for name in platform_set:
+                    if name not in columns:
+                        columns[name] = len(vocabulary)
+                        vocabulary.append(name)
+
+        n = len(platform_sets)
+        max_len = max((len(p) for p in platform_sets), default=0)
+        sequence = np.full((n, max_len), -1, dtype=np.int64)
+        first_seen = np.full((n, max_len), -1, dtype=np.int64)
+        for row, platform_set in enumerate(platform_sets):
+            seen = []
+            for col, name in enumerate(platform_set):
+                index = columns[name]
+                sequence[row, col] = index
+                if index not in seen:
+                    seen.append(index)
+            first_seen[row, :len(seen)] = seen
+        return cls(platforms=vocabulary, sequence=sequence, first_seen=first_seen)
+
+    def slice(self, start: int, stop: int) -> "ScenarioBatch":
+        """Rows ``start:stop`` of the batch, keeping the same platform columns."""
+        return ScenarioBatch(platforms=self.platforms, sequence=self.sequence[start:stop],
+                             first_seen=self.first_seen[start:stop])
+
+    @classmethod
+    def from_mask(cls, platforms: Sequence[str], mask: np.ndarray) -> "ScenarioBatch":
+        """Build a batch from an N x P boolean matrix (platforms taken in column order)."""
+        mask = np.asarray(mask, dtype=bool)
+        # Stable sort puts selected columns first, in column order
+        order = np.argsort(~mask, axis=1, kind="stable")
+        sequence = np.where(np.take_along_axis(mask, order, axis=1), order, -1)
+        return cls(platforms=list(platforms), sequence=sequence, first_seen=sequence)
+
+
+def round_cents(values: np.ndarray) -> np.ndarray:
+    """Round to 2 decimals exactly like Python's ``round(x, 2)``.
+
+    ``np.round`` scales by 100 first and can disagree on near-ties; those rare entries
+    are re-rounded with the builtin.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        flat_values = values.reshape(-1)
+        flat_rounded = rounded.reshape(-1)
+        for index in np.flatnonzero(near_tie):
+            flat_rounded[index] = round(float(flat_values[index]), 2)
+    return rounded
+
+
+def _platform_table(platforms: Sequence[str]) -> Dict[str, np.ndarray]:
+    metrics = [PLATFORM_METRICS.get(p, DEFAULT_PLATFORM_METRICS) for p in platforms]
+    return {
+        "weight": np.array([PLATFORM_MULTIPLIERS.get(p, DEFAULT_PLATFORM_MULTIPLIER) for p in platforms], dtype=np.float64),
+        "reach": np.array([REACH_MULTIPLIERS.get(p, DEFAULT_REACH_MULTIPLIER) for p in platforms], dtype=np.float64),
+        "ctr": np.array([m["ctr"] for m in metrics], dtype=np.float64),
+        "cpc": np.array([m["cpc"] for m in metrics], dtype=np.float64),
+        "conversion_rate": np.array([m["conversion_rate"] for m in metrics], dtype=np.float64),
+    }
+
+
+def _ordered_sum(values: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """Sum ``values[row, order[row, k]]`` left to right over k (padding contributes 0)."""
+    total = np.zeros(values.shape[0], dtype=np.float64)
+    rows = np.arange(values.shape[0])
+    for k in range(order.shape[1]):
+        column = order[:, k]
+        total += np.where(column >= 0, values[rows, np.maximum(column, 0)], 0.0)
+    return total
+
+
+def sweep_scenarios(budgets: Sequence[float], duration_days: Sequence[int], batch: ScenarioBatch) -> Dict[str, np.ndarray]:
+    """Evaluate every scenario at once.
+
+    Returns N x P arrays (P = ``batch.platforms``; zero where a platform is not selected)
+    for allocation, daily spend, impressions, clicks, conversions and ROI, plus per-scenario
+    total reach, conversions and ROI.
+    """
+    budgets = np.asarray(budgets, dtype=np.float64)
+    durations = np.asarray(duration_days, dtype=np.float64)
+    n, p = len(budgets), len(batch.platforms)
+    table = _platform_table(batch.platforms)
+
+    selected = np.zeros((n, p), dtype=bool)
+    rows = np.repeat(np.arange(n), batch.first_seen.shape[1])
+    cols = batch.first_seen.reshape(-1)
+    selected[rows[cols >= 0], cols[cols >= 0]] = True
+
+    # Budget calculator: weight share of the budget, per platform
+    weights = np.broadcast_to(table["weight"], (n, p))
+    total_weight = _ordered_sum(weights, batch.sequence)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(selected, weights / total_weight[:, None], 0.0)
+        allocation = round_cents(share * budgets[:, None])
+        daily_spend = np.where(selected, round_cents(allocation / durations[:, None]), 0.0)
+    reach_by_platform = np.where(selected, table["reach"] * allocation, 0.0)
+    total_reach = np.trunc(_ordered_sum(reach_by_platform, batch.first_seen)).astype(np.int64)
+
+    # Effect analyzer on each platform's allocation
+    clicks = np.trunc(allocation / table["cpc"])
+    impressions = np.trunc(clicks / table["ctr"])
+    conversions = np.trunc(clicks * table["conversion_rate"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = np.where(allocation > 0, round_cents(conversions * AVG_CONVERSION_VALUE / allocation), 0.0)
+        total_conversions = conversions.sum(axis=1)
+        total_roi = np.where(budgets > 0, round_cents(total_conversions * AVG_CONVERSION_VALUE / budgets), 0.0)
+
+    return {
+        "platform_allocation": allocation,
+        "daily_spend": daily_spend,
+        "estimated_impressions": impressions.astype(np.int64),
+        "estimated_clicks": clicks.astype(np.int64),
+        "estimated_conversions": conversions.astype(np.int64),
+        "roi_estimate": roi,
+        "total_estimated_reach": total_reach,
+        "total_estimated_conversions": total_conversions.astype(np.int64),
+        "total_roi_estimate": total_roi,
+    }